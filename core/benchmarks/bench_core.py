@@ -0,0 +1,165 @@
+#!/bin/env python
+from __future__ import print_function
+
+"""
+Microbenchmarks of the hot paths of the ebay_datameta_core: the SemVer parsing and comparisons, the DateTime
+conversions, the CannedRe matching and the generated verify, __eq__ and __hash__ of the sample v3 model,
+on the synthetic data from the datagen, with a regression gate against the stored JSON baseline.
+
+Run from the core directory:
+    python benchmarks/bench_core.py run [--filter SemVer] [--json results.json]
+    python benchmarks/bench_core.py baseline [--baseline file.json]
+    python benchmarks/bench_core.py compare [--baseline file.json] [--threshold 0.15]
+
+The baseline defaults to the benchmarks/baselines/py<major>.<minor>.json; record it on the machine that runs
+the gate, the numbers do not carry over between machines. The compare exits with 1 if any benchmark is slower than
+the baseline by more than the threshold, a fraction: 0.15 fails at 15% slower.
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from collections import OrderedDict
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, HERE)
+
+from datagen import DataGen
+from ebay_datameta_core.base import SemVer, DateTime
+from ebay_datameta_core.canned_re import CannedRe
+
+BATCH = 1000 # items per the timed call
+REPEAT = 5 # the best of these many timings counts
+MIN_TIME = 0.1 # seconds per timing, at least
+DEFAULT_THRESHOLD = 0.15
+
+
+def benchmarks(gen):
+    """
+    The benchmarks by name: the function processing one batch and how many operations the batch is.
+    """
+    sources = [gen.semVer() for _ in range(BATCH)]
+    vers = [SemVer(s) for s in sources]
+    pairs = list(zip(vers, vers[1:] + vers[:1]))
+    times = [gen.dateTime() for _ in range(BATCH)]
+    millis = [DateTime.toMillis(t) for t in times]
+    isos = [DateTime.toIsoUtc(t)[:-3] + "Z" for t in times]
+    sinks = [gen.kitchenSink(i) for i in range(BATCH // 10)]
+    multis = [gen.multiFieldId(i % (BATCH // 4)) for i in range(BATCH)]
+    multiPairs = list(zip(multis, multis[::-1]))
+    embeds = [gen.embeddedType(i) for i in range(BATCH)]
+    idLess = [gen.idLess(i) for i in range(BATCH)]
+
+    result = OrderedDict()
+    result['SemVer.parse'] = (lambda: [SemVer(s) for s in sources], BATCH)
+    result['SemVer.of'] = (lambda: [SemVer.of(s) for s in sources], BATCH)
+    result['SemVer.sort'] = (lambda: sorted(vers), 1)
+    result['SemVer.compare'] = (lambda: [a < b for a, b in pairs], BATCH)
+    result['SemVer.eq'] = (lambda: [a == b for a, b in pairs], BATCH)
+    result['SemVer.hash'] = (lambda: [hash(v) for v in vers], BATCH)
+    result['SemVer.diffLevel'] = (lambda: [a.diffLevel(b) for a, b in pairs], BATCH)
+    result['DateTime.toMillis'] = (lambda: [DateTime.toMillis(t) for t in times], BATCH)
+    result['DateTime.fromMillis'] = (lambda: [DateTime.fromMillis(ms) for ms in millis], BATCH)
+    result['DateTime.toIsoUtc'] = (lambda: [DateTime.toIsoUtc(t) for t in times], BATCH)
+    result['DateTime.fromIsoUtc'] = (lambda: [DateTime.fromIsoUtc(s) for s in isos], BATCH)
+    for key in sorted(CannedRe.CANNED_RES):
+        inputs = [gen.patternInputs(key) for _ in range(BATCH)]
+        result['CannedRe.%s.match' % key] = (lambda rx=CannedRe.CANNED_RES[key], inputs=inputs:
+                                             [rx.match(s) for s in inputs], BATCH)
+        result['CannedRe.%s.check' % key] = (lambda check=CannedRe.CANNED_CHECKS[key], inputs=inputs:
+                                             [check(s) for s in inputs], BATCH)
+    result['KitchenSink.verify'] = (lambda: [e.verify() for e in sinks], len(sinks))
+    result['KitchenSink.hash'] = (lambda: [hash(e) for e in sinks], len(sinks))
+    result['MultiFieldId.verify'] = (lambda: [e.verify() for e in multis], BATCH)
+    result['MultiFieldId.eq'] = (lambda: [a == b for a, b in multiPairs], BATCH)
+    result['MultiFieldId.hash'] = (lambda: [hash(e) for e in multis], BATCH)
+    result['EmbeddedType.verify'] = (lambda: [e.verify() for e in embeds], BATCH)
+    result['IdLess.eq'] = (lambda: [a == b for a, b in zip(idLess, idLess[1:])], BATCH - 1)
+    result['IdLess.hash'] = (lambda: [hash(e) for e in idLess], BATCH)
+    return result
+
+
+def timePerOp(fn, ops):
+    """
+    Seconds per operation: the best of the REPEAT timings, each of as many calls as it takes for the MIN_TIME.
+    """
+    number = 1
+    while timeit.timeit(fn, number=number) < MIN_TIME:
+        number *= 2
+    return min(timeit.repeat(fn, number=number, repeat=REPEAT)) / (number * ops)
+
+
+def run(pattern=None, seed=None):
+    gen = DataGen() if seed is None else DataGen(seed)
+    results = OrderedDict()
+    for name, (fn, ops) in benchmarks(gen).items():
+        if pattern and pattern not in name: continue
+        perOp = timePerOp(fn, ops)
+        results[name] = {'usPerOp': perOp * 1e6, 'opsPerSec': 1.0 / perOp}
+        print("%-28s %12.3f us/op %14.1f op/s" % (name, perOp * 1e6, 1.0 / perOp))
+        sys.stdout.flush()
+    return results
+
+
+def defaultBaseline():
+    return os.path.join(HERE, 'baselines', 'py%d.%d.json' % sys.version_info[:2])
+
+
+def save(path, results):
+    folder = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(folder): os.makedirs(folder)
+    with open(path, "w") as out:
+        json.dump({'python': sys.version.split()[0], 'results': results}, out, indent=1)
+
+
+def compare(baseline, results, threshold):
+    """
+    List of the (name, baseline us/op, current us/op, change) for the benchmarks slower than the baseline
+    by more than the threshold. The benchmarks missing from either side are not compared.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None: continue
+        change = current['usPerOp'] / base['usPerOp'] - 1
+        print("%-28s %12.3f -> %12.3f us/op %+7.1f%%" % (name, base['usPerOp'], current['usPerOp'], change * 100))
+        if change > threshold: regressions.append((name, base['usPerOp'], current['usPerOp'], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DataMeta core microbenchmarks")
+    parser.add_argument('command', choices=('run', 'baseline', 'compare'))
+    parser.add_argument('--filter', help="run only the benchmarks with this in the name")
+    parser.add_argument('--json', help="run: also write the results to this JSON file")
+    parser.add_argument('--baseline', default=defaultBaseline(), help="the baseline JSON file")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="compare: the slowdown that fails, as a fraction")
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare' and not os.path.isfile(args.baseline):
+        print("No baseline at %s, record one with the baseline command" % args.baseline)
+        return 2
+    results = run(args.filter)
+    if args.command == 'run':
+        if args.json: save(args.json, results)
+    elif args.command == 'baseline':
+        save(args.baseline, results)
+        print("Baseline saved to %s" % args.baseline)
+    else:
+        with open(args.baseline) as src:
+            baseline = json.load(src)['results']
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print("%d benchmark(s) regressed by more than %.0f%%:" % (len(regressions), args.threshold * 100))
+            for name, base, current, change in regressions:
+                print("  %s: %.3f -> %.3f us/op (%+.1f%%)" % (name, base, current, change * 100))
+            return 1
+        print("No regressions beyond %.0f%%" % (args.threshold * 100))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/bin/env python
+
+"""
+Synthetic data for the benchmarks: the sample v3 model entities, versions, datetimes and the strings for the canned
+patterns, reproducible by the seed. The values vary the way the real ones do: optional fields set some of the time,
+strings of varied lengths, collections of a few elements.
+"""
+
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, os.path.join(HERE, '..', 'tests'))
+
+from test_ebay_datameta_sample_v3.model import EmbeddedType, Embodiment, IdLess, MultiFieldId, KitchenSink, \
+    ExampleNsRec, BaseColor, WordedEnum
+
+WORDS = ("alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet", "kilo", "lima")
+HEX = "0123456789abcdef"
+AREA_CODES = ("212", "213", "312", "408", "415", "646", "702", "718", "925")
+
+
+class DataGen(object):
+
+    def __init__(self, seed=20170225):
+        self.rnd = random.Random(seed)
+        self.epoch = datetime(2016, 3, 31, 15, 33, 44)
+
+    def word(self):
+        return self.rnd.choice(WORDS)
+
+    def text(self, maxWords=6):
+        return " ".join(self.word() for _ in range(self.rnd.randint(1, maxWords)))
+
+    def dateTime(self):
+        return self.epoch + timedelta(seconds=self.rnd.randint(-10 ** 8, 10 ** 8))
+
+    def maybe(self, val, chance=0.5):
+        return val if self.rnd.random() < chance else None
+
+    def semVer(self):
+        src = "%d.%d.%d" % (self.rnd.randint(0, 20), self.rnd.randint(0, 50), self.rnd.randint(0, 200))
+        if self.rnd.random() < 0.7: src += ".%d" % self.rnd.randint(1, 5000)
+        if self.rnd.random() < 0.2: src += ".%s" % self.word()
+        return src
+
+    def uuid(self, upper=False):
+        groups = [''.join(self.rnd.choice(HEX) for _ in range(n)) for n in (8, 4, 4, 4, 12)]
+        s = '-'.join(groups)
+        return s.upper() if upper else s
+
+    def email(self):
+        return "%s.%s%d@%s.com" % (self.word(), self.word(), self.rnd.randint(0, 999), self.word())
+
+    def phone(self):
+        # the North American numbering: no 0 or 1 leading the area or the exchange code, no "11" ending the area code
+        exchange = "".join(str(self.rnd.randint(2, 9)) for _ in range(3))
+        return "%s-%s-%04d" % (self.rnd.choice(AREA_CODES), exchange, self.rnd.randint(0, 9999))
+
+    def zip(self):
+        z = "%05d" % self.rnd.randint(0, 99999)
+        return z + "-%04d" % self.rnd.randint(0, 9999) if self.rnd.random() < 0.5 else z
+
+    def patternInputs(self, name):
+        """
+        Strings for the canned pattern of the given name, about a quarter of them not matching.
+        """
+        make = {'uuid': self.uuid, 'UUID': lambda: self.uuid(True), 'email': self.email, 'phone': self.phone}[name]
+        val = make()
+        return val if self.rnd.random() < 0.75 else val[:len(val) // 2] + " " + val[len(val) // 2:]
+
+    def embodiment(self, i, depth=1):
+        e = Embodiment()
+        e.setId(i)
+        e.setInclusivement(self.text(3))
+        e.setMbe(self.embeddedType(i + 1, depth - 1))
+        return e
+
+    def embeddedType(self, i, depth=1):
+        e = EmbeddedType()
+        e.setIntCode(i)
+        e.setTxtCode(self.text(2))
+        if depth > 0: e.setEmbo(self.maybe(self.embodiment(i * 7, depth)))
+        return e
+
+    def idLess(self, i):
+        e = IdLess()
+        e.setCount(i)
+        e.setName(self.maybe(self.word(), 0.7))
+        e.setWhen(self.dateTime())
+        return e
+
+    def multiFieldId(self, i):
+        return MultiFieldId.fromTuple((i, self.rnd.randint(-1000, 1000), self.word(),
+                                       self.maybe(self.dateTime()), self.text()))
+
+    def exampleNsRec(self, i):
+        e = ExampleNsRec()
+        e.setId(i)
+        e.setName(self.word())
+        return e
+
+    def kitchenSink(self, i):
+        rnd = self.rnd
+        return KitchenSink.fromDict({
+            'id': i, 'context': self.text(), 'strings': [self.word() for _ in range(rnd.randint(0, 5))],
+            'embeds': [self.embeddedType(i + k, 0) for k in range(rnd.randint(0, 3))],
+            'ints': [rnd.randint(0, 1000) for _ in range(rnd.randint(0, 8))],
+            'times': [self.dateTime() for _ in range(rnd.randint(0, 3))],
+            'idLessNess': [self.idLess(k) for k in range(rnd.randint(0, 3))],
+            'strToInt': dict((self.word(), rnd.randint(0, 100)) for _ in range(rnd.randint(0, 4))),
+            'longToEmb': self.maybe(dict((k, self.embeddedType(k, 0)) for k in range(rnd.randint(0, 3)))),
+            'embToString': dict((self.embeddedType(i * 10 + k, 0), self.word()) for k in range(rnd.randint(0, 2))),
+            'embToEmb': dict((self.embeddedType(k, 0), self.embeddedType(k + 1, 0)) for k in range(rnd.randint(0, 2))),
+            'name': self.word(), 'code': self.word()[:3].upper(), 'color': self.maybe(rnd.choice(list(BaseColor))),
+            'type': rnd.choice(list(WordedEnum)), 'choices': None, 'weights': None, 'heights': None,
+            'length': rnd.randint(1, 10 ** 6), 'bearing': self.maybe(rnd.random() * 360),
+            'frequency': rnd.random() * 1000, 'amplitude': self.maybe(rnd.random()),
+            'weight': Decimal("%d.%02d" % (rnd.randint(0, 500), rnd.randint(0, 99))), 'diameter': None,
+            'radius': self.maybe(rnd.random() * 10), 'temperature': rnd.random() * 100 - 40,
+            'isRequired': rnd.random() < 0.5, 'isMeasurable': self.maybe(rnd.random() < 0.5),
+            'comments': self.text(12), 'created': self.maybe(self.dateTime()), 'altered': self.maybe(self.dateTime()),
+            'salary': self.maybe(Decimal(rnd.randint(30000, 200000))),
+            'homePage': "http://%s.com/%s" % (self.word(), self.word()), 'workPage': "http://%s.org" % self.word(),
+            'homeEmail': self.email(), 'mobilePhone': self.maybe(self.phone()), 'homeZip': self.zip(),
+            'workZip': self.zip(), 'lastFirstName': self.maybe("%s, %s" % (self.word(), self.word())),
+            'emb': self.maybe(self.embeddedType(i, 0)), 'embo': self.embodiment(i, 0),
+            'uuidLower': self.uuid(), 'uuidUpper': self.uuid(True), 'otherNsRef': self.exampleNsRec(i)})
@@ -2,9 +2,17 @@
 
 import abc
 import calendar
+import copy
 import re
-from datetime import datetime
+from collections import deque
+from datetime import datetime, date, time, timedelta
 from enum import Enum
+from operator import attrgetter
+
+try:
+    from itertools import izip
+except ImportError:
+    izip = zip
 
 # What happens if you try to create an instance of the interface (abstract class):
 # >       v = Verifiable()
@@ -19,10 +27,474 @@ class DataMetaEntity:
     """
     __metaclass__ = abc.ABCMeta
 
+    # Modes for the clone method:
+    # SHALLOW - the clone shares all the field values with the source
+    # DEEP - the clone gets its own copies of all the nested entities and collections
+    # COW - copy-on-write: the clone shares nested entities and collections with the source until it accesses one
+    #       of them via its getter or replaces it via its setter, then it gets its own copy of just that one value,
+    #       one level at a time. The source, unless frozen, is switched to the COW mode too and copies the shared
+    #       values same way, thus a change via either side never shows in the other; type(source) is not its
+    #       generated class until it owns all of them again, see the thawedClass.
+    #       Frozen entities and immutable values are always shared.
+    CloneMode = Enum("CloneMode", "SHALLOW DEEP COW")
+
     @abc.abstractmethod
     def getVersion(self):
         return
 
+    @classmethod
+    def fromTuple(cls, vals):
+        """
+        Builds an instance from the values of all the fields in the declaration order, see the EntityDescriptor.
+        Bypasses the __init__ and the setters, checks the required fields once for all of them.
+        Called on a frozen class, returns a frozen instance; on a COW class, an instance of the generated class.
+        """
+        desc = EntityDescriptor.of(cls)
+        if len(vals) != len(desc.attrs):
+            raise AttributeError("%s: expected %d field values, got %d" % (cls.__name__, len(desc.attrs), len(vals)))
+        for i in desc.requiredIndexes:
+            if vals[i] is None: _missingRequired(cls, desc, vals)
+        generated = desc.cls
+        result = generated.__new__(generated)
+        result.__dict__ = dict(izip(desc.attrs, vals))
+        return result.freeze() if _FROZEN_CLASSES.get(generated) is cls else result
+
+    @classmethod
+    def fromDict(cls, vals):
+        """
+        Builds an instance from the dict of field values keyed by the field names, missing fields are set to None.
+        Bypasses the __init__ and the setters, checks the required fields once for all of them.
+        """
+        desc = EntityDescriptor.of(cls)
+        state = dict.fromkeys(desc.attrs)
+        for k, v in vals.items():
+            attr = desc.attrOf.get(k)
+            if attr is None: raise AttributeError("%s: unknown field \"%s\"" % (cls.__name__, k))
+            state[attr] = v
+        for i in desc.requiredIndexes:
+            if state[desc.attrs[i]] is None: _missingRequired(cls, desc, [state[a] for a in desc.attrs])
+        generated = desc.cls
+        result = generated.__new__(generated)
+        result.__dict__.update(state)
+        return result.freeze() if _FROZEN_CLASSES.get(generated) is cls else result
+
+    @classmethod
+    def fromRows(cls, rows):
+        """
+        Batch version of the fromTuple, also takes dicts for the fromDict. Returns the list of the instances.
+        """
+        desc = EntityDescriptor.of(cls)
+        attrs = desc.attrs
+        count = len(attrs)
+        requiredIndexes = desc.requiredIndexes
+        # the frozen and COW classes refuse or track the field assignments, build the generated class instead
+        generated = desc.cls
+        frozen = _FROZEN_CLASSES.get(generated) is cls
+        new = generated.__new__
+        result = []
+        append = result.append
+        for row in rows:
+            if type(row) is dict:
+                append(cls.fromDict(row))
+                continue
+            if len(row) != count:
+                raise AttributeError("%s: expected %d field values, got %d" % (cls.__name__, count, len(row)))
+            for i in requiredIndexes:
+                if row[i] is None: _missingRequired(cls, desc, row)
+            obj = new(generated)
+            obj.__dict__ = dict(izip(attrs, row))
+            append(obj.freeze() if frozen else obj)
+        return result
+
+    def isFrozen(self):
+        return False
+
+    def freeze(self):
+        """
+        Switches this instance and all the entities it refers to, directly or via collections, to the frozen mode:
+        the setters raise an AttributeError and the hash is computed once and cached. The lists, sets, deques
+        and dicts in the fields are replaced with the read-only copies that raise an AttributeError on any change,
+        those passed to the setters stay as they were and are no longer held by this instance.
+        Freezing is transitive and in place: the nested entities themselves get frozen, not their copies, hence
+        an entity that is shared with another one, or held by the caller, is frozen for them too; freeze
+        a clone to keep the original thawed.
+        The instance does not pay for any of it until frozen, the frozen behavior comes with the derived class the
+        instance is switched to.
+        """
+        if self.isFrozen(): return self
+        thawed = thawedClass(self)
+        if COW_SHARED_ATTR in self.__dict__: _ownAll(self) # freezing must not leak into the entities of the source
+        self.__class__ = _frozenClass(thawed)
+        state = self.__dict__
+        for k, v in state.items():
+            state[k] = _frozenValue(v)
+        object.__setattr__(self, FROZEN_HASH_ATTR, thawed.__hash__(self))
+        return self
+
+    def clone(self, mode=CloneMode.DEEP):
+        """
+        Fast copy of this entity that works directly with the fields and bypasses the generic copy machinery.
+        The clone is never frozen, see the CloneMode for the modes.
+        """
+        cls = thawedClass(self)
+        result = cls.__new__(cls)
+        if mode is DataMetaEntity.CloneMode.DEEP:
+            _deepClone(self, result, {})
+            return result
+
+        state = result.__dict__
+        state.update(self.__dict__)
+        state.pop(FROZEN_HASH_ATTR, None)
+        state.pop(COW_SHARED_ATTR, None)
+        if mode is DataMetaEntity.CloneMode.COW:
+            shared = set(k for k, v in state.items() if not _isShareable(v))
+            if shared:
+                state[COW_SHARED_ATTR] = shared
+                result.__class__ = _cowClass(cls)
+                if not self.isFrozen(): _shareFrom(self, cls, shared)
+        elif mode is not DataMetaEntity.CloneMode.SHALLOW:
+            raise AttributeError("Unsupported clone mode %s" % mode)
+        return result
+
+
+class EntityDescriptor(object):
+    """
+    Per-class field layout of a generated class, computed once per class and cached:
+    fields - field names in the declaration order
+    attrs - names of the attributes the fields are stored in, mangled with the generated class name
+    getters, setters - names of the accessors for the fields
+    attrOf - attribute names keyed by the field names
+    required - for each field, True if it is required
+    requiredIndexes - indexes of the required fields
+    keyFields, keyAttrs - the identity fields that the generated __eq__ and __hash__ cover, in their order there
+    keyOf - function that extracts the identity key tuple from an instance
+    """
+    _CACHE = {}
+
+    def __init__(self, cls):
+        self.cls = cls
+        # the generated __init__ assigns all the fields in the declaration order, and that's how the compiler lists them
+        prefix = "_%s__" % cls.__name__
+        init = cls.__dict__.get('__init__')
+        names = init.__code__.co_names if init is not None else ()
+        self.fields = tuple(n[len(prefix):] for n in names if n.startswith(prefix))
+        self.attrs = tuple(prefix + f for f in self.fields)
+        self.getters = tuple("get%s%s" % (f[0].upper(), f[1:]) for f in self.fields)
+        self.setters = tuple("set%s%s" % (f[0].upper(), f[1:]) for f in self.fields)
+        self.attrOf = dict(zip(self.fields, self.attrs))
+        # the generated __eq__ compares the identity fields, or all the fields for a class without an identity
+        eq = cls.__dict__.get('__eq__')
+        names = eq.__code__.co_names if eq is not None else ()
+        self.keyFields = tuple(n[len(prefix):] for n in names if n.startswith(prefix)) or self.fields
+        self.keyAttrs = tuple(prefix + f for f in self.keyFields)
+        if len(self.keyAttrs) == 1:
+            getKey = attrgetter(self.keyAttrs[0])
+            self.keyOf = lambda obj: (getKey(obj),)
+        else:
+            self.keyOf = attrgetter(*self.keyAttrs) if self.keyAttrs else lambda obj: ()
+        # the generated setters of the required fields reject None, probe them on a blank instance
+        probe = cls.__new__(cls) if self.fields else None
+        self.required = tuple(_rejectsNone(getattr(probe, s, None)) for s in self.setters)
+        self.requiredIndexes = tuple(i for i, r in enumerate(self.required) if r)
+
+    @staticmethod
+    def of(cls):
+        desc = EntityDescriptor._CACHE.get(cls)
+        if desc is None:
+            # descriptor of the generated class: skip the frozen, COW and any other classes deriving from it
+            generated = next((c for c in cls.__mro__ if '__init__' in c.__dict__), cls)
+            desc = EntityDescriptor._CACHE.get(generated)
+            if desc is None: desc = EntityDescriptor(generated)
+            EntityDescriptor._CACHE[cls] = EntityDescriptor._CACHE[generated] = desc
+        return desc
+
+
+def _missingRequired(cls, desc, vals):
+    raise AttributeError("%s: required fields not set: %s" % (
+        cls.__name__, ", ".join(desc.fields[i] for i in desc.requiredIndexes if vals[i] is None)))
+
+
+def _rejectsNone(setter):
+    if setter is None: return False
+    try:
+        setter(None)
+        return False
+    except AttributeError:
+        return True
+
+
+# Cached hash of a frozen entity, can not clash with a generated field because those are mangled with the class name
+FROZEN_HASH_ATTR = "_DataMetaEntity__hash"
+# Names of the attributes a COW clone still shares with its source
+COW_SHARED_ATTR = "_DataMetaEntity__cowShared"
+# The generated class a frozen or COW class derives from
+THAWED_ATTR = "_DataMetaEntity__thawed"
+
+# Frozen classes keyed by the generated classes they derive from
+_FROZEN_CLASSES = {}
+# COW classes keyed by the generated classes they derive from
+_COW_CLASSES = {}
+
+# Values that can always be shared
+_IMMUTABLES = (type(None), bool, int, float, complex, str, bytes, datetime, date, time, timedelta, Enum)
+try:
+    # noinspection PyUnresolvedReferences
+    _IMMUTABLES += (long, unicode)
+except NameError:
+    pass
+
+
+def _refuseChange(self, *args, **kwargs):
+    raise AttributeError("Attempt to modify a %s of a frozen entity" % thawedClass(self).__name__)
+
+
+def _readOnly(base, mutators, reduceArgs, thawed=None):
+    """
+    Read-only subclass of the given collection type, for the fields of the frozen entities: it still equals
+    the instances of the base, but the given mutators raise an AttributeError. Copies, pickles and clones as the
+    thawed type, the base by default.
+    """
+    thawed = base if thawed is None else thawed
+    members = dict((name, _refuseChange) for name in mutators if hasattr(base, name))
+    members['__slots__'] = ()
+    members[THAWED_ATTR] = thawed
+    members['__reduce_ex__'] = lambda self, protocol: (thawed, reduceArgs(self))
+    return type("Frozen" + thawed.__name__.capitalize(), (base,), members)
+
+
+_FrozenList = _readOnly(list, ('__setitem__', '__delitem__', '__setslice__', '__delslice__', '__iadd__', '__imul__',
+                               'append', 'extend', 'insert', 'pop', 'remove', 'reverse', 'sort', 'clear'),
+                        lambda self: (list(self),))
+_FrozenDeque = _readOnly(deque, ('__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'appendleft',
+                                 'extend', 'extendleft', 'insert', 'pop', 'popleft', 'remove', 'reverse', 'rotate',
+                                 'clear'),
+                         lambda self: (list(self), self.maxlen))
+_FrozenDict = _readOnly(dict, ('__setitem__', '__delitem__', 'clear', 'pop', 'popitem', 'setdefault', 'update'),
+                        lambda self: (dict(self),))
+# frozenset is immutable already, the subclass only tells a frozen set field from a frozenset one for the clones
+_FrozenSet = _readOnly(frozenset, (), lambda self: (list(self),), set)
+
+_FROZEN_COLLECTIONS = (_FrozenList, _FrozenDeque, _FrozenDict, _FrozenSet)
+
+
+def thawedClass(obj):
+    """
+    Generated class of the given entity, even if it's frozen or a COW clone; the mutable type of a read-only
+    collection of a frozen entity.
+    """
+    cls = type(obj)
+    return cls.__dict__.get(THAWED_ATTR, cls)
+
+
+def _isShareable(val):
+    return isinstance(val, _IMMUTABLES) or (isinstance(val, DataMetaEntity) and val.isFrozen())
+
+
+def _deepClone(src, dst, memo):
+    memo[id(src)] = dst
+    state = dst.__dict__
+    for k, v in src.__dict__.items():
+        if k != FROZEN_HASH_ATTR and k != COW_SHARED_ATTR: state[k] = _deepValue(v, memo)
+
+
+def _deepValue(val, memo):
+    if isinstance(val, _IMMUTABLES): return val
+    done = memo.get(id(val))
+    if done is not None: return done
+    t = thawedClass(val)
+    if isinstance(val, DataMetaEntity):
+        cls = thawedClass(val)
+        result = cls.__new__(cls)
+        _deepClone(val, result, memo)
+    elif t is list:
+        result = [_deepValue(v, memo) for v in val]
+    elif t is set or t is frozenset or t is tuple:
+        result = t(_deepValue(v, memo) for v in val)
+    elif t is deque:
+        result = deque((_deepValue(v, memo) for v in val), val.maxlen)
+    elif t is dict:
+        result = dict((_deepValue(k, memo), _deepValue(v, memo)) for k, v in val.items())
+    else:
+        return copy.deepcopy(val, memo)
+    memo[id(val)] = result
+    return result
+
+
+def _cowValue(val):
+    """
+    One level copy of a shared value for a COW clone: nested entities become COW clones themselves.
+    """
+    if _isShareable(val): return val
+    if isinstance(val, DataMetaEntity): return val.clone(DataMetaEntity.CloneMode.COW)
+    t = thawedClass(val)
+    if t is list: return [_cowValue(v) for v in val]
+    if t is set or t is frozenset or t is tuple: return t(_cowValue(v) for v in val)
+    if t is deque: return deque((_cowValue(v) for v in val), val.maxlen)
+    if t is dict: return dict((_cowValue(k), _cowValue(v)) for k, v in val.items())
+    return copy.copy(val)
+
+
+def _shareFrom(src, cls, shared):
+    """
+    Switches the source of a COW clone to the COW mode for the given shared fields, on top of those it shares already.
+    """
+    state = src.__dict__
+    mine = state.get(COW_SHARED_ATTR)
+    if mine is None:
+        state[COW_SHARED_ATTR] = set(shared)
+        src.__class__ = _cowClass(cls)
+    else:
+        mine.update(shared)
+
+
+def _ownAll(obj):
+    """
+    Makes a COW clone stop sharing anything with its source.
+    """
+    state = obj.__dict__
+    for k in state.pop(COW_SHARED_ATTR):
+        state[k] = _cowValue(state[k])
+    obj.__class__ = thawedClass(obj)
+
+
+def _frozenValue(val):
+    """
+    The given field value for a frozen entity: nested entities frozen in place, collections as read-only copies.
+    """
+    if isinstance(val, DataMetaEntity): return val.freeze()
+    t = type(val)
+    if t in _FROZEN_COLLECTIONS: return val
+    if t is list: return _FrozenList(_frozenValue(v) for v in val)
+    if t is set: return _FrozenSet(_frozenValue(v) for v in val)
+    if t is deque: return _FrozenDeque((_frozenValue(v) for v in val), val.maxlen)
+    if t is dict: return _FrozenDict((_frozenValue(k), _frozenValue(v)) for k, v in val.items())
+    if t is tuple or t is frozenset: return t(_frozenValue(v) for v in val)
+    return val
+
+
+def _unpickleFrozen(cls, state):
+    obj = cls.__new__(cls)
+    obj.__dict__.update(state)
+    return obj.freeze()
+
+
+def _unpickleThawed(cls, state):
+    obj = cls.__new__(cls)
+    obj.__dict__.update(state)
+    return obj
+
+
+def _derivedClass(cls, members):
+    """
+    Derives a class from the given generated one, with the given members overriding.
+    """
+    def __eq__(self, other):
+        # The generated __eq__ requires the other to be an instance of type(self), hence for an other of the same
+        # generated class, thawed or of another derived class like a frozen vs a COW one, flip it to a thawed one
+        if type(other) is not type(self) and thawedClass(other) is cls:
+            if type(other) is not cls:
+                view = cls.__new__(cls)
+                view.__dict__ = other.__dict__ # shares the fields, copies nothing
+                other = view
+            return cls.__eq__(other, self)
+        return cls.__eq__(self, other)
+
+    # keep the __hash__ explicitly, Python 3 drops it from a class that overrides __eq__
+    body = {'__module__': cls.__module__, '__doc__': cls.__doc__, '__eq__': __eq__, '__hash__': cls.__hash__,
+            THAWED_ATTR: cls}
+    body.update(members)
+    return type(cls)(cls.__name__, (cls,), body)
+
+
+def _frozenClass(cls):
+    frozen = _FROZEN_CLASSES.get(cls)
+    if frozen is not None: return frozen
+
+    prefix = "_%s__" % cls.__name__
+
+    def __setattr__(self, name, val):
+        raise AttributeError("Attempt to set the field \"%s\" on a frozen instance of %s" % (
+            name[len(prefix):] if name.startswith(prefix) else name, cls.__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("Attempt to delete the field \"%s\" on a frozen instance of %s" % (
+            name[len(prefix):] if name.startswith(prefix) else name, cls.__name__))
+
+    def __hash__(self):
+        return self.__dict__[FROZEN_HASH_ATTR]
+
+    def __reduce_ex__(self, protocol):
+        state = dict(self.__dict__)
+        del state[FROZEN_HASH_ATTR]
+        return _unpickleFrozen, (cls, state)
+
+    frozen = _derivedClass(cls, {'__setattr__': __setattr__, '__delattr__': __delattr__, '__hash__': __hash__,
+                                 '__reduce_ex__': __reduce_ex__, 'isFrozen': lambda self: True})
+    _FROZEN_CLASSES[cls] = frozen
+    return frozen
+
+
+def _cowClass(cls):
+    cow = _COW_CLASSES.get(cls)
+    if cow is not None: return cow
+
+    def cowGetter(attr, getter):
+        def get(self):
+            state = self.__dict__
+            shared = state[COW_SHARED_ATTR]
+            if attr in shared:
+                state[attr] = _cowValue(state[attr])
+                shared.discard(attr)
+                # nothing left to share: back to the generated class, no more overhead
+                if not shared:
+                    del state[COW_SHARED_ATTR]
+                    self.__class__ = cls
+            return getter(self)
+        return get
+
+    def cowSetter(attr, setter):
+        def set(self, val):
+            setter(self, val)
+            shared = self.__dict__.get(COW_SHARED_ATTR)
+            if shared is not None and attr in shared:
+                shared.discard(attr)
+                if not shared:
+                    del self.__dict__[COW_SHARED_ATTR]
+                    self.__class__ = cls
+        return set
+
+    def __reduce_ex__(self, protocol):
+        state = dict(self.__dict__)
+        del state[COW_SHARED_ATTR]
+        return _unpickleThawed, (cls, state)
+
+    members = {'__reduce_ex__': __reduce_ex__}
+    desc = EntityDescriptor.of(cls)
+    for attr, getter, setter in zip(desc.attrs, desc.getters, desc.setters):
+        if hasattr(cls, getter): members[getter] = cowGetter(attr, getattr(cls, getter))
+        if hasattr(cls, setter): members[setter] = cowSetter(attr, getattr(cls, setter))
+
+    cow = _derivedClass(cls, members)
+    _COW_CLASSES[cls] = cow
+    return cow
+
+
+def freezeOnVerify(cls):
+    """
+    Opts the given generated class into the frozen mode: every successful verify() freezes the instance.
+    Returns the class, can be used as a class decorator.
+    """
+    verify = cls.verify
+    if getattr(verify, "freezesOnVerify", False): return cls
+
+    def verifyAndFreeze(self):
+        verify(self)
+        self.freeze()
+
+    verifyAndFreeze.freezesOnVerify = True
+    cls.verify = verifyAndFreeze
+    return cls
+
 
 # noinspection PyClassHasNoInit
 class Verifiable(DataMetaEntity):
@@ -84,11 +556,13 @@ class DateTime():
 
 # Implementation of a Semantic Version for DataMeta, see http://semver.org
 # noinspection PyCompatibility
-class SemVer():
+class SemVer(object):
     DiffLevel = Enum("DiffLevel", "NONE MAJOR MINOR UPDATE BUILD")
     # Split by dots pattern
     DOTS_SPLIT = re.compile(r"\.")
     DIGITS = re.compile(r"^[0-9]+$")
+    # Same as the DIGITS, without the regex
+    DIGIT_CHARS = "0123456789"
 
     # Major part index in the @items array
     MAJOR_INDEX = 0
@@ -103,30 +577,58 @@ class SemVer():
     # Max size of the @items array
     ITEMS_MAX_SIZE = BUILD_INDEX + 1
 
-    # Equality for the __cmp__ method
+    # Three-way comparison results, by the sign as the cmp() returns them, for the callers that compare three-way.
+    # The instances themselves compare by the rich comparisons, __lt__ and the rest, on their sortKey() tuples.
+    # Equal sortKey()
     EQ = 0
-    # Strictly "greater than" for the __cmp__ method
+    # Strictly "greater than" by the sortKey()
     GT = 1
-    # Strictly "lesser than" for the __cmp__ method
+    # Strictly "lesser than" by the sortKey()
     LT = -1
 
+    # How many distinct sources the SemVer.of keeps
+    INTERN_MAX = 4096
+    _interned = {}
+
+    __slots__ = ("_source", "_items", "_semanticPartsOnly", "_sortKey", "_hash")
+
     def __init__(self, src):
         if src is None: raise AttributeError("Atempted to create an instance of %s from None" % self.__class__.__name__)
         self._source = src
-        self._items = []
-        for x, v in enumerate(re.split(SemVer.DOTS_SPLIT, self._source)):
-            if re.match(SemVer.DIGITS, v):
-                self._items.append(int(v))
+        items = []
+        for v in src.split("."):
+            if SemVer._isDigits(v):
+                items.append(int(v))
             else:
                 break
 
-        if len(self._items) < SemVer.ITEMS_MIN_SIZE or len(self._items) > SemVer.ITEMS_MAX_SIZE:
+        if len(items) < SemVer.ITEMS_MIN_SIZE or len(items) > SemVer.ITEMS_MAX_SIZE:
             raise AttributeError("Invalid semantic version format: %s" % self._source)
 
-        if self.build is None or self.build == 0:
-            raise AttributeError("Invalid semantic version format: %s: build version can not be zero" % self._source)
+        self._items = tuple(items)
+        self._semanticPartsOnly = '.'.join(map(str, items))
+        build = self.build()
+        # no build sorts before any build
+        self._sortKey = self._items[:SemVer.ITEMS_MIN_SIZE] + (build is not None, build or 0)
+        self._hash = hash(self._items)
 
-        self._semanticPartsOnly = '.'.join(map(str, self._items))
+    @staticmethod
+    def _isDigits(v):
+        # the DIGITS regex: the $ also matches before the trailing newline
+        if v.endswith("\n"): v = v[:-1]
+        return len(v) > 0 and not v.strip(SemVer.DIGIT_CHARS)
+
+    @staticmethod
+    def of(src):
+        """
+        Shared instance for the given source, parsed only the first time; a SemVer passes through as is.
+        """
+        if isinstance(src, SemVer): return src
+        ver = SemVer._interned.get(src)
+        if ver is None:
+            ver = SemVer(src)
+            if len(SemVer._interned) < SemVer.INTERN_MAX: SemVer._interned[src] = ver
+        return ver
 
 # Consistently and reproducibly convert the version specs to the text suitable for making it a part of a class name or a
 # variable name
@@ -134,7 +636,14 @@ class SemVer():
         return '_'.join(map(str, self._items))
 
     def items(self):
-        return self._items
+        # a copy: the tuple behind it is hashed and shared by the interned instances
+        return list(self._items)
+
+    def sortKey(self):
+        """
+        The tuple that orders the versions like the comparisons do: (major, minor, update, has build, build).
+        """
+        return self._sortKey
 
     def semanticPartsOnly(self):
         return self._semanticPartsOnly
@@ -155,44 +664,55 @@ class SemVer():
         return self._items[SemVer.BUILD_INDEX] if len(self._items) > SemVer.BUILD_INDEX else None
 
     def diffLevel(self, other):
+        if self._items == other._items: return SemVer.DiffLevel.NONE
         if self.major() != other.major(): return SemVer.DiffLevel.MAJOR
         if self.minor() != other.minor(): return SemVer.DiffLevel.MINOR
         if self.update() != other.update(): return SemVer.DiffLevel.UPDATE
-
-        if(
-                (self.build() is not None and other.build() is not None and cmp(self.build(), other.build()) != SemVer.EQ)
-            or
-                (self.build() is None and other.build() is not None)
-            or
-                (self.build() is not None and other.build() is None)
-        ):
-            return SemVer.DiffLevel.BUILD
-        return SemVer.DiffLevel.NONE
+        return SemVer.DiffLevel.BUILD
 
     def __eq__(self, other):
-        return self._items == other.items()
+        if self is other: return True
+        if not isinstance(other, SemVer): return NotImplemented
+        return self._items == other._items
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
 
     def __hash__(self):
-        return hash(str(self._items))
+        return self._hash
 
-    def __cmp__(self, o):
-        if o is None:
-            raise AttributeError, "Attempt to compare %s (%s) to a None" % (self.__class__.__name__, self)
+    def __lt__(self, o):
+        if not isinstance(o, SemVer): return NotImplemented
+        return self._sortKey < o._sortKey
 
-        for x in xrange(SemVer.ITEMS_MIN_SIZE):
-            c = cmp(self._items[x], o.items()[x])
-            if c != SemVer.EQ: return c
+    def __le__(self, o):
+        if not isinstance(o, SemVer): return NotImplemented
+        return self._sortKey <= o._sortKey
 
-        if len(self._items) > len(o.items()): return SemVer.GT
+    def __gt__(self, o):
+        if not isinstance(o, SemVer): return NotImplemented
+        return self._sortKey > o._sortKey
 
-        if len(self._items) < len(o.items()): return SemVer.LT
+    def __ge__(self, o):
+        if not isinstance(o, SemVer): return NotImplemented
+        return self._sortKey >= o._sortKey
 
-        return cmp(self.build(), o.build())
+    def __reduce__(self):
+        # slots and no __dict__: pickle by the source, interned on the way back
+        return _unpickleSemVer, (self._source,)
 
     def __str__(self):
         return self._source
 
+    def __repr__(self):
+        return self.longStr()
+
     def longStr(self):
         return "%s{%s(%s)}" %(self.__class__.__name__, self._source, self._semanticPartsOnly)
 
 
+def _unpickleSemVer(src):
+    return SemVer.of(src)
+
+
@@ -27,3 +27,6 @@ class CannedRe(object):
 
     CANNED_RES = {PHONE_KEY: PHONE, EMAIL_KEY: EMAIL, UUID_KEY_LOWER: UUID, UUID_KEY_UPPER: UUID}
 
+    # The canned checks keyed the same way as the CANNED_RES: the bound match of the compiled patterns, a Python level
+    # pre-filter costs more than the C regex engine takes on strings this short
+    CANNED_CHECKS = dict((key, rx.match) for key, rx in CANNED_RES.items())
@@ -0,0 +1,206 @@
+#!/bin/env python
+
+import json
+import os
+from operator import attrgetter
+
+import numpy
+
+from ebay_datameta_core.base import EntityDescriptor, thawedClass
+from ebay_datameta_core.structured import StructuredArrays
+
+
+class ColumnarStore(object):
+    """
+    On-disk columnar store of the entities of one class, for the reference datasets that get reloaded often.
+
+    Layout: a directory per fully qualified class name and per entity VERSION under the store root, so that many
+    classes can share one root, with the manifest.json in it and per field:
+    * <field>.col - fixed width values: ints, floats, bools, datetimes, see the StructuredArrays for the types
+    * <field>.off and <field>.dat - strings: int64 offsets, one more than there are records, and the string bytes
+    * <field>.valid - validity bitmap for the optional fields, most significant bit first, set where there is a value
+
+    Opening reads just the manifest, the column files are memory-mapped on the first access and stay shared between
+    the processes that map them. Column scans are zero-copy NumPy views; entities get built one row at a time, on demand.
+    Only primitive fields are supported: numbers, bools, datetimes and strings.
+    """
+
+    MANIFEST = "manifest.json"
+    FORMAT_VERSION = 1
+
+    FIXED = "fixed"
+    STRING = "string"
+
+    @staticmethod
+    def write(root, records, cls=None, types=None):
+        """
+        Writes the given entities of one class to the store under the given root directory, replacing the
+        files of the same VERSION, if any. The types are the optional dtype overrides keyed by the field name.
+        Returns the opened store.
+        """
+        if not isinstance(records, (list, tuple)): records = list(records)
+        if cls is None:
+            if not records: raise AttributeError("Can not derive the class of the records from an empty list")
+            cls = thawedClass(records[0])
+        path = ColumnarStore._pathOf(root, cls)
+        if not os.path.isdir(path): os.makedirs(path)
+
+        desc = EntityDescriptor.of(cls)
+        dtype = StructuredArrays.dtypeOf(cls, records, types, fixedStrings=False)
+        count = len(records)
+        fields = []
+        for field, attr, required in zip(desc.fields, desc.attrs, desc.required):
+            dt = dtype.fields[field][0]
+            vals = list(map(attrgetter(attr), records))
+            valid = None if required else numpy.fromiter((v is not None for v in vals), numpy.bool_, count)
+            spec = {'name': field, 'nullable': not required}
+            if dt.kind == 'O':
+                present = [v for v in vals if v is not None]
+                isBytes = all(isinstance(v, bytes) for v in present)
+                if not isBytes and not all(isinstance(v, _TEXTS) for v in present):
+                    raise AttributeError("%s.%s: only primitive fields can be stored, got %s" % (
+                        cls.__name__, field, type(present[0]).__name__))
+                data = [b'' if v is None else (v if isBytes else v.encode('utf-8')) for v in vals]
+                offsets = numpy.zeros(count + 1, dtype='<i8')
+                numpy.cumsum([len(d) for d in data], out=offsets[1:])
+                offsets.tofile(os.path.join(path, field + ".off"))
+                with open(os.path.join(path, field + ".dat"), "wb") as out:
+                    out.write(b''.join(data))
+                spec.update({'kind': ColumnarStore.STRING, 'text': not isBytes})
+            else:
+                if valid is not None and not valid.all():
+                    fill = StructuredArrays.FILLS.get(dt.kind)
+                    vals = [fill if v is None else v for v in vals]
+                numpy.array(vals, dtype=dt).tofile(os.path.join(path, field + ".col"))
+                spec.update({'kind': ColumnarStore.FIXED, 'dtype': dt.str})
+            if valid is not None:
+                numpy.packbits(valid).tofile(os.path.join(path, field + ".valid"))
+            fields.append(spec)
+
+        manifest = {'format': ColumnarStore.FORMAT_VERSION, 'class': ColumnarStore._className(cls),
+                    'version': cls.VERSION, 'count': count, 'fields': fields}
+        with open(os.path.join(path, ColumnarStore.MANIFEST), "w") as out:
+            json.dump(manifest, out, indent=1, sort_keys=True)
+        return ColumnarStore(root, cls)
+
+    @staticmethod
+    def _className(cls):
+        # the generated class, not the frozen or the COW one deriving from it
+        cls = EntityDescriptor.of(cls).cls
+        return "%s.%s" % (cls.__module__, cls.__name__)
+
+    @staticmethod
+    def _pathOf(root, cls):
+        return os.path.join(root, ColumnarStore._className(cls), cls.VERSION)
+
+    def __init__(self, root, cls):
+        """
+        Opens the store of the given class' VERSION under the given root directory.
+        """
+        self._cls = cls
+        self._path = ColumnarStore._pathOf(root, cls)
+        with open(os.path.join(self._path, ColumnarStore.MANIFEST)) as src:
+            manifest = json.load(src)
+        if manifest['class'] != ColumnarStore._className(cls):
+            raise AttributeError("Store at %s holds the class %s, not %s" % (
+                self._path, manifest['class'], ColumnarStore._className(cls)))
+        if manifest['version'] != cls.VERSION:
+            raise AttributeError("Store at %s holds the version %s, not %s" % (
+                self._path, manifest['version'], cls.VERSION))
+        self._count = manifest['count']
+        self._specs = dict((f['name'], f) for f in manifest['fields'])
+        self._fields = EntityDescriptor.of(cls).fields
+        for field in self._fields:
+            if field not in self._specs:
+                raise AttributeError("Store at %s has no field %s.%s" % (self._path, cls.__name__, field))
+        self._maps = {} # memory maps by the file name
+
+    def __len__(self):
+        return self._count
+
+    def fields(self):
+        return self._fields
+
+    def _map(self, name, dtype):
+        arr = self._maps.get(name)
+        if arr is None:
+            # can't map an empty file
+            arr = numpy.memmap(os.path.join(self._path, name), dtype=dtype, mode='r') \
+                if os.path.getsize(os.path.join(self._path, name)) > 0 else numpy.empty(0, dtype=dtype)
+            self._maps[name] = arr
+        return arr
+
+    def _spec(self, field):
+        spec = self._specs.get(field)
+        if spec is None: raise AttributeError("No field %s.%s in the store" % (self._cls.__name__, field))
+        return spec
+
+    def column(self, field):
+        """
+        Zero-copy view of the fixed width column of the given field; the values of the nulls are the fill values.
+        """
+        spec = self._spec(field)
+        if spec['kind'] != ColumnarStore.FIXED: raise AttributeError("%s is not a fixed width column" % field)
+        return self._map(field + ".col", numpy.dtype(str(spec['dtype'])))
+
+    def stringColumn(self, field):
+        """
+        Zero-copy views of the string column of the given field: the offsets and the bytes, the value of the record
+        number i is the data[offsets[i]:offsets[i + 1]].
+        """
+        spec = self._spec(field)
+        if spec['kind'] != ColumnarStore.STRING: raise AttributeError("%s is not a string column" % field)
+        return self._map(field + ".off", numpy.dtype('<i8')), self._map(field + ".dat", numpy.uint8)
+
+    def validityBitmap(self, field):
+        """
+        Zero-copy view of the packed validity bitmap of the given optional field, None for a required one.
+        """
+        if not self._spec(field)['nullable']: return None
+        return self._map(field + ".valid", numpy.uint8)
+
+    def valid(self, field):
+        """
+        Boolean array, True for the records that have the given field set.
+        """
+        bitmap = self.validityBitmap(field)
+        if bitmap is None: return numpy.ones(self._count, dtype=numpy.bool_)
+        return numpy.unpackbits(bitmap)[:self._count].astype(numpy.bool_)
+
+    def value(self, field, index):
+        spec = self._spec(field)
+        if spec['nullable']:
+            bitmap = self.validityBitmap(field)
+            if not (bitmap[index >> 3] >> (7 - (index & 7))) & 1: return None
+        if spec['kind'] == ColumnarStore.FIXED:
+            val = self.column(field)[index]
+            # datetime64[ms] item is the datetime
+            return val.astype(object) if val.dtype.kind == 'M' else val.item()
+        offsets, data = self.stringColumn(field)
+        raw = data[offsets[index]:offsets[index + 1]].tobytes()
+        return raw.decode('utf-8') if spec['text'] else raw
+
+    def row(self, index):
+        """
+        Builds the entity of the given record number.
+        """
+        if index < 0: index += self._count
+        if index < 0 or index >= self._count: raise IndexError("Record %d out of %d" % (index, self._count))
+        return self._cls.fromTuple(tuple(self.value(f, index) for f in self._fields))
+
+    def __getitem__(self, index):
+        return self.row(index)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self.row(i)
+
+    def close(self):
+        self._maps.clear()
+
+
+try:
+    # noinspection PyUnresolvedReferences
+    _TEXTS = (unicode,)
+except NameError:
+    _TEXTS = (str,)
@@ -0,0 +1,208 @@
+#!/bin/env python
+
+import sys
+import types
+from collections import deque
+from enum import Enum
+
+try:
+    import tracemalloc
+except ImportError: # Python 2
+    tracemalloc = None
+
+from ebay_datameta_core.base import DataMetaEntity, EntityDescriptor
+
+# the instance itself and its attribute dict, the per field breakdown lists it under this pseudo-field
+OBJECT = "<object>"
+
+# shared by the whole program rather than owned by the entities: never counted
+_NOT_OWNED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType, Enum)
+if sys.version_info[0] < 3: _NOT_OWNED += (types.ClassType,)
+
+
+def _slotValues(obj):
+    """
+    Values of the __slots__ of the given object that are set, by the slots of all its classes.
+    """
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get('__slots__', ())
+        if isinstance(slots, str): slots = (slots,)
+        for name in slots:
+            if name in ('__dict__', '__weakref__'): continue
+            if name.startswith('__') and not name.endswith('__'): name = "_%s%s" % (cls.__name__.lstrip('_'), name)
+            try:
+                yield getattr(obj, name)
+            except AttributeError: # never set
+                pass
+
+
+class Footprint(object):
+    """
+    Memory accounting of the in-memory populations of the DataMetaEntity graphs: the deep sizes by the sys.getsizeof
+    of everything an entity holds, per instance, per class and per field, the collections and the nested entities
+    included.
+
+    Every object gets counted once per Footprint: the objects shared between the fields or between the entities,
+    like the values from the CanonicalPool, count toward where they were met first and are free after that. The
+    objects are remembered by their ids, hence the population must stay in memory while it is being added, which is
+    the case for the caches it's meant for. The classes, the functions, the modules and the enum members are shared
+    by the whole program and never counted.
+
+    The class numbers cover the nested entities too, with their deep sizes, so do the field numbers of their classes,
+    hence the nested bytes show both in the outer field and in the inner class. The population numbers are only
+    of the entities added.
+
+    Usage:
+        footprint = Footprint().addAll(cache.values())
+        print(footprint.format())
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.instances = 0
+        self.bytes = 0
+        self.minBytes = None
+        self.maxBytes = 0
+        self._seen = set()
+        self._classes = {} # class name -> [count, bytes, min, max]
+        self._fields = {} # Class.field -> [count, bytes]
+
+    def add(self, entity):
+        """
+        Accounts for the given entity, returns the bytes it added: its deep size less whatever was counted before.
+        An entity counted before, added or nested in one added, adds nothing and is not counted in the population
+        again.
+        """
+        if id(entity) in self._seen: return 0
+        size = self._deep(entity)
+        self.instances += 1
+        self.bytes += size
+        self.maxBytes = max(self.maxBytes, size)
+        self.minBytes = size if self.minBytes is None else min(self.minBytes, size)
+        return size
+
+    def addAll(self, entities):
+        for entity in entities:
+            self.add(entity)
+        return self
+
+    def sizeOf(self, obj):
+        """
+        Deep size of any object not counted before; does not count as a population member.
+        """
+        return self._deep(obj)
+
+    @staticmethod
+    def deepSizeOf(obj):
+        """
+        Deep size of the given object on its own.
+        """
+        return Footprint().sizeOf(obj)
+
+    def _deep(self, obj):
+        if id(obj) in self._seen or isinstance(obj, _NOT_OWNED): return 0
+        self._seen.add(id(obj))
+        if isinstance(obj, DataMetaEntity): return self._entity(obj)
+        size = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            for key, val in obj.items():
+                size += self._deep(key) + self._deep(val)
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            for val in obj:
+                size += self._deep(val)
+        else:
+            if hasattr(obj, '__dict__'): size += self._deep(obj.__dict__)
+            for val in _slotValues(obj):
+                size += self._deep(val)
+        return size
+
+    def _entity(self, entity):
+        cls = entity.__class__
+        desc = EntityDescriptor.of(cls)
+        name = desc.cls.__name__
+        state = entity.__dict__
+        own = sys.getsizeof(entity)
+        if id(state) not in self._seen:
+            self._seen.add(id(state))
+            own += sys.getsizeof(state)
+        self._addField(name, OBJECT, own)
+        size = own
+        for field, attr in zip(desc.fields, desc.attrs):
+            fieldSize = self._deep(state.get(attr))
+            self._addField(name, field, fieldSize)
+            size += fieldSize
+        # whatever else the derived classes keep, like the frozen flag
+        for attr, val in state.items():
+            if attr not in desc.attrs:
+                extra = self._deep(val)
+                self._addField(name, OBJECT, extra, count=False)
+                size += extra
+        stats = self._classes.get(name)
+        if stats is None: self._classes[name] = [1, size, size, size]
+        else:
+            stats[0] += 1
+            stats[1] += size
+            stats[2] = min(stats[2], size)
+            stats[3] = max(stats[3], size)
+        return size
+
+    def _addField(self, name, field, size, count=True):
+        key = "%s.%s" % (name, field)
+        stats = self._fields.get(key)
+        if stats is None: stats = self._fields[key] = [0, 0]
+        if count: stats[0] += 1
+        stats[1] += size
+
+    def report(self):
+        """
+        The numbers as a dict:
+            instances, bytes, meanBytes, minBytes, maxBytes - of the entities added
+            classes - by the class name, the dicts with the count, bytes, meanBytes, minBytes and maxBytes
+            fields - by the Class.field, the dicts with the count and the bytes; the Class.<object> is the instances
+                themselves
+        """
+        def mean(total, count):
+            return total / float(count) if count else 0.0
+        return {
+            'instances': self.instances, 'bytes': self.bytes, 'meanBytes': mean(self.bytes, self.instances),
+            'minBytes': self.minBytes or 0, 'maxBytes': self.maxBytes,
+            'classes': dict((name, {'count': s[0], 'bytes': s[1], 'meanBytes': mean(s[1], s[0]), 'minBytes': s[2],
+                                    'maxBytes': s[3]}) for name, s in self._classes.items()),
+            'fields': dict((key, {'count': s[0], 'bytes': s[1]}) for key, s in self._fields.items()),
+        }
+
+    def format(self):
+        """
+        The report as the text tables, the biggest first.
+        """
+        report = self.report()
+        lines = ["%d entities, %d bytes, %.1f bytes/entity, %d to %d" % (
+            report['instances'], report['bytes'], report['meanBytes'], report['minBytes'], report['maxBytes']),
+            "%-40s %10s %14s %12s" % ("class", "count", "bytes", "mean")]
+        for name, s in sorted(report['classes'].items(), key=lambda item: -item[1]['bytes']):
+            lines.append("%-40s %10d %14d %12.1f" % (name, s['count'], s['bytes'], s['meanBytes']))
+        lines.append("%-40s %10s %14s %12s" % ("field", "count", "bytes", "mean"))
+        for key, s in sorted(report['fields'].items(), key=lambda item: -item[1]['bytes']):
+            lines.append("%-40s %10d %14d %12.1f" % (key, s['count'], s['bytes'], s['bytes'] / float(s['count'] or 1)))
+        return "\n".join(lines)
+
+    @staticmethod
+    def allocations(fn, *args):
+        """
+        Calls the given function with the given arguments under the tracemalloc, for instance a decode, returns
+        its result and the dict with the bytes it left allocated, 'current', and the highest it got to, 'peak'.
+        Python 3 only, raises the AttributeError on the Python 2. The tracing slows the call down several times.
+        """
+        if tracemalloc is None: raise AttributeError("The tracemalloc needs Python 3.4 or later")
+        wasTracing = tracemalloc.is_tracing()
+        if not wasTracing: tracemalloc.start()
+        try:
+            if hasattr(tracemalloc, 'reset_peak'): tracemalloc.reset_peak() # Python 3.9+
+            before = tracemalloc.get_traced_memory()[0]
+            result = fn(*args)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if not wasTracing: tracemalloc.stop()
+        return result, {'current': current - before, 'peak': max(peak - before, 0)}
@@ -0,0 +1,225 @@
+#!/bin/env python
+
+from bisect import bisect_left, bisect_right
+
+from ebay_datameta_core.base import EntityDescriptor, SemVer
+
+
+class IdentityIndex(object):
+    """
+    In-memory collection of the entities of one class keyed by their identity, the fields that the generated __eq__
+    and __hash__ cover, see the EntityDescriptor.keyFields. Lookups take the raw key tuple, no need to build
+    a prototype entity to find one.
+
+    Optional secondary hash indexes on non-key fields map a field value to all the entities having it.
+
+    The index does not watch the entities: if a key or an indexed field of an indexed entity changes, upsert it again,
+    or freeze the entities before indexing them.
+    """
+
+    def __init__(self, cls, secondary=()):
+        self._cls = cls
+        self._desc = EntityDescriptor.of(cls)
+        self._keyOf = self._desc.keyOf
+        self._byKey = {}
+        # field name -> (attribute name, {field value -> {key -> entity}}, {key -> field value as indexed})
+        self._secondary = {}
+        for field in secondary:
+            self.addSecondary(field)
+
+    def keyFields(self):
+        return self._desc.keyFields
+
+    def keyOf(self, entity):
+        return self._keyOf(entity)
+
+    def __len__(self):
+        return len(self._byKey)
+
+    def __contains__(self, key):
+        return key in self._byKey
+
+    def __iter__(self):
+        return iter(self._byKey.values())
+
+    def keys(self):
+        return self._byKey.keys()
+
+    def get(self, key, default=None):
+        """
+        The entity with the given identity key tuple, like (a, b, c) for the MultiFieldId, or the default.
+        """
+        return self._byKey.get(key, default)
+
+    def upsert(self, entity):
+        """
+        Adds the given entity or replaces the one with the same key. Returns the replaced one or None.
+        """
+        key = self._keyOf(entity)
+        old = self._byKey.get(key)
+        self._byKey[key] = entity
+        if self._secondary:
+            if old is not None: self._unindex(key)
+            self._index(key, entity)
+        return old
+
+    def delete(self, key):
+        """
+        Removes the entity with the given key tuple, returns it or None if there was none.
+        """
+        old = self._byKey.pop(key, None)
+        if old is not None and self._secondary: self._unindex(key)
+        return old
+
+    def load(self, records):
+        """
+        Upserts all the entities from the given iterable, returns how many new keys that added.
+        """
+        before = len(self._byKey)
+        if self._secondary:
+            for e in records:
+                self.upsert(e)
+        else:
+            keyOf = self._keyOf
+            self._byKey.update((keyOf(e), e) for e in records)
+        return len(self._byKey) - before
+
+    def addSecondary(self, field):
+        """
+        Adds the secondary hash index on the given field and indexes the entities already in.
+        """
+        attr = self._desc.attrOf.get(field)
+        if attr is None: raise AttributeError("%s: unknown field \"%s\"" % (self._cls.__name__, field))
+        if field in self._secondary: return
+        index = (attr, {}, {})
+        self._secondary[field] = index
+        for key, entity in self._byKey.items():
+            self._indexOne(index, key, entity)
+
+    def find(self, field, value):
+        """
+        List of the entities that have the given value in the given field, which must have a secondary index.
+        """
+        index = self._secondary.get(field)
+        if index is None: raise AttributeError("No secondary index on %s.%s" % (self._cls.__name__, field))
+        bucket = index[1].get(value)
+        return list(bucket.values()) if bucket else []
+
+    @staticmethod
+    def _indexOne(index, key, entity):
+        attr, buckets, indexed = index
+        val = getattr(entity, attr)
+        buckets.setdefault(val, {})[key] = entity
+        indexed[key] = val
+
+    def _index(self, key, entity):
+        for index in self._secondary.values():
+            IdentityIndex._indexOne(index, key, entity)
+
+    def _unindex(self, key):
+        # by the value it was indexed with, the entity could have changed since
+        for attr, buckets, indexed in self._secondary.values():
+            val = indexed.pop(key)
+            bucket = buckets[val]
+            del bucket[key]
+            if not bucket: del buckets[val]
+
+
+class SemVerIndex(object):
+    """
+    Sorted catalog of the versions, by the SemVer.sortKey, for the O(log n) lookups by bisection:
+    the exact version, the highest one compatible with the given at a DiffLevel, and the ranges.
+    The versions can be given either as the SemVers or as their strings.
+    """
+
+    def __init__(self, versions=()):
+        self._keys = [] # sort keys, in order
+        self._versions = [] # the SemVers, in the same order
+        self.load(versions)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(self._versions)
+
+    def __contains__(self, ver):
+        return self.exact(ver) is not None
+
+    def add(self, ver):
+        """
+        Adds the given version unless an equal one is already in, returns True if it was added.
+        """
+        ver = SemVer.of(ver)
+        key = ver.sortKey()
+        ix = bisect_left(self._keys, key)
+        if ix < len(self._keys) and self._keys[ix] == key: return False
+        self._keys.insert(ix, key)
+        self._versions.insert(ix, ver)
+        return True
+
+    def load(self, versions):
+        """
+        Adds all the given versions in one sort, returns how many were new.
+        """
+        before = len(self._keys)
+        byKey = dict(zip(self._keys, self._versions))
+        for ver in versions:
+            ver = SemVer.of(ver)
+            byKey.setdefault(ver.sortKey(), ver)
+        self._keys = sorted(byKey)
+        self._versions = [byKey[k] for k in self._keys]
+        return len(self._keys) - before
+
+    def remove(self, ver):
+        """
+        Removes the version equal to the given one, returns it or None if there was none.
+        """
+        ix = self._find(SemVer.of(ver).sortKey())
+        if ix is None: return None
+        del self._keys[ix]
+        return self._versions.pop(ix)
+
+    def _find(self, key):
+        ix = bisect_left(self._keys, key)
+        return ix if ix < len(self._keys) and self._keys[ix] == key else None
+
+    def exact(self, ver):
+        """
+        The registered version equal to the given one, or None.
+        """
+        ix = self._find(SemVer.of(ver).sortKey())
+        return None if ix is None else self._versions[ix]
+
+    def highestCompatible(self, ver, level=SemVer.DiffLevel.UPDATE):
+        """
+        The highest registered version that matches the given one down to the given level, or None:
+        MAJOR - the same major; MINOR - the same major and minor; UPDATE - the same major, minor and update, any build;
+        BUILD or NONE - the equal one.
+        """
+        ver = SemVer.of(ver)
+        size = _PREFIX_SIZES.get(level)
+        if size is None: return self.exact(ver)
+        prefix = ver.sortKey()[:size]
+        ix = bisect_left(self._keys, prefix[:-1] + (prefix[-1] + 1,)) - 1
+        if ix >= 0 and self._keys[ix][:size] == prefix: return self._versions[ix]
+        return None
+
+    def builds(self, ver):
+        """
+        All the registered versions with the same major, minor and update as the given one, in order.
+        """
+        prefix = SemVer.of(ver).sortKey()[:SemVer.ITEMS_MIN_SIZE]
+        return self._versions[bisect_left(self._keys, prefix):
+                              bisect_left(self._keys, prefix[:-1] + (prefix[-1] + 1,))]
+
+    def between(self, low, high):
+        """
+        All the registered versions from the low one to the high one, both inclusive, in order.
+        """
+        return self._versions[bisect_left(self._keys, SemVer.of(low).sortKey()):
+                              bisect_right(self._keys, SemVer.of(high).sortKey())]
+
+
+# how many of the SemVer.items to match for the SemVerIndex.highestCompatible
+_PREFIX_SIZES = {SemVer.DiffLevel.MAJOR: 1, SemVer.DiffLevel.MINOR: 2, SemVer.DiffLevel.UPDATE: 3}
@@ -0,0 +1,135 @@
+#!/bin/env python
+
+import heapq
+
+from ebay_datameta_core.base import Migrator, SemVer
+
+# Types of the entity names: on Python 2, a name can come as the unicode too
+_NAMES = (str,)
+try:
+    # noinspection PyUnresolvedReferences
+    _NAMES += (unicode,)
+except NameError:
+    pass
+
+
+class MigrationPlan(Migrator):
+    """
+    Compiled chain of the migrators taking an entity from one version to another, see the MigratorRegistry.plan.
+    The identity plan, with no steps, returns the source as is.
+    """
+
+    def __init__(self, entity, fromVer, toVer, steps=(), cost=0):
+        self.entity = entity
+        self.fromVer = fromVer
+        self.toVer = toVer
+        self.steps = tuple(steps)
+        self.cost = cost
+
+    def isIdentity(self):
+        return not self.steps
+
+    def migrate(self, src, *xtras):
+        for step in self.steps:
+            src = step.migrate(src, *xtras)
+        return src
+
+    def migrateMany(self, records, *xtras):
+        """
+        Generator of the given records migrated, each with the same xtras.
+        """
+        if not self.steps: return iter(records)
+        if len(self.steps) == 1:
+            migrate = self.steps[0].migrate
+            return (migrate(src, *xtras) for src in records)
+        return (self.migrate(src, *xtras) for src in records)
+
+    def __str__(self):
+        return "%s{%s: %s -> %s in %d step(s)}" % (
+            self.__class__.__name__, self.entity, self.fromVer, self.toVer, len(self.steps))
+
+
+class MigratorRegistry(object):
+    """
+    Registry of the migrators between the versions of the entities, keyed by the entity, the version it migrates
+    from and the version it migrates to. The entity is the class name, since each version of the model has its own
+    classes; a class can be passed anywhere the name goes.
+
+    Asked to migrate between two versions, it finds the cheapest chain of the registered migrators, by the sum of
+    their costs, once per the pair, and caches the compiled MigrationPlan. Registering another migrator drops the cache.
+    """
+
+    def __init__(self):
+        # entity name -> {from SemVer -> [(to SemVer, migrator, cost)]}
+        self._edges = {}
+        # (entity name, from SemVer, to SemVer) -> MigrationPlan
+        self._plans = {}
+
+    @staticmethod
+    def _entity(cls):
+        return cls if isinstance(cls, _NAMES) else cls.__name__
+
+    def register(self, cls, fromVer, toVer, migrator, cost=1):
+        """
+        Registers the migrator of the given entity from the given version to the other.
+        The versions can be either the SemVers or their strings.
+        """
+        if cost < 0: raise AttributeError("Migration cost can not be negative, got %s" % cost)
+        fromVer, toVer = SemVer.of(fromVer), SemVer.of(toVer)
+        if fromVer.diffLevel(toVer) == SemVer.DiffLevel.NONE:
+            raise AttributeError("Migrator from %s to the same version" % fromVer)
+        self._edges.setdefault(MigratorRegistry._entity(cls), {}).setdefault(fromVer, []).append((toVer, migrator, cost))
+        self._plans.clear()
+
+    def plan(self, cls, fromVer, toVer):
+        """
+        The cached MigrationPlan of the given entity between the given versions. Raises the AttributeError
+        if the registered migrators do not connect them.
+        """
+        entity = MigratorRegistry._entity(cls)
+        fromVer, toVer = SemVer.of(fromVer), SemVer.of(toVer)
+        key = (entity, fromVer, toVer)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._findPlan(entity, fromVer, toVer)
+            self._plans[key] = plan
+        return plan
+
+    def _findPlan(self, entity, fromVer, toVer):
+        if fromVer.diffLevel(toVer) == SemVer.DiffLevel.NONE: return MigrationPlan(entity, fromVer, toVer)
+        edges = self._edges.get(entity, {})
+        # Dijkstra; the sequence number breaks the ties, the heap never compares the versions or the paths
+        seq = 0
+        heap = [(0, seq, fromVer, ())]
+        done = set()
+        while heap:
+            cost, _, ver, path = heapq.heappop(heap)
+            if ver == toVer: return MigrationPlan(entity, fromVer, toVer, path, cost)
+            if ver in done: continue
+            done.add(ver)
+            for nextVer, migrator, stepCost in edges.get(ver, ()):
+                if nextVer in done: continue
+                seq += 1
+                heapq.heappush(heap, (cost + stepCost, seq, nextVer, path + (migrator,)))
+        raise AttributeError("No migration path for %s from %s to %s" % (entity, fromVer, toVer))
+
+    def migrate(self, src, toVer, *xtras):
+        """
+        Migrates the given entity from its getVersion() to the given version.
+        """
+        return self.plan(src.__class__, src.getVersion(), toVer).migrate(src, *xtras)
+
+    def migrateMany(self, records, toVer, *xtras):
+        """
+        Generator of the given records, possibly of different classes and versions, migrated to the given version.
+        Looks the plan up once per the class and version met in the stream.
+        """
+        toVer = SemVer.of(toVer)
+        plans = {}
+        for src in records:
+            key = (src.__class__, src.getVersion())
+            plan = plans.get(key)
+            if plan is None:
+                plan = self.plan(key[0], key[1], toVer)
+                plans[key] = plan
+            yield plan.migrate(src, *xtras)
@@ -0,0 +1,103 @@
+#!/bin/env python
+
+from collections import OrderedDict, deque
+
+from ebay_datameta_core.base import DataMetaEntity, EntityDescriptor, thawedClass
+
+
+class CanonicalPool(object):
+    """
+    Flyweight pool for small entities that repeat over and over in the decoded data, like the embedded codes and
+    references: equal values are replaced with one shared instance, so that a large in-memory dataset holds one copy
+    of each instead of one per record.
+
+    Values are keyed either by their serialized bytes, see fromBytes, or by all of their fields, see canonical. Note that
+    the generated __eq__ and __hash__ only cover the identity fields, hence are not good enough for that.
+
+    The pool is bounded, the least recently used values get evicted when it's full. Shared instances are frozen by
+    default, so that modifying one of them through one record can't change every other record that holds it.
+
+    Not thread-safe, use one pool per reader.
+    """
+
+    DEFAULT_MAX_SIZE = 4096
+
+    def __init__(self, maxSize=DEFAULT_MAX_SIZE, freeze=True):
+        if maxSize < 1: raise AttributeError("Pool size must be positive, got %s" % maxSize)
+        self._maxSize = maxSize
+        self._freeze = freeze
+        self._pool = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._pool)
+
+    def maxSize(self):
+        return self._maxSize
+
+    def clear(self):
+        self._pool.clear()
+
+    def canonical(self, obj):
+        """
+        Returns the pooled instance with the same field values as the given entity, pooling the given one if there
+        is none yet. Entities that hold unhashable values which the pool can not key, are returned as is.
+        """
+        key = valueKey(obj)
+        if key is None: return obj
+        return self._lookup(key, obj, None)
+
+    def fromBytes(self, raw, decode):
+        """
+        Returns the pooled instance decoded from the same serialized bytes, calls decode(raw) only on a miss.
+        """
+        return self._lookup(raw, None, decode)
+
+    def _lookup(self, key, obj, decode):
+        pool = self._pool
+        found = pool.pop(key, None)
+        if found is not None:
+            pool[key] = found # re-inserting makes it the most recently used
+            self.hits += 1
+            return found
+
+        self.misses += 1
+        if obj is None: obj = decode(key)
+        if self._freeze and isinstance(obj, DataMetaEntity): obj.freeze()
+        pool[key] = obj
+        if len(pool) > self._maxSize:
+            pool.popitem(last=False)
+            self.evictions += 1
+        return obj
+
+    def stats(self):
+        return {'size': len(self._pool), 'maxSize': self._maxSize, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions}
+
+
+def valueKey(val):
+    """
+    Hashable key that covers every field of the given entity, recursively, or None if some value can't be keyed.
+    Two entities with equal keys are interchangeable.
+    """
+    try:
+        key = _valueKey(val)
+        hash(key)
+        return key
+    except TypeError:
+        return None
+
+
+def _valueKey(val):
+    if isinstance(val, DataMetaEntity):
+        cls = thawedClass(val)
+        state = val.__dict__
+        return (cls,) + tuple(_valueKey(state[a]) for a in EntityDescriptor.of(cls).attrs)
+    t = thawedClass(val) # the read-only collections of the frozen entities key as the mutable ones
+    if t is list or t is tuple: return t, tuple(_valueKey(v) for v in val)
+    if t is deque: return t, tuple(_valueKey(v) for v in val)
+    if t is set or t is frozenset: return frozenset, frozenset(_valueKey(v) for v in val)
+    if t is dict: return dict, frozenset((_valueKey(k), _valueKey(v)) for k, v in val.items())
+    return val
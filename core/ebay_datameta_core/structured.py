@@ -0,0 +1,127 @@
+#!/bin/env python
+
+from datetime import datetime, date
+from operator import attrgetter
+
+import numpy
+
+from ebay_datameta_core.base import EntityDescriptor, thawedClass
+
+
+class StructuredArrays(object):
+    """
+    Conversion between lists of flat entities, like IdLess or MultiFieldId, and NumPy structured arrays, one column per
+    field, for the vectorized numeric work. Requires NumPy, which the core does not otherwise need.
+
+    The dtype is derived from the field values: int - int64, float - float64, bool - bool, datetime - datetime64[ms],
+    date - datetime64[D], str - fixed length byte or unicode string as long as the longest value, anything else,
+    including the fields with no values - object. Any of these can be overridden per field.
+
+    A field that is optional and can not hold None in its column gets a companion boolean column named with the
+    NULL_FLAG_SUFFIX which is True where the field is None; the column itself holds the fill value there.
+    """
+
+    NULL_FLAG_SUFFIX = "_isNull"
+
+    FILLS = {'b': False, 'i': 0, 'u': 0, 'f': numpy.nan, 'M': numpy.datetime64('NaT'), 'S': b'', 'U': u''}
+
+    @staticmethod
+    def dtypeOf(cls, records=(), types=None, fixedStrings=True):
+        """
+        Derives the dtype for the given class from the values in the given records.
+        types - optional dict of the dtypes keyed by the field name, override the derived ones
+        fixedStrings - if False, strings go to object columns instead of the fixed length ones
+        """
+        desc = EntityDescriptor.of(cls)
+        types = types or {}
+        spec = []
+        for field, attr, required in zip(desc.fields, desc.attrs, desc.required):
+            dt = types.get(field)
+            if dt is None:
+                dt = _derive([getattr(r, attr) for r in records], fixedStrings)
+            dt = numpy.dtype(dt)
+            spec.append((field, dt))
+            if not required and dt.kind != 'O':
+                spec.append((field + StructuredArrays.NULL_FLAG_SUFFIX, numpy.bool_))
+        return numpy.dtype(spec)
+
+    @staticmethod
+    def toStructured(records, cls=None, dtype=None):
+        """
+        Converts the given entities, all of the same class, to a structured array, column by column straight from
+        the fields: no getter calls per record.
+        """
+        if not isinstance(records, (list, tuple)): records = list(records)
+        if cls is None:
+            if not records: raise AttributeError("Can not derive the class of the records from an empty list")
+            cls = thawedClass(records[0])
+        if dtype is None: dtype = StructuredArrays.dtypeOf(cls, records)
+        desc = EntityDescriptor.of(cls)
+        result = numpy.empty(len(records), dtype=dtype)
+        for field, attr in zip(desc.fields, desc.attrs):
+            dt = dtype.fields[field][0]
+            vals = list(map(attrgetter(attr), records))
+            flagName = field + StructuredArrays.NULL_FLAG_SUFFIX
+            if flagName in dtype.fields:
+                nulls = numpy.fromiter((v is None for v in vals), numpy.bool_, len(vals))
+                result[flagName] = nulls
+                if nulls.any():
+                    fill = StructuredArrays.FILLS.get(dt.kind)
+                    vals = [fill if v is None else v for v in vals]
+            result[field] = numpy.array(vals, dtype=dt) if dt.kind != 'O' else _objects(vals)
+        return result
+
+    @staticmethod
+    def fromStructured(arr, cls):
+        """
+        Converts the given structured array, as made by the toStructured, back to the list of the entities,
+        setting all the fields of each in one step, see DataMetaEntity.fromRows.
+        """
+        desc = EntityDescriptor.of(cls)
+        columns = []
+        for field in desc.fields:
+            if field not in arr.dtype.fields:
+                columns.append([None] * len(arr))
+                continue
+            col = arr[field]
+            # datetime64[ms] turns into datetime, except for the NaT
+            vals = col.astype(object).tolist() if col.dtype.kind == 'M' else col.tolist()
+            flagName = field + StructuredArrays.NULL_FLAG_SUFFIX
+            if flagName in arr.dtype.fields:
+                vals = [None if n else v for v, n in zip(vals, arr[flagName].tolist())]
+            columns.append(vals)
+        return cls.fromRows(list(zip(*columns)) if columns else [])
+
+
+def _objects(vals):
+    # numpy.array would turn a list of lists into a 2-D array, fill the object array element by element instead
+    result = numpy.empty(len(vals), dtype=object)
+    result[:] = vals
+    return result
+
+
+def _derive(vals, fixedStrings):
+    sample = next((v for v in vals if v is not None), None)
+    if sample is None: return object
+    # bool is an int, check it first
+    if isinstance(sample, bool): return numpy.bool_
+    if isinstance(sample, _INTS):
+        return numpy.float64 if any(isinstance(v, float) for v in vals) else numpy.int64
+    if isinstance(sample, float): return numpy.float64
+    if isinstance(sample, datetime): return 'datetime64[ms]'
+    if isinstance(sample, date): return 'datetime64[D]'
+    if fixedStrings and isinstance(sample, bytes):
+        return 'S%d' % max(1, max(len(v) for v in vals if v is not None))
+    if fixedStrings and isinstance(sample, _TEXTS):
+        return 'U%d' % max(1, max(len(v) for v in vals if v is not None))
+    return object
+
+
+try:
+    # noinspection PyUnresolvedReferences
+    _INTS = (int, long)
+    # noinspection PyUnresolvedReferences
+    _TEXTS = (unicode,)
+except NameError:
+    _INTS = (int,)
+    _TEXTS = (str,)
@@ -76,5 +76,6 @@ setup(
         ],
     extras_require={
         'testing': ['pytest'],
+        'numpy': ['numpy'],
     }
 )
@@ -12,7 +12,12 @@ from collections import *
 import re
 
 from ebay_datameta_core.canned_re import CannedRe
-from ebay_datameta_core.base import Verifiable, DateTime, Migrator, SemVer
+from ebay_datameta_core.pool import CanonicalPool, valueKey
+from ebay_datameta_core.index import IdentityIndex, SemVerIndex
+from ebay_datameta_core.migration import MigratorRegistry
+from ebay_datameta_core.footprint import Footprint
+from ebay_datameta_core.base import Verifiable, DateTime, Migrator, SemVer, freezeOnVerify, DataMetaEntity, \
+    EntityDescriptor, thawedClass
 from test_ebay_datameta_sample_v3.model import *
 
 #from inspect import getmembers
@@ -92,6 +97,17 @@ def test_bad_uuid_uppercase():
     assert m is None, "Canned RegEx uiid test succeeded for %s while it should not" % bad_uiid_upper
 
 
+def test_canned_checks():
+    assert set(CannedRe.CANNED_CHECKS.keys()) == set(CannedRe.CANNED_RES.keys())
+    assert CannedRe.CANNED_CHECKS["uuid"]("7cfb2470-b600-4eb3-a2cd-c1439e45b91f")
+    assert CannedRe.CANNED_CHECKS["UUID"]("7CFB2470-B600-4EB3-A2CD-C1439E45B91F")
+    assert not CannedRe.CANNED_CHECKS["uuid"]("7cfb2470b6004eb3a2cdc1439e45b91f")
+    assert CannedRe.CANNED_CHECKS["email"]("me@dom.com")
+    assert not CannedRe.CANNED_CHECKS["email"]("me.dom.com")
+    assert CannedRe.CANNED_CHECKS["phone"]("213-555-1212")
+    assert not CannedRe.CANNED_CHECKS["phone"]("213-555-121")
+
+
 # noinspection PyUnusedLocal,PyUnresolvedReferences
 def test_verifiable_abstract():
     with pytest.raises(TypeError):
@@ -262,6 +278,274 @@ def test_kitchenSinkEq():
     assert k1 != k2
 
 
+def test_freeze():
+    k = getKitchenSink()
+    k.verify()
+    h = hash(k)
+    assert not k.isFrozen()
+    assert k.freeze() is k
+    assert k.isFrozen()
+    assert isinstance(k, KitchenSink)
+    assert hash(k) == h
+    with pytest.raises(AttributeError): k.setTemperature(-273.15)
+    with pytest.raises(AttributeError): k.getEmbo().setId(300) # nested entities are frozen too
+    with pytest.raises(AttributeError): list(k.getIdLessNess())[0].setCount(1)
+    assert k.getTemperature() == 73.12
+    # the collections are read-only, yet equal the mutable ones
+    with pytest.raises(AttributeError): k.getEmbeds().append(EmbeddedType())
+    with pytest.raises(AttributeError): k.getInts().appendleft(0)
+    with pytest.raises(AttributeError): k.getStrings().add("four")
+    with pytest.raises(AttributeError): k.getStrToInt()["four"] = 4
+    with pytest.raises(AttributeError): k.getLongToEmb().pop(1)
+    assert k.getInts() == deque([1, 2, 3, 4, 5]) and k.getStrToInt() == {"one": 1, "two": 2, "three": 3}
+    assert k.getStrings() == {"one", "two", "three"}
+    # the collections passed to the setters are not held any more, the nested entities are frozen in place
+    strings = {"one"}
+    embT = EmbeddedType()
+    embT.setIntCode(30)
+    shared = getKitchenSink()
+    shared.setStrings(strings)
+    shared.setEmbeds([embT])
+    shared.freeze()
+    strings.add("two")
+    assert shared.getStrings() == {"one"}
+    assert embT.isFrozen() and shared.getEmbeds()[0] is embT
+    # the clones get the mutable collections back
+    c = shared.clone()
+    c.getStrings().add("two")
+    c.getEmbeds().append(embT)
+    assert type(c.getStrings()) is set and type(c.getInts()) is deque and type(c.getStrToInt()) is dict
+    c = shared.clone(DataMetaEntity.CloneMode.COW)
+    c.getInts().append(6)
+    assert shared.getInts() == deque([1, 2, 3, 4, 5])
+
+    thawed = getKitchenSink()
+    assert k == thawed
+    assert thawed == k
+    assert not (k != thawed)
+    assert {k: "frozen"}[thawed] == "frozen"
+    thawed.setTemperature(-273.15)
+    assert k != thawed
+    assert thawed != k
+
+
+def test_freezeOnVerify():
+    class FreezingIdLess(IdLess):
+        pass
+
+    assert freezeOnVerify(FreezingIdLess) is FreezingIdLess
+    assert freezeOnVerify(FreezingIdLess) is FreezingIdLess # idempotent
+
+    i = FreezingIdLess()
+    i.setCount(300)
+    with pytest.raises(AttributeError): i.verify()
+    assert not i.isFrozen()
+    i.setWhen(DateTime.fromIsoUtc("2016-03-31T15:33:44Z"))
+    i.verify()
+    assert i.isFrozen()
+    with pytest.raises(AttributeError): i.setName("late")
+    i.verify()
+    assert not IdLess().isFrozen()
+
+
+def test_frozenPickle():
+    import pickle
+    k = getKitchenSink().freeze()
+    restored = pickle.loads(pickle.dumps(k, pickle.HIGHEST_PROTOCOL))
+    assert restored.isFrozen()
+    assert restored == k
+    assert restored.getStrToInt() == k.getStrToInt() and restored.getInts() == k.getInts()
+    with pytest.raises(AttributeError): restored.getEmbeds().pop()
+    assert hash(restored) == hash(k)
+
+
+def test_entityDescriptor():
+    d = EntityDescriptor.of(MultiFieldId)
+    assert d.fields == ("a", "b", "c", "timing", "text")
+    assert d.attrs[3] == "_MultiFieldId__timing"
+    assert d.getters[3] == "getTiming"
+    assert d.setters[3] == "setTiming"
+    assert EntityDescriptor.of(KitchenSink).fields[:3] == ("id", "context", "strings")
+    assert EntityDescriptor.of(type(IdLess().freeze())) is EntityDescriptor.of(IdLess)
+
+
+def test_requiredFields():
+    d = EntityDescriptor.of(MultiFieldId)
+    assert d.required == (True, True, True, False, True)
+    assert d.requiredIndexes == (0, 1, 2, 4)
+    assert not any(EntityDescriptor.of(AllOptional).required)
+    k = KitchenSink()
+    with pytest.raises(AttributeError) as e: k.verify()
+    missing = str(e.value).split(": ")[-1].split(", ")
+    ksd = EntityDescriptor.of(KitchenSink)
+    assert set(missing) == set(f for f, r in zip(ksd.fields, ksd.required) if r)
+
+
+def test_fromTuple():
+    when = DateTime.fromIsoUtc("2016-03-31T15:33:44Z")
+    i = IdLess.fromTuple((300, None, when))
+    i.verify()
+    assert type(i) is IdLess
+    assert (i.getCount(), i.getName(), i.getWhen()) == (300, None, when)
+    i.setName("named")
+    assert i.getName() == "named"
+    assert i == IdLess.fromTuple((300, "named", when))
+
+    with pytest.raises(AttributeError) as e: MultiFieldId.fromTuple((1, None, 3, None, None))
+    assert "required fields not set: b, text" in str(e.value)
+    with pytest.raises(AttributeError): IdLess.fromTuple((300, None))
+
+
+def test_fromDict():
+    m = MultiFieldId.fromDict({"a": 1, "b": 2, "c": 3, "text": "three"})
+    m.verify()
+    assert m.getTiming() is None
+    assert m.getText() == "three"
+    with pytest.raises(AttributeError) as e: MultiFieldId.fromDict({"a": 1, "b": 2, "text": "three"})
+    assert "required fields not set: c" in str(e.value)
+    with pytest.raises(AttributeError) as e: MultiFieldId.fromDict({"a": 1, "b": 2, "c": 3, "text": "t", "d": 4})
+    assert "unknown field \"d\"" in str(e.value)
+
+
+def test_fromRows():
+    rows = [(1, 2, 3, None, "one"), (4, 5, 6, None, "two"), {"a": 7, "b": 8, "c": 9, "text": "three"}]
+    ms = MultiFieldId.fromRows(rows)
+    assert [m.getText() for m in ms] == ["one", "two", "three"]
+    assert ms[2] == MultiFieldId.fromTuple((7, 8, 9, None, "whatever"))
+    with pytest.raises(AttributeError): MultiFieldId.fromRows([(1, 2, 3, None, None)])
+    assert MultiFieldId.fromRows([]) == []
+
+
+def test_fromRowsFrozen():
+    frozen = type(MultiFieldId.fromTuple((1, 2, 3, None, "one")).freeze())
+    cow = type(MultiFieldId.fromTuple((1, 2, 3, [4], "one")).clone(DataMetaEntity.CloneMode.COW))
+    assert frozen is not MultiFieldId and cow is not MultiFieldId
+    f = frozen.fromTuple((1, 2, 3, None, "one"))
+    assert type(f) is frozen and f.isFrozen()
+    assert f == MultiFieldId.fromTuple((1, 2, 3, None, "one"))
+    assert hash(f) == hash(MultiFieldId.fromTuple((1, 2, 3, None, "one")))
+    with pytest.raises(AttributeError): f.setText("two")
+    rows = frozen.fromRows([(4, 5, 6, None, "two"), {"a": 7, "b": 8, "c": 9, "text": "three"}])
+    assert [type(m) for m in rows] == [frozen, frozen]
+    assert frozen.fromDict({"a": 7, "b": 8, "c": 9, "text": "three"}) == rows[1]
+    # a COW class with nothing to share is just the generated one
+    c = cow.fromRows([(1, 2, 3, None, "one")])[0]
+    assert type(c) is MultiFieldId and type(cow.fromTuple((1, 2, 3, None, "one"))) is MultiFieldId
+    c.setText("two")
+    assert c.getText() == "two"
+
+
+def test_cloneShallow():
+    k = getKitchenSink()
+    c = k.clone(DataMetaEntity.CloneMode.SHALLOW)
+    assert type(c) is KitchenSink
+    assert c == k
+    assert c.getEmbo() is k.getEmbo()
+    assert c.getStrings() is k.getStrings()
+    c.setName("Other name")
+    assert k.getName() == "What's in the name"
+
+
+def test_cloneDeep():
+    k = getKitchenSink()
+    c = k.clone()
+    c.verify()
+    assert type(c) is KitchenSink
+    assert c == k
+    assert c.getEmbo() is not k.getEmbo()
+    assert c.getEmbo().getMbe().getTxtCode() == "Textual One"
+    assert c.getInts() == k.getInts() and c.getInts() is not k.getInts()
+    # sharing within the graph is preserved
+    emb = c.getEmbeds()[0]
+    assert emb is not k.getEmbeds()[0]
+    assert emb is c.getLongToEmb()[1]
+    assert any(e is emb for e in c.getEmbToString())
+    c.getStrings().add("four")
+    c.getEmbo().setId(300)
+    assert "four" not in k.getStrings()
+    assert k.getEmbo().getId() == 100
+
+    frozen = getKitchenSink().freeze()
+    thawed = frozen.clone()
+    assert not thawed.isFrozen() and not thawed.getEmbo().isFrozen()
+    thawed.setName("Thawed")
+    thawed.getEmbo().setId(300)
+
+
+def test_cloneCow():
+    k = getKitchenSink()
+    c = k.clone(DataMetaEntity.CloneMode.COW)
+    assert isinstance(c, KitchenSink)
+    assert c == k and k == c
+    assert hash(c) == hash(k)
+    # nothing copied until accessed
+    assert c._KitchenSink__embo is k._KitchenSink__embo
+    embo = c.getEmbo()
+    assert embo is not k.getEmbo()
+    assert embo.getMbe() is not k.getEmbo().getMbe()
+    embo.getMbe().setTxtCode("Changed")
+    assert k.getEmbo().getMbe().getTxtCode() == "Textual One"
+    c.getIdLessNess().clear()
+    assert len(k.getIdLessNess()) == 2
+    c.setStrings({"replaced"})
+    assert k.getStrings() == {"one", "two", "three"}
+    # immutable values are not tracked at all
+    assert c.getName() is k.getName()
+    c.verify()
+
+    # once everything is owned, the clone is back to the generated class
+    for getter in EntityDescriptor.of(KitchenSink).getters:
+        getattr(c, getter)()
+    assert type(c) is KitchenSink
+
+    # the source copies the shared values on access as well, its changes do not show in the clone
+    k = getKitchenSink()
+    c = k.clone(DataMetaEntity.CloneMode.COW)
+    assert thawedClass(k) is KitchenSink and type(k) is not KitchenSink
+    k.getEmbo().getMbe().setTxtCode("Changed")
+    k.getInts().append(42)
+    k.getIdLessNess().clear()
+    assert c.getEmbo().getMbe().getTxtCode() == "Textual One"
+    assert 42 not in c.getInts()
+    assert len(c.getIdLessNess()) == 2
+    # the second clone shares with the source too
+    c2 = k.clone(DataMetaEntity.CloneMode.COW)
+    k.getStrings().add("four")
+    assert "four" not in c2.getStrings() and "four" not in c.getStrings()
+    for getter in EntityDescriptor.of(KitchenSink).getters:
+        getattr(k, getter)()
+    assert type(k) is KitchenSink
+
+    # freezing a COW clone does not freeze the source
+    f = k.clone(DataMetaEntity.CloneMode.COW).freeze()
+    assert f.isFrozen()
+    assert not k.getEmbo().isFrozen()
+    k.getEmbo().setId(300)
+
+
+def test_frozenAndCowKeys():
+    def emb(i):
+        mbe = EmbeddedType()
+        mbe.setIntCode(i * 10)
+        e = Embodiment()
+        e.setId(i)
+        e.setMbe(mbe)
+        return e
+
+    frozen = emb(1).freeze()
+    d = {frozen: "x"}
+    src = emb(1)
+    snap = src.clone(DataMetaEntity.CloneMode.COW)
+    assert type(src) is not Embodiment and type(snap) is not Embodiment
+    assert d[src] == "x" and d[snap] == "x"
+    assert frozen == snap and snap == frozen and frozen == src and not (frozen != snap)
+    # and the other way around: the COW keys, looked up by the frozen and the thawed ones
+    cow = {snap: "y"}
+    assert cow[frozen] == "y" and cow[emb(1)] == "y"
+    assert emb(2).clone(DataMetaEntity.CloneMode.COW) not in d and emb(2).freeze() not in cow
+    assert snap._Embodiment__mbe is src._Embodiment__mbe # comparing copied nothing
+
+
 def getKitchenSink():
     k = KitchenSink()
     setOfStrings = {"one", "two", "three"}
@@ -329,3 +613,323 @@ def getKitchenSink():
     nsRec.setChoices(WordedEnum.Long)
     k.setOtherNsRef(nsRec)
     return k
+
+
+def test_canonicalPool():
+    def code(i, txt):
+        e = EmbeddedType()
+        e.setIntCode(i)
+        e.setTxtCode(txt)
+        return e
+
+    pool = CanonicalPool(maxSize=2)
+    one = pool.canonical(code(1, "one"))
+    assert one.isFrozen()
+    assert pool.canonical(code(1, "one")) is one
+    # equal by the generated __eq__ which only covers the intCode, but not interchangeable
+    other = pool.canonical(code(1, "uno"))
+    assert other is not one
+    assert other.getTxtCode() == "uno"
+    assert len(pool) == 2
+    assert pool.canonical(code(1, "one")) is one # refreshes it, "uno" is the least recently used now
+    two = pool.canonical(code(2, "two"))
+    assert len(pool) == 2
+    assert pool.canonical(code(1, "uno")) is not other # evicted
+    assert pool.canonical(code(2, "two")) is two
+    assert pool.stats() == {'size': 2, 'maxSize': 2, 'hits': 3, 'misses': 4, 'evictions': 2}
+
+    # nested entities and collections are part of the key
+    k1 = getKitchenSink()
+    k2 = getKitchenSink()
+    assert valueKey(k1) == valueKey(k2)
+    k2.getEmbo().getMbe().setTxtCode("changed")
+    assert valueKey(k1) != valueKey(k2)
+
+    decoded = []
+    raw = CanonicalPool(freeze=False)
+    first = raw.fromBytes(b"\x01\x02", lambda ba: decoded.append(ba) or code(1, "one"))
+    assert raw.fromBytes(b"\x01\x02", lambda ba: decoded.append(ba) or code(1, "one")) is first
+    assert not first.isFrozen()
+    assert decoded == [b"\x01\x02"]
+
+
+def test_structuredArrays():
+    numpy = pytest.importorskip("numpy")
+    from ebay_datameta_core.structured import StructuredArrays
+
+    when = DateTime.fromIsoUtc("2016-03-31T15:33:44Z")
+    idLesses = IdLess.fromRows([(300, "three hundred", when), (400, None, DateTime.fromMillis(0))])
+    dt = StructuredArrays.dtypeOf(IdLess, idLesses)
+    assert dt.names == ("count", "name", "name_isNull", "when")
+    assert dt.fields["count"][0] == numpy.int64
+    assert dt.fields["name"][0].kind == "S" and dt.fields["name"][0].itemsize == len("three hundred")
+    assert dt.fields["when"][0] == numpy.dtype("datetime64[ms]")
+
+    arr = StructuredArrays.toStructured(idLesses)
+    assert arr["count"].sum() == 700
+    assert arr["name_isNull"].tolist() == [False, True]
+    assert arr["when"][0] == numpy.datetime64(when)
+    back = StructuredArrays.fromStructured(arr, IdLess)
+    assert back == idLesses
+    assert [(i.getCount(), i.getName(), i.getWhen()) for i in back] == \
+           [(i.getCount(), i.getName(), i.getWhen()) for i in idLesses]
+
+    multis = MultiFieldId.fromRows([(i, i * 2, i * 3, None, "text %d" % i) for i in range(100)])
+    arr = StructuredArrays.toStructured(multis, dtype=StructuredArrays.dtypeOf(MultiFieldId, multis, fixedStrings=False))
+    assert arr.dtype.fields["text"][0].kind == "O"
+    assert arr.dtype.fields["timing"][0].kind == "O" # no values to derive the type from
+    assert "timing_isNull" not in arr.dtype.fields
+    assert (arr["b"] == arr["a"] * 2).all()
+    assert StructuredArrays.fromStructured(arr, MultiFieldId)[99].getText() == "text 99"
+
+    opts = AllOptional.fromRows([(1, None, None, 1.5, None), (None, None, "what", None, None)])
+    arr = StructuredArrays.toStructured(opts, dtype=StructuredArrays.dtypeOf(AllOptional, opts, types={"distance": "f4"}))
+    assert arr.dtype.fields["distance"][0] == numpy.float32
+    back = StructuredArrays.fromStructured(arr, AllOptional)
+    assert [(o.getCounter(), o.getWhat(), o.getWeight()) for o in back] == [(1, None, 1.5), (None, "what", None)]
+
+
+def test_columnarStore(tmpdir):
+    numpy = pytest.importorskip("numpy")
+    from ebay_datameta_core.columnar import ColumnarStore
+
+    root = str(tmpdir)
+    rows = [(i, None if i % 3 == 0 else u"name \u00e9 %d" % i, DateTime.fromMillis(1464586777000 + i * 1000))
+            for i in range(50)]
+    ColumnarStore.write(root, IdLess.fromRows(rows))
+    store = ColumnarStore(root, IdLess)
+    assert len(store) == 50
+    counts = store.column("count")
+    assert isinstance(counts, numpy.memmap)
+    assert counts.sum() == sum(range(50))
+    assert store.column("when")[1] == numpy.datetime64(DateTime.fromMillis(1464586778000))
+    assert store.valid("name").tolist() == [i % 3 != 0 for i in range(50)]
+    offsets, data = store.stringColumn("name")
+    assert data[offsets[1]:offsets[2]].tobytes().decode("utf-8") == u"name \u00e9 1"
+
+    assert store.row(7).getName() == u"name \u00e9 7"
+    assert store[9].getName() is None
+    assert [(i.getCount(), i.getName(), i.getWhen()) for i in store] == rows
+    assert store[-1].getCount() == 49
+    with pytest.raises(IndexError): store.row(50)
+    with pytest.raises(AttributeError): store.column("name")
+    store.close()
+
+    with pytest.raises(AttributeError): ColumnarStore.write(root, [getKitchenSink()])
+    ColumnarStore.write(root, [], cls=MultiFieldId)
+    assert list(ColumnarStore(root, MultiFieldId)) == []
+
+    # two classes of one version under one root keep their own columns
+    multis = [MultiFieldId.fromTuple((i, -i, u"c%d" % i, None, u"t")) for i in range(5)]
+    ColumnarStore.write(root, multis)
+    assert [(i.getCount(), i.getName(), i.getWhen()) for i in ColumnarStore(root, IdLess)] == rows
+    assert list(ColumnarStore(root, MultiFieldId)) == multis
+    # a manifest of another class is refused
+    idLessPath = os.path.join(root, "%s.IdLess" % IdLess.__module__, IdLess.VERSION)
+    multiPath = os.path.join(root, "%s.MultiFieldId" % MultiFieldId.__module__, MultiFieldId.VERSION)
+    with open(os.path.join(multiPath, ColumnarStore.MANIFEST)) as src, \
+            open(os.path.join(idLessPath, ColumnarStore.MANIFEST), "w") as out:
+        out.write(src.read())
+    with pytest.raises(AttributeError): ColumnarStore(root, IdLess)
+
+
+def test_identityIndex():
+    assert EntityDescriptor.of(MultiFieldId).keyFields == ("a", "b", "c")
+    assert EntityDescriptor.of(Embodiment).keyFields == ("id",)
+    assert EntityDescriptor.of(KitchenSink).keyFields == ("id", "temperature")
+    assert EntityDescriptor.of(AllOptional).keyFields == ("counter", "distance", "weight", "what", "when")
+
+    index = IdentityIndex(MultiFieldId, secondary=("text",))
+    assert index.keyFields() == ("a", "b", "c")
+    assert index.load(MultiFieldId.fromRows([(i, i + 1, i + 2, None, "even" if i % 2 == 0 else "odd")
+                                             for i in range(10)])) == 10
+    assert len(index) == 10
+    m = index.get((4, 5, 6))
+    assert m.getA() == 4
+    assert (4, 5, 6) in index
+    assert index.get((4, 5, 7)) is None
+    assert sorted(e.getA() for e in index.find("text", "even")) == [0, 2, 4, 6, 8]
+
+    replacement = MultiFieldId.fromTuple((4, 5, 6, None, "odd"))
+    assert index.upsert(replacement) is m
+    assert len(index) == 10
+    assert sorted(e.getA() for e in index.find("text", "even")) == [0, 2, 6, 8]
+    assert index.get((4, 5, 6)) is replacement
+
+    # an indexed entity changed in place, upserting it again moves it in the secondary index
+    replacement.setText("changed")
+    index.upsert(replacement)
+    assert index.find("text", "changed") == [replacement]
+    assert replacement not in index.find("text", "odd")
+
+    assert index.delete((4, 5, 6)) is replacement
+    assert index.delete((4, 5, 6)) is None
+    assert index.find("text", "changed") == []
+    assert len(index) == 9
+
+    index.addSecondary("b")
+    assert [e.getA() for e in index.find("b", 3)] == [2]
+    with pytest.raises(AttributeError): index.find("c", 3)
+    with pytest.raises(AttributeError): index.addSecondary("nope")
+
+    single = IdentityIndex(Embodiment)
+    e = Embodiment()
+    e.setId(100)
+    single.upsert(e)
+    assert single.get((100,)) is e
+    assert list(single) == [e]
+
+
+class _Bump(Migrator):
+    """ Test migrator: appends its name to the text of a MultiFieldId copy """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+
+    def migrate(self, src, *xtras):
+        self.calls += 1
+        result = src.clone()
+        result.setText(src.getText() + self.name + "".join(xtras))
+        return result
+
+
+def test_migratorRegistry():
+    registry = MigratorRegistry()
+    oneTwo, twoThree, oneThree, threeFour = _Bump("12"), _Bump("23"), _Bump("13"), _Bump("34")
+    registry.register(MultiFieldId, "1.0.0", "2.0.0", oneTwo)
+    registry.register("MultiFieldId", SemVer("2.0.0"), "3.0.0", twoThree)
+    registry.register(MultiFieldId, "1.0.0", "3.0.0", oneThree, cost=5)
+    registry.register(MultiFieldId, "3.0.0", "4.0.0", threeFour)
+
+    plan = registry.plan(MultiFieldId, "1.0.0", "4.0.0")
+    assert plan.steps == (oneTwo, twoThree, threeFour)
+    assert plan.cost == 3
+    assert registry.plan(MultiFieldId, "1.0.0", "4.0.0.x") is plan
+    # the name can be a unicode on Python 2
+    assert registry.plan(u"MultiFieldId", "1.0.0", "4.0.0") is plan
+
+    src = MultiFieldId.fromTuple((1, 2, "3", None, "v"))
+    assert plan.migrate(src, "!").getText() == "v12!23!34!"
+    assert [m.getText() for m in plan.migrateMany([src, src])] == ["v122334"] * 2
+
+    identity = registry.plan(MultiFieldId, "3.0.0", "3.0.0.blah")
+    assert identity.isIdentity()
+    assert identity.migrate(src) is src
+
+    # the sample model is 3.0.0
+    assert registry.migrate(src, "4.0.0").getText() == "v34"
+    calls = threeFour.calls
+    assert len(list(registry.migrateMany([src] * 10, "4.0.0"))) == 10
+    assert threeFour.calls == calls + 10
+
+    with pytest.raises(AttributeError): registry.plan(MultiFieldId, "4.0.0", "1.0.0")
+    with pytest.raises(AttributeError): registry.plan(IdLess, "1.0.0", "2.0.0")
+    with pytest.raises(AttributeError): registry.register(MultiFieldId, "1.0.0", "1.0.0", oneTwo)
+
+    # a cheaper direct path replaces the cached plan
+    direct = _Bump("14")
+    registry.register(MultiFieldId, "1.0.0", "4.0.0", direct, cost=2)
+    assert registry.plan(MultiFieldId, "1.0.0", "4.0.0").steps == (direct,)
+
+
+def test_semVerInterned():
+    v = SemVer.of("1.2.3.4")
+    assert SemVer.of("1.2.3.4") is v
+    assert SemVer.of(v) is v
+    assert v == SemVer("1.2.3.4.blah") and hash(v) == hash(SemVer("1.2.3.4.blah"))
+    assert v != SemVer("1.2.3") and v != "1.2.3.4"
+    assert v.items() == [1, 2, 3, 4]
+    v.items().append(5)
+    assert v.items() == [1, 2, 3, 4]
+    # the DIGITS regex accepted the trailing newline, so does the SemVer
+    assert SemVer("1.2.3\n").items() == [1, 2, 3]
+    with pytest.raises(AttributeError): SemVer("1.2.3\n\n")
+    # not comparable to anything but a SemVer: the other side gets its turn, then the interpreter decides
+    assert not v == None and v != None
+    for cmp in (v.__lt__, v.__le__, v.__gt__, v.__ge__):
+        assert cmp(None) is NotImplemented and cmp("1.2.3.4") is NotImplemented
+    if sys.version_info[0] >= 3:
+        with pytest.raises(TypeError): v < None
+        with pytest.raises(TypeError): v >= "1.2.3.4"
+
+    import pickle
+    assert pickle.loads(pickle.dumps(v, pickle.HIGHEST_PROTOCOL)) is v
+
+    sources = ["5.6.7.12", "5.6.7", "12.15.16", "5.6.7.3", "5.6.7.0", "0.0.1"]
+    ordered = ["0.0.1", "5.6.7", "5.6.7.0", "5.6.7.3", "5.6.7.12", "12.15.16"]
+    assert [str(x) for x in sorted(SemVer.of(s) for s in sources)] == ordered
+    assert [str(x) for x in sorted((SemVer.of(s) for s in sources), key=SemVer.sortKey)] == ordered
+    assert SemVer("5.6.7") <= SemVer("5.6.7.blah") <= SemVer("5.6.7") and SemVer("5.6.8") >= SemVer("5.6.7.9")
+    assert SemVer("1.2.3.4").diffLevel(SemVer("1.2.3")) == SemVer.DiffLevel.BUILD
+
+
+def test_semVerIndex():
+    index = SemVerIndex(["1.0.0", "1.0.0.3", "1.0.0.12", "1.2.0", "1.2.5.1", "2.0.0", "2.0.0.blah"])
+    assert len(index) == 6
+    assert not index.add("1.0.0.12.again")
+    assert index.add(SemVer("1.9.9"))
+    assert index.load(["3.0.0", "1.9.9"]) == 1
+
+    assert index.exact("1.2.5.1.x") is SemVer.of("1.2.5.1")
+    assert index.exact("1.2.5") is None
+    assert "2.0.0" in index and "2.0.1" not in index
+
+    assert str(index.highestCompatible("1.0.0.1")) == "1.0.0.12"
+    assert str(index.highestCompatible("1.0.0", SemVer.DiffLevel.MINOR)) == "1.0.0.12"
+    assert str(index.highestCompatible("1.2.0", SemVer.DiffLevel.MINOR)) == "1.2.5.1"
+    assert str(index.highestCompatible("1.0.0", SemVer.DiffLevel.MAJOR)) == "1.9.9"
+    assert index.highestCompatible("1.3.0", SemVer.DiffLevel.MINOR) is None
+    assert index.highestCompatible("4.0.0", SemVer.DiffLevel.MAJOR) is None
+    assert str(index.highestCompatible("1.0.0.3", SemVer.DiffLevel.BUILD)) == "1.0.0.3"
+
+    assert [str(v) for v in index.builds("1.0.0.7")] == ["1.0.0", "1.0.0.3", "1.0.0.12"]
+    assert [str(v) for v in index.between("1.0.0.3", "1.9.9")] == ["1.0.0.3", "1.0.0.12", "1.2.0", "1.2.5.1", "1.9.9"]
+    assert [str(v) for v in index] == sorted([str(v) for v in index], key=lambda s: SemVer(s).sortKey())
+
+    assert str(index.remove("1.9.9")) == "1.9.9"
+    assert index.remove("1.9.9") is None
+    assert str(index.highestCompatible("1.0.0", SemVer.DiffLevel.MAJOR)) == "1.2.5.1"
+
+
+def test_footprint():
+    shared = EmbeddedType()
+    shared.setIntCode(5000)
+    shared.setTxtCode(u"shared")
+    entities = []
+    for i in range(3):
+        embo = Embodiment()
+        embo.setId(1000 + i)
+        embo.setInclusivement(u"inclusive %d" % i)
+        embo.setMbe(shared)
+        e = EmbeddedType()
+        e.setIntCode(2000 + i)
+        e.setTxtCode(u"code %d" % i)
+        e.setEmbo(embo)
+        entities.append(e)
+
+    footprint = Footprint()
+    sizes = [footprint.add(e) for e in entities]
+    # the shared one is counted with the first
+    assert sizes[1] == sizes[2] and sizes[0] - sizes[1] == Footprint.deepSizeOf(shared)
+    # counted before: adds nothing, neither to the population
+    assert footprint.add(entities[0]) == 0 and footprint.add(shared) == 0
+    report = footprint.report()
+    assert report['instances'] == 3 and report['bytes'] == sum(sizes) and report['minBytes'] == min(sizes)
+    assert report['classes']['Embodiment']['count'] == 3 and report['classes']['EmbeddedType']['count'] == 4
+    fields = report['fields']
+    embedded = [k for k in fields if k.startswith("EmbeddedType.")]
+    assert set(embedded) == set("EmbeddedType." + f for f in ("<object>", "intCode", "txtCode", "embo"))
+    assert sum(fields[k]['bytes'] for k in embedded) == report['classes']['EmbeddedType']['bytes']
+    assert fields['Embodiment.mbe']['bytes'] == report['classes']['EmbeddedType']['bytes'] - sum(sizes)
+    assert Footprint.deepSizeOf([shared, shared]) == sys.getsizeof([shared, shared]) + Footprint.deepSizeOf(shared)
+    assert footprint.format().splitlines()[2].startswith("EmbeddedType")
+    # the __slots__ are followed
+    ver = SemVer("1.2.3.4")
+    assert Footprint.deepSizeOf(ver) > sys.getsizeof(ver) + sys.getsizeof(ver._items) + sys.getsizeof(ver._source)
+
+    if sys.version_info[0] < 3:
+        with pytest.raises(AttributeError): Footprint.allocations(list, range(10))
+    else:
+        result, allocated = Footprint.allocations(lambda n: [str(i) for i in range(n)], 1000)
+        assert len(result) == 1000 and allocated['peak'] >= allocated['current'] > 1000
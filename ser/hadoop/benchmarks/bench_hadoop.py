@@ -0,0 +1,179 @@
+#!/bin/env python
+from __future__ import print_function
+
+"""
+Throughput benchmarks of the Hadoop serialization: every DataMetaHadoopUtil read/write helper, with the collections
+of 0 to 1M elements, and the BytesDataIoUtil round trips of the sample v3 entities.
+Reports per case the bytes per record, and the records/sec and MB/sec of the writes and the reads, a record being
+one call of the helper.
+
+Run from the ser/hadoop directory, needs the core on the PYTHONPATH same as the tests:
+    python benchmarks/bench_hadoop.py [--max-size 1000] [--filter List] [--min-time 0.2] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from decimal import Decimal
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+# the InOutables of the sample model come with the tests, the sample model itself with the core tests
+sys.path.insert(0, os.path.join(HERE, '..', 'tests'))
+sys.path.insert(0, os.path.join(HERE, '..', '..', '..', 'core', 'tests'))
+
+from bitarray import bitarray
+from hadoop.io import InputStream, OutputStream
+from ebay_datameta_core.base import DateTime
+from ebay_datameta_hadoop.base import DataMetaHadoopUtil
+from sample_io import MULTI_FIELD_ID_IO, EMBEDDED_TYPE_IO, ID_LESS_IO, multiFieldId, embeddedType, WritableListOf
+from test_ebay_datameta_sample_v3.model import IdLess, Embodiment
+
+SIZES = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+EPOCH_MS = 1459438424000 # 2016-03-31T15:33:44Z
+
+# element generators of the primitive collections, by the suffix of the helper names
+ELEMENTS = (
+    ('Integer', lambda i: (i * 7919) % (1 << 31) - (1 << 30)),
+    ('Long', lambda i: (i * 2654435761) % (1 << 63) - (1 << 62)),
+    ('Boolean', lambda i: i % 3 == 0),
+    ('Float', lambda i: i * 0.5),
+    ('Double', lambda i: i * 1.1),
+    ('String', lambda i: u"value %d" % i),
+    ('DateTime', lambda i: DateTime.fromMillis(EPOCH_MS + i * 1000)),
+    ('BigDecimal', lambda i: Decimal("%d.%02d" % (i, i % 100))),
+)
+
+CONTAINERS = (('List', list), ('Set', set), ('Deque', deque))
+
+
+def idLess(i):
+    e = IdLess()
+    e.setCount(i)
+    e.setName(u"name %d" % i if i % 4 else None)
+    e.setWhen(DateTime.fromMillis(EPOCH_MS + i))
+    return e
+
+
+def embodied(i):
+    e = embeddedType(i, u"code %d" % i)
+    embo = Embodiment()
+    embo.setId(i * 31)
+    embo.setInclusivement(u"inclusive %d" % i)
+    embo.setMbe(embeddedType(i + 1, u"inner"))
+    e.setEmbo(embo)
+    return e
+
+
+def entityWriter(io):
+    return lambda do, val: io.write(do, val)
+
+
+def entityReader(io):
+    return lambda di: io.read(di)
+
+
+def cases(maxSize):
+    """
+    Generator of the (name, element count, write function, read function, value) for all the cases up to the given
+    collection size.
+    """
+    sizes = [n for n in SIZES if n <= maxSize]
+    for kind, gen in ELEMENTS:
+        for container, make in CONTAINERS:
+            write = getattr(DataMetaHadoopUtil, "write%s%s" % (container, kind))
+            read = getattr(DataMetaHadoopUtil, "read%s%s" % (container, kind))
+            for n in sizes:
+                yield "%s<%s>[%d]" % (container, kind, n), n, write, read, make(gen(i) for i in range(n))
+
+    yield "Text", 1, DataMetaHadoopUtil.writeTextIfAny, DataMetaHadoopUtil.readText, u"The quick brown fox"
+    yield "DateTime", 1, DataMetaHadoopUtil.writeDttm, DataMetaHadoopUtil.readDttm, DateTime.fromMillis(EPOCH_MS)
+    yield "DateTimeUtc", 1, DataMetaHadoopUtil.writeDttmUtc, DataMetaHadoopUtil.readDttmUtc, \
+        DateTime.fromMillis(EPOCH_MS)
+    yield "BigDecimal", 1, DataMetaHadoopUtil.writeBigDecimal, DataMetaHadoopUtil.readBigDecimal, \
+        Decimal("12345678901234567890.123456789")
+
+    for n in sizes:
+        bits = bitarray(n)
+        bits.setall(False)
+        bits[::3] = True
+        yield "BitArray[%d]" % n, n, DataMetaHadoopUtil.writeBitArray, DataMetaHadoopUtil.readBitArray, bits
+        yield "LongArray[%d]" % n, n, DataMetaHadoopUtil.writeLongArray, DataMetaHadoopUtil.readLongArray, \
+            [(i * 2654435761) % (1 << 63) for i in range(n)]
+
+    entities = (
+        ("MultiFieldId", MULTI_FIELD_ID_IO,
+         lambda i: multiFieldId(i, -i, u"c%d" % i, u"text %d" % i, DateTime.fromMillis(EPOCH_MS) if i % 2 else None)),
+        ("IdLess", ID_LESS_IO, idLess),
+        ("EmbeddedType", EMBEDDED_TYPE_IO, embodied),
+    )
+    for name, io, make in entities:
+        yield name, 1, entityWriter(io), entityReader(io), make(1)
+        listIo = WritableListOf(io)
+        for n in sizes:
+            yield "List<%s>[%d]" % (name, n), n, entityWriter(listIo), entityReader(listIo), [make(i) for i in range(n)]
+
+
+def encode(write, val):
+    bo = OutputStream.ByteArrayOutputStream()
+    write(OutputStream.DataOutputStream(bo), val)
+    return bo.toByteArray()
+
+
+def decode(read, ba):
+    return read(InputStream.DataInputStream(InputStream.ByteArrayInputStream(ba)))
+
+
+def timed(fn, minTime):
+    """
+    Calls per second of the given function, doubling the batch until it takes at least the given seconds.
+    """
+    count = 1
+    while True:
+        start = time.time()
+        for _ in range(count):
+            fn()
+        elapsed = time.time() - start
+        if elapsed >= minTime: return count / elapsed
+        count = count * 2 if elapsed <= 0 else max(count * 2, int(count * minTime / elapsed * 1.1))
+
+
+def run(maxSize, minTime, pattern=None):
+    results = []
+    for name, n, write, read, val in cases(maxSize):
+        if pattern and pattern not in name: continue
+        ba = encode(write, val)
+        # the round trip itself is not timed, but it does check that the benchmark measures something sensible
+        decode(read, ba)
+        writeRate = timed(lambda: encode(write, val), minTime)
+        readRate = timed(lambda: decode(read, ba), minTime)
+        mb = len(ba) / float(1 << 20)
+        result = {'name': name, 'elements': n, 'bytesPerRecord': len(ba),
+                  'writeRecordsPerSec': writeRate, 'writeMbPerSec': writeRate * mb,
+                  'readRecordsPerSec': readRate, 'readMbPerSec': readRate * mb}
+        results.append(result)
+        print("%-32s %10d B/rec  write %12.1f rec/s %9.3f MB/s  read %12.1f rec/s %9.3f MB/s" % (
+            name, len(ba), writeRate, writeRate * mb, readRate, readRate * mb))
+        sys.stdout.flush()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DataMeta Hadoop serialization throughput")
+    parser.add_argument('--max-size', type=int, default=SIZES[-1], help="largest collection size, up to 1M")
+    parser.add_argument('--min-time', type=float, default=0.2, help="seconds to time each case for, at least")
+    parser.add_argument('--filter', help="run only the cases with this in the name")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+    results = run(args.max_size, args.min_time, args.filter)
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump({'python': sys.version.split()[0], 'results': results}, out, indent=1, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/bin/env python
+from __future__ import print_function
+
+"""
+Import time of the ebay_datameta_hadoop modules, what the short-lived Hadoop Streaming tasks pay at every start.
+Each run imports the module in a fresh interpreter and times just the import; reports the best and the median of
+the runs and the heavy dependencies the import loaded, which should be none: they load when the helpers that need
+them first run.
+
+Run from the ser/hadoop directory, needs the core on the PYTHONPATH same as the tests:
+    python benchmarks/bench_import.py [--module ebay_datameta_hadoop.base] [--runs 20] [--max-ms 50] [--json out.json]
+
+Exits with 1 if the import loads any of the HEAVY modules, or takes longer than the --max-ms, if given, by the median.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+
+MODULES = ('ebay_datameta_hadoop.base', 'ebay_datameta_hadoop.records')
+
+# must not load on the import
+HEAVY = ('numpy', 'bitarray', 'hadoop', 'decimal')
+
+PROBE = """
+import sys
+from timeit import default_timer
+start = default_timer()
+import %s
+elapsed = default_timer() - start
+print(elapsed)
+print(" ".join(sorted(set(m.split('.')[0] for m in sys.modules))))
+"""
+
+
+def measure(module):
+    """
+    Seconds the import of the given module takes in a fresh interpreter, and the top level modules loaded after it.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.join(HERE, '..')] + [p for p in sys.path if p])
+    out = subprocess.check_output([sys.executable, '-c', PROBE % module], env=env).decode('utf-8').splitlines()
+    return float(out[0]), set(out[1].split())
+
+
+def run(modules, runs):
+    results = []
+    for module in modules:
+        times = []
+        loaded = set()
+        for _ in range(runs):
+            elapsed, loaded = measure(module)
+            times.append(elapsed)
+        times.sort()
+        heavy = sorted(loaded.intersection(HEAVY))
+        result = {'module': module, 'bestMs': times[0] * 1e3, 'medianMs': times[len(times) // 2] * 1e3,
+                  'heavy': heavy}
+        results.append(result)
+        print("%-36s best %8.2f ms  median %8.2f ms  heavy: %s" % (
+            module, result['bestMs'], result['medianMs'], ", ".join(heavy) or "none"))
+        sys.stdout.flush()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DataMeta Hadoop import time")
+    parser.add_argument('--module', action='append', help="module to time, can repeat; the MODULES by default")
+    parser.add_argument('--runs', type=int, default=20, help="fresh interpreters per module")
+    parser.add_argument('--max-ms', type=float, help="fail if the median import takes longer")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+    results = run(args.module or MODULES, args.runs)
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump({'python': sys.version.split()[0], 'results': results}, out, indent=1, sort_keys=True)
+    failed = [r['module'] for r in results if r['heavy'] or (args.max_ms is not None and r['medianMs'] > args.max_ms)]
+    if failed:
+        print("Import too heavy: %s" % ", ".join(failed))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,68 @@
 #!/bin/env python
 
 import abc
+from collections import * # loaded by the core already, costs nothing
+from importlib import import_module
 
-from hadoop.io import WritableUtils, InputStream, OutputStream, Text
 from ebay_datameta_core.base import DateTime, SemVer
-from decimal import *
-from collections import *
-from bitarray import bitarray
+from ebay_datameta_core.pool import CanonicalPool
 
-from numpy import uint64, int64
+
+class _LazyAttr(object):
+    """
+    Stands in this module for an attribute of a module that is slow to import, until first used: then imports it
+    and puts the real attribute in its place, so that the code here, and whatever imports this module after that,
+    gets the real one directly. Those that imported it before go through this proxy, which forwards the calls,
+    the attributes and the isinstance checks, but not the identity: type(x) is Decimal is False on it, and
+    it won't do as a value passed on, like a NumPy dtype, use the _real for that.
+
+    Keeps the startup of the short-lived Hadoop Streaming tasks from paying for the hadoop.io, the NumPy and the rest
+    when they never get to the helpers that need those.
+    """
+
+    def __init__(self, module, name):
+        self._module = module
+        self._name = name
+        self._target = None
+
+    def resolve(self):
+        target = self._target
+        if target is None:
+            target = self._target = getattr(import_module(self._module), self._name)
+            globals()[self._name] = target
+        return target
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __instancecheck__(self, obj):
+        return isinstance(obj, self.resolve())
+
+    def __subclasscheck__(self, cls):
+        return issubclass(cls, self.resolve())
+
+    def __repr__(self):
+        return "<lazy %s.%s>" % (self._module, self._name)
+
+
+def _real(attr):
+    """
+    The real object of the given lazy attribute, the given one if it is real already.
+    """
+    return attr.resolve() if type(attr) is _LazyAttr else attr
+
+
+WritableUtils = _LazyAttr("hadoop.io", "WritableUtils")
+InputStream = _LazyAttr("hadoop.io", "InputStream")
+OutputStream = _LazyAttr("hadoop.io", "OutputStream")
+Text = _LazyAttr("hadoop.io", "Text")
+Decimal = _LazyAttr("decimal", "Decimal")
+bitarray = _LazyAttr("bitarray", "bitarray")
+uint64 = _LazyAttr("numpy", "uint64")
+int64 = _LazyAttr("numpy", "int64")
 
 class InOutable:
 
@@ -27,12 +81,48 @@ class InOutable:
         return
 
     @staticmethod
-    def writeVersion(do, ver):
-        Text.writeString(do, ver.semanticPartsOnly()) # Write a semantic version - semantic parts only to save space.
+    def writeVersion(do, ver): # SemVer or its string, the generated getVersion returns the string
+        Text.writeString(do, SemVer.of(ver).semanticPartsOnly()) # Write a semantic version - semantic parts only to save space.
 
     @staticmethod
     def readVersion(di):
-        return SemVer(Text.readString(di))
+        return SemVer.of(Text.readString(di))
+
+
+class PooledInOutable(InOutable):
+    """
+    Wraps the InOutable of a small embedded entity so that the instances it reads are canonicalized through the
+    CanonicalPool: repeated values decode to one shared, frozen by default, instance.
+    Pass it wherever the inner InOutable would go, for example to the readList/readSet/readDeque; use one per reader.
+
+    The read still decodes every instance in full before the pool lookup: the embedded entities are not length
+    framed, only parsing one finds where it ends, hence there are no bytes to key the pool on before that. Where the
+    records come framed, as from the RecordFileReader.rawRecords, the fromBytes keys the pool on the serialized bytes
+    and skips the decoding on a hit.
+    """
+
+    def __init__(self, io, pool=None):
+        self._io = io
+        self._pool = CanonicalPool() if pool is None else pool
+
+    def pool(self):
+        return self._pool
+
+    def read(self, di):
+        return self._pool.canonical(self._io.read(di))
+
+    def readVal(self, di, val): # reads into the given instance, nothing to share
+        return self._io.readVal(di, val)
+
+    def fromBytes(self, ba):
+        """
+        The pooled instance decoded from the given serialized bytes, decodes them only on a miss.
+        """
+        io = self._io
+        return self._pool.fromBytes(bytes(ba), lambda raw: BytesDataIoUtil.read(raw, io))
+
+    def write(self, do, val):
+        return self._io.write(do, val)
 
 
 class BytesDataIoUtil:
@@ -537,13 +627,14 @@ class DataMetaHadoopUtil:
         if bitLen % 64 != 0: i8Len += 1
 
         ulo = uint64(0)
+        toLong = _real(int64) # a dtype for the NumPy, the proxy won't do
         for ix in range(bitLen):
             loIx = uint64(ix % 64)
             if ba[ix]: ulo |= (uint64(1) << loIx)
             if loIx >= 63:
-                longs.append(ulo.astype(int64))
+                longs.append(ulo.astype(toLong))
                 ulo = uint64(0)
-        if bitLen ^ 64 != 0: longs.append(ulo.astype(int64))
+        if bitLen ^ 64 != 0: longs.append(ulo.astype(toLong))
         return longs
 
     @staticmethod
@@ -0,0 +1,192 @@
+#!/bin/env python
+
+import bisect
+import bz2
+import struct
+import zlib
+from enum import Enum
+
+try:
+    import lzma
+except ImportError: # Python 2
+    lzma = None
+
+from ebay_datameta_hadoop.records import VarInts, RecordEncoder, RecordDecoder
+
+MAGIC = b"DMBK"
+FORMAT_VERSION = 1
+
+Codec = Enum("Codec", "NONE ZLIB BZ2 LZMA")
+
+# the index offset and the magic again, at the very end of the file
+_FOOTER = struct.Struct(">Q4s")
+
+
+def _codec(codec, level):
+    # (compress, decompress) of the given codec at the given level, the codec's default if None
+    if codec == Codec.NONE: return (lambda data: data), (lambda data: data)
+    if codec == Codec.ZLIB:
+        return (lambda data: zlib.compress(data, 6 if level is None else level)), zlib.decompress
+    if codec == Codec.BZ2:
+        return (lambda data: bz2.compress(data, 9 if level is None else level)), bz2.decompress
+    if codec == Codec.LZMA:
+        if lzma is None: raise AttributeError("The LZMA codec needs Python 3.3 or later")
+        return (lambda data: lzma.compress(data, preset=6 if level is None else level)), lzma.decompress
+    raise AttributeError("Unsupported codec: %s" % (codec,))
+
+
+class BlockFileWriter(RecordEncoder):
+    """
+    Writes serialized records to a binary file-like in the compressed blocks: the records, each framed as the
+    RecordFileWriter does it, get grouped into the blocks of about the blockBytes before the compression, which
+    compresses the repeated strings and the small VInts across the records far better than the records one by one,
+    yet a reader only decompresses the block it needs, see the BlockFileReader.
+
+    The file: the MAGIC, the format version and the codec bytes; the compressed blocks; the block index, the VInt block
+    count and the VLong offset, the compressed size and the record count of each block; the footer, the 8 bytes offset
+    of the index and the MAGIC again. Close the writer to write the index, the file is not readable without it.
+
+    out - the binary file-like, need not be seekable
+    codec - one of the Codec
+    blockBytes - the uncompressed size at which a block gets compressed and written
+    level - the compression level, the codec's default if None
+    io, versioned - for the write method, as for the RecordFileWriter
+    """
+
+    DEFAULT_BLOCK_BYTES = 256 << 10
+
+    def __init__(self, out, codec=Codec.ZLIB, blockBytes=DEFAULT_BLOCK_BYTES, level=None, io=None, versioned=False):
+        if blockBytes < 1: raise AttributeError("Block size must be positive, got %s" % blockBytes)
+        self._compress = _codec(codec, level)[0]
+        self._out = out
+        self._io = io
+        self._versioned = versioned
+        self._blockBytes = blockBytes
+        self._pending = []
+        self._pendingBytes = 0
+        self._index = [] # (offset, compressed size, record count)
+        self.count = 0
+        header = MAGIC + struct.pack(">BB", FORMAT_VERSION, codec.value)
+        out.write(header)
+        self._pos = len(header)
+
+    def writeRaw(self, ba):
+        size = VarInts.encodeVLong(len(ba))
+        self._pending.append(size)
+        self._pending.append(ba)
+        self._pendingBytes += len(size) + len(ba)
+        self.count += 1
+        if self._pendingBytes >= self._blockBytes: self._writeBlock()
+
+    def _writeBlock(self):
+        if not self._pending: return
+        data = self._compress(b"".join(self._pending))
+        self._index.append((self._pos, len(data), len(self._pending) // 2))
+        self._out.write(data)
+        self._pos += len(data)
+        self._pending = []
+        self._pendingBytes = 0
+
+    def flush(self):
+        """
+        Ends the current block, even if it's short of the blockBytes, and flushes the file.
+        """
+        self._writeBlock()
+        self._out.flush()
+
+    def close(self):
+        self._writeBlock()
+        index = [VarInts.encodeVLong(len(self._index))]
+        for entry in self._index:
+            index.extend(VarInts.encodeVLong(v) for v in entry)
+        self._out.write(b"".join(index))
+        self._out.write(_FOOTER.pack(self._pos, MAGIC))
+        self._out.close()
+
+
+class BlockFileReader(RecordDecoder):
+    """
+    Reads the block files written by the BlockFileWriter from a seekable binary file-like, sequentially or by the
+    record number: it finds the block of the record in the index and decompresses only that block, keeping the last
+    one decompressed for the records that follow. Iterating decodes them as the RecordDecoder does.
+    """
+
+    def __init__(self, src, io=None, versioned=False):
+        self._src = src
+        self._io = io
+        self._versioned = versioned
+        head = src.read(len(MAGIC) + 2)
+        if len(head) != len(MAGIC) + 2 or head[:len(MAGIC)] != MAGIC: raise AttributeError("Not a block file")
+        version, codec = struct.unpack(">BB", head[len(MAGIC):])
+        if version != FORMAT_VERSION: raise AttributeError("Unsupported block file version %d" % version)
+        if not any(c.value == codec for c in Codec): raise AttributeError("Unsupported codec id %d" % codec)
+        self._decompress = _codec(Codec(codec), None)[1]
+        src.seek(-_FOOTER.size, 2)
+        indexAt, magic = _FOOTER.unpack(src.read(_FOOTER.size))
+        if magic != MAGIC: raise EOFError("Block file not closed: no index")
+        src.seek(indexAt)
+        buf = src.read()
+        count, pos = VarInts.decodeVLong(buf, 0)
+        self._offsets, self._sizes, self._firsts = [], [], []
+        total = 0
+        for _ in range(count):
+            offset, pos = VarInts.decodeVLong(buf, pos)
+            size, pos = VarInts.decodeVLong(buf, pos)
+            records, pos = VarInts.decodeVLong(buf, pos)
+            self._offsets.append(offset)
+            self._sizes.append(size)
+            self._firsts.append(total)
+            total += records
+        self._total = total
+        self._cached = (None, None)
+
+    def __len__(self):
+        return self._total
+
+    def blockCount(self):
+        return len(self._offsets)
+
+    def block(self, ix):
+        """
+        The list of the raw records of the block of the given index.
+        """
+        if self._cached[0] == ix: return self._cached[1]
+        self._src.seek(self._offsets[ix])
+        data = self._decompress(self._src.read(self._sizes[ix]))
+        records, pos = [], 0
+        while pos < len(data):
+            size, pos = VarInts.decodeVLong(data, pos)
+            records.append(data[pos:pos + size])
+            pos += size
+        self._cached = (ix, records)
+        return records
+
+    def _blockOf(self, n):
+        if not 0 <= n < self._total: raise AttributeError("Record %d out of range, %d records" % (n, self._total))
+        return bisect.bisect_right(self._firsts, n) - 1
+
+    def rawRecord(self, n):
+        """
+        The raw bytes of the record of the given number, counting from 0.
+        """
+        ix = self._blockOf(n)
+        return self.block(ix)[n - self._firsts[ix]]
+
+    def record(self, n):
+        return self._decode(self.rawRecord(n))
+
+    def rawRecords(self, start=0):
+        """
+        Generator of the raw records from the given record number on.
+        """
+        if start >= self._total: return
+        first = self._blockOf(start)
+        skip = start - self._firsts[first]
+        for ix in range(first, len(self._offsets)):
+            records = self.block(ix)
+            for ba in (records[skip:] if skip else records):
+                yield ba
+            skip = 0
+
+    def close(self):
+        self._src.close()
@@ -0,0 +1,172 @@
+#!/bin/env python
+
+import heapq
+import tempfile
+from enum import Enum
+from functools import reduce
+from operator import itemgetter
+
+from ebay_datameta_core.base import EntityDescriptor
+from ebay_datameta_hadoop.base import BytesDataIoUtil
+from ebay_datameta_hadoop.records import VarInts, RecordFileReader, RecordFileWriter
+
+
+class ExternalSorter(object):
+    """
+    Sorts the serialized records, more of them than fit in memory, by a key: buffers the records up to the memory budget,
+    spills each full buffer sorted to a temporary run file, then k-way merges the runs on a heap, streaming the output.
+    The records stay in their Hadoop serialization all the way, the spilled ones are framed with their keys next to them
+    so that the merge does not decode them again.
+
+    The sort is stable: the records with equal keys come out in the order they came in. Optionally, these can be
+    deduplicated, see the Dedupe.
+    keyOf - function of the record bytes to its sort key, see the identityKey for sorting entities by their identity
+    memoryBytes - the budget for the buffered records, counted as their sizes plus the RECORD_OVERHEAD each
+    dedupe - None to keep all the records, Dedupe.KEEP_FIRST, Dedupe.KEEP_LAST, or the function merging two records
+        with equal keys into one: of the entities if there is the io, otherwise of the record bytes
+    io - the InOutable to decode and encode the records for the merge function
+    fanIn - how many runs to merge at once at most, more runs get merged in several passes
+    tmpDir - where to spill the runs, the system temporary directory by default
+    """
+
+    Dedupe = Enum("Dedupe", "KEEP_FIRST KEEP_LAST")
+
+    # rough per-record cost on the heap: the bytes object, the key, the list slot
+    RECORD_OVERHEAD = 128
+    DEFAULT_MEMORY = 64 << 20
+    DEFAULT_FAN_IN = 64
+
+    def __init__(self, keyOf, memoryBytes=DEFAULT_MEMORY, dedupe=None, io=None, versioned=False,
+                 fanIn=DEFAULT_FAN_IN, tmpDir=None):
+        if memoryBytes <= 0: raise AttributeError("Memory budget must be positive, got %s" % memoryBytes)
+        if fanIn < 2: raise AttributeError("Merge fan-in must be at least 2, got %s" % fanIn)
+        if dedupe is not None and not isinstance(dedupe, ExternalSorter.Dedupe) and not callable(dedupe):
+            raise AttributeError("Unsupported dedupe policy: %s" % dedupe)
+        self._keyOf = keyOf
+        self._memoryBytes = memoryBytes
+        self._dedupe = dedupe
+        self._io = io
+        self._versioned = versioned
+        self._fanIn = fanIn
+        self._tmpDir = tmpDir
+        self.spills = 0
+
+    @staticmethod
+    def identityKey(io, cls, versioned=False):
+        """
+        Key function decoding the record with the given InOutable and taking the identity key tuple of the entity,
+        see the EntityDescriptor.keyOf.
+        """
+        keyOf = EntityDescriptor.of(cls).keyOf
+        read = BytesDataIoUtil.readVersioned if versioned else BytesDataIoUtil.read
+        return lambda ba: keyOf(read(ba, io))
+
+    def sort(self, records):
+        """
+        Generator of the given record bytes in the key order, deduplicated as configured.
+        """
+        return self._deduped(self._sorted(records))
+
+    def sortFile(self, src, out):
+        """
+        Sorts the records from the given binary file-like framed as by the RecordFileWriter into the given one.
+        Returns the count of the records written.
+        """
+        count = 0
+        for ba in self.sort(RecordFileReader(src).rawRecords()):
+            out.write(VarInts.encodeVLong(len(ba)))
+            out.write(ba)
+            count += 1
+        return count
+
+    def _sorted(self, records):
+        # yields (key, record bytes)
+        keyOf, budget, overhead = self._keyOf, self._memoryBytes, ExternalSorter.RECORD_OVERHEAD
+        buf = []
+        append = buf.append
+        used = 0
+        runs = []
+        try:
+            for ba in records:
+                append((keyOf(ba), ba))
+                used += len(ba) + overhead
+                if used >= budget:
+                    runs.append(self._spill(buf))
+                    del buf[:]
+                    used = 0
+            # stable sort keeps the arrival order of the equal keys
+            buf.sort(key=itemgetter(0))
+            if not runs:
+                for item in buf:
+                    yield item
+                return
+            if buf: runs.append(self._spill(buf, presorted=True))
+            del buf[:]
+            while len(runs) > self._fanIn:
+                # the merged run takes the place of its inputs, the run order breaks the ties
+                batch, rest = runs[:self._fanIn], runs[self._fanIn:]
+                runs = rest
+                runs.insert(0, self._spill(self._merged(batch), presorted=True))
+            for item in self._merged(runs):
+                yield item
+        finally:
+            for run in runs:
+                run.close()
+
+    def _spill(self, items, presorted=False):
+        if not presorted: items.sort(key=itemgetter(0))
+        run = tempfile.TemporaryFile(prefix="extsort", dir=self._tmpDir)
+        writeKeyed = RecordFileWriter(run).writeKeyed
+        for key, ba in items:
+            writeKeyed(key, ba)
+        run.flush()
+        run.seek(0)
+        self.spills += 1
+        return run
+
+    @staticmethod
+    def _readRun(run, runIndex):
+        # the run index and the sequence number in the run break the ties, the heap never compares the records
+        seq = 0
+        for key, ba in RecordFileReader(run).keyedRecords():
+            yield key, runIndex, seq, ba
+            seq += 1
+
+    def _merged(self, runs):
+        try:
+            for key, runIndex, seq, ba in heapq.merge(*[ExternalSorter._readRun(r, i) for i, r in enumerate(runs)]):
+                yield key, ba
+        finally:
+            for run in runs:
+                run.close()
+
+    def _deduped(self, items):
+        dedupe = self._dedupe
+        if dedupe is None:
+            for key, ba in items:
+                yield ba
+            return
+        lastKey, group = None, []
+        for key, ba in items:
+            if group and key != lastKey:
+                yield self._reduce(group)
+                del group[:]
+            lastKey = key
+            if dedupe is ExternalSorter.Dedupe.KEEP_FIRST:
+                if not group: group.append(ba)
+            elif dedupe is ExternalSorter.Dedupe.KEEP_LAST:
+                if group: group[0] = ba
+                else: group.append(ba)
+            else:
+                group.append(ba)
+        if group: yield self._reduce(group)
+
+    def _reduce(self, group):
+        if len(group) == 1: return group[0]
+        merge, io = self._dedupe, self._io
+        if io is None: return reduce(merge, group)
+        if self._versioned:
+            merged = reduce(merge, [BytesDataIoUtil.readVersioned(ba, io) for ba in group])
+            return BytesDataIoUtil.writeVersioned(io, merged)
+        return BytesDataIoUtil.write(io, reduce(merge, [BytesDataIoUtil.read(ba, io) for ba in group]))
+
@@ -0,0 +1,161 @@
+#!/bin/env python
+
+import tempfile
+from enum import Enum
+from itertools import chain
+
+from ebay_datameta_hadoop.records import RecordFileReader, RecordFileWriter
+
+
+class StreamJoin(object):
+    """
+    Joins two streams of records on a key, for example the KitchenSink with the ExampleNsRec on the otherNsRef.
+    The key functions take a record and return its join key: the EntityDescriptor.keyOf for the entities, the
+    RawComparator.encodeKey or the ExternalSorter.identityKey for the serialized records.
+
+    What comes out depends on the Kind:
+    * INNER - the (left, right) pair for every match
+    * LEFT - same, plus the (left, None) for every left record with no match
+    * ANTI - just the left records that have no match
+    The right side is the one looked up, with the hashJoin it is the one held in memory, so make it the smaller one.
+    """
+
+    Kind = Enum("Kind", "INNER LEFT ANTI")
+
+    # rough per-record cost on the heap: the bytes object, the key, the table slot
+    RECORD_OVERHEAD = 128
+    DEFAULT_MEMORY = 64 << 20
+    DEFAULT_PARTITIONS = 32
+    # past this many rounds of partitioning the partitions are joined in memory whatever their size:
+    # they can not get any smaller if they are all one key
+    MAX_DEPTH = 3
+
+    @staticmethod
+    def sortMerge(left, right, leftKey, rightKey=None, kind=Kind.INNER):
+        """
+        Streaming join of the two inputs both sorted by their keys; holds in memory only the right records
+        of the current key. Raises the AttributeError on an input out of the key order.
+        The output is in the key order.
+        """
+        if rightKey is None: rightKey = leftKey
+        emit = _EMITS[kind]
+        rights = _checkedSorted(right, rightKey, "right")
+        nextRight = next(rights, None)
+        groupKey, group = _MISSING, []
+        for lk, l in _checkedSorted(left, leftKey, "left"):
+            if groupKey is _MISSING or lk != groupKey:
+                while nextRight is not None and nextRight[0] < lk:
+                    nextRight = next(rights, None)
+                group = []
+                while nextRight is not None and nextRight[0] == lk:
+                    group.append(nextRight[1])
+                    nextRight = next(rights, None)
+                groupKey = lk
+            for out in emit(l, group):
+                yield out
+
+    @staticmethod
+    def hashJoin(left, right, leftKey, rightKey=None, kind=Kind.INNER, memoryBytes=DEFAULT_MEMORY,
+                 partitions=DEFAULT_PARTITIONS, tmpDir=None):
+        """
+        Grace hash join: builds the hash table of the right records and streams the left ones through it. If the right
+        side outgrows the memory budget, both sides get partitioned by the key hash into temporary files and then
+        joined partition by partition, repartitioning the ones still too big.
+        The records are counted as their sizes plus the RECORD_OVERHEAD each, and to spill, they must be bytes:
+        the serialized records, as they come out of the BytesDataIoUtil.write or the RecordFileReader.
+        The output is in no particular order.
+        """
+        if memoryBytes <= 0: raise AttributeError("Memory budget must be positive, got %s" % memoryBytes)
+        if partitions < 2: raise AttributeError("Need at least 2 partitions, got %s" % partitions)
+        if rightKey is None: rightKey = leftKey
+        return _GraceJoin(_EMITS[kind], memoryBytes, partitions, tmpDir).join(
+            ((leftKey(l), l) for l in left), ((rightKey(r), r) for r in right), 0)
+
+
+_MISSING = object()
+
+
+def _checkedSorted(records, keyOf, side):
+    last = _MISSING
+    for rec in records:
+        key = keyOf(rec)
+        if last is not _MISSING and key < last:
+            raise AttributeError("The %s input is not sorted: %r after %r" % (side, key, last))
+        last = key
+        yield key, rec
+
+
+def _emitInner(l, matches):
+    return ((l, r) for r in matches)
+
+
+def _emitLeft(l, matches):
+    return ((l, r) for r in matches) if matches else ((l, None),)
+
+
+def _emitAnti(l, matches):
+    return () if matches else (l,)
+
+
+_EMITS = {StreamJoin.Kind.INNER: _emitInner, StreamJoin.Kind.LEFT: _emitLeft, StreamJoin.Kind.ANTI: _emitAnti}
+
+
+class _GraceJoin(object):
+
+    def __init__(self, emit, memoryBytes, partitions, tmpDir):
+        self.emit = emit
+        self.memoryBytes = memoryBytes
+        self.partitions = partitions
+        self.tmpDir = tmpDir
+
+    def join(self, lefts, rights, depth):
+        # both are iterables of (key, record)
+        emit, budget, overhead = self.emit, self.memoryBytes, StreamJoin.RECORD_OVERHEAD
+        table = {}
+        used = 0
+        rights = iter(rights)
+        spill = False
+        for key, r in rights:
+            matches = table.get(key)
+            if matches is None: table[key] = [r]
+            else: matches.append(r)
+            used += len(r) + overhead
+            if used >= budget and depth < StreamJoin.MAX_DEPTH:
+                spill = True
+                break
+        if not spill:
+            for key, l in lefts:
+                for out in emit(l, table.get(key, ())):
+                    yield out
+            return
+
+        buffered = ((key, r) for key, matches in table.items() for r in matches)
+        rightParts = self._partition(chain(buffered, rights), depth)
+        table = None
+        leftParts = self._partition(lefts, depth)
+        try:
+            for (lp, lCount), (rp, rCount) in zip(leftParts, rightParts):
+                if lCount == 0: continue
+                rs = RecordFileReader(rp).keyedRecords() if rCount else ()
+                for out in self.join(RecordFileReader(lp).keyedRecords(), rs, depth + 1):
+                    yield out
+                lp.close()
+                rp.close()
+        finally:
+            for f, _ in chain(leftParts, rightParts):
+                f.close()
+
+    def _partition(self, items, depth):
+        # the depth salts the hash so that the repartitioning splits what the previous round had put together
+        parts = [tempfile.TemporaryFile(prefix="join", dir=self.tmpDir) for _ in range(self.partitions)]
+        writers = [RecordFileWriter(f).writeKeyed for f in parts]
+        counts = [0] * self.partitions
+        count = self.partitions
+        for key, rec in items:
+            ix = hash((depth, key)) % count
+            writers[ix](key, rec)
+            counts[ix] += 1
+        for f in parts:
+            f.flush()
+            f.seek(0)
+        return list(zip(parts, counts))
@@ -0,0 +1,183 @@
+#!/bin/env python
+
+import threading
+
+try:
+    from queue import Queue, Empty
+except ImportError: # Python 2
+    from Queue import Queue, Empty
+
+from ebay_datameta_hadoop.records import RecordEncoder, RecordDecoder
+
+# the markers in the queues
+_END = object()
+_FLUSH = object()
+
+
+class PrefetchingReader(RecordDecoder):
+    """
+    Reads the raw records ahead in a background thread, so that the file reads overlap with the decoding and whatever
+    the caller does with the records: the thread pulls the records from the given iterable, for example the
+    RecordFileReader.rawRecords or the BlockFileReader.rawRecords, into a bounded queue in the batches of the given
+    size, and blocks once there are the depth batches waiting. The decoding runs in the caller's thread.
+
+    An error in the background thread is raised to the caller once the records read before it are through.
+    Close the reader to stop the thread early; the thread does not close the source.
+    Iterating decodes the records as the RecordDecoder does.
+    stalls - how many times the caller found the queue empty and had to wait: grow the depth if it keeps growing
+    """
+
+    DEFAULT_DEPTH = 8
+    DEFAULT_BATCH = 256
+
+    def __init__(self, records, io=None, versioned=False, depth=DEFAULT_DEPTH, batch=DEFAULT_BATCH):
+        if depth < 1 or batch < 1: raise AttributeError("Depth and batch must be positive, got %s, %s" % (depth, batch))
+        self._io = io
+        self._versioned = versioned
+        self._queue = Queue(depth)
+        self._stopped = False
+        self._done = False
+        self._error = None
+        self.stalls = 0
+        self._thread = threading.Thread(target=self._fill, args=(iter(records), batch))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _fill(self, records, batch):
+        put = self._queue.put
+        chunk = []
+        try:
+            for ba in records:
+                if self._stopped: return
+                chunk.append(ba)
+                if len(chunk) >= batch:
+                    put(chunk)
+                    chunk = []
+        except Exception as e:
+            self._error = e
+        finally:
+            if chunk and not self._stopped: put(chunk)
+            put(_END)
+
+    def rawRecords(self):
+        queue = self._queue
+        while not self._done:
+            if queue.empty(): self.stalls += 1
+            chunk = queue.get()
+            if chunk is _END:
+                self._done = True
+                if self._error is not None: raise self._error
+                return
+            for ba in chunk:
+                yield ba
+
+    def close(self):
+        """
+        Stops the background thread, dropping whatever it has read ahead.
+        """
+        self._stopped = True
+        self._done = True
+        while self._thread.is_alive():
+            try:
+                self._queue.get(timeout=0.05) # unblock the thread if it waits for the room in the queue
+            except Empty:
+                pass
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class WriteBehindWriter(RecordEncoder):
+    """
+    Writes the records through the given writer in a background thread, so that the file writes overlap with
+    the encoding and whatever the caller does in between: the write encodes the entity in the caller's thread,
+    the encoded records go to a bounded queue in the batches of the given size, the write blocks once there are
+    the depth batches waiting, the thread passes them on to the writer's writeRaw. Wraps any writer with the writeRaw,
+    flush and close: the RecordFileWriter, the BlockFileWriter, the SplittableFileWriter.
+
+    The flush waits for the queue to drain and then flushes the writer, the close also closes it. An error in the
+    background thread is raised from the next write, flush or close; the records after it are dropped.
+    stalls - how many times the write found the queue full and had to wait: the writer can't keep up
+    """
+
+    DEFAULT_DEPTH = 8
+    DEFAULT_BATCH = 256
+
+    def __init__(self, writer, io=None, versioned=False, depth=DEFAULT_DEPTH, batch=DEFAULT_BATCH):
+        if depth < 1 or batch < 1: raise AttributeError("Depth and batch must be positive, got %s, %s" % (depth, batch))
+        self._writer = writer
+        self._io = io
+        self._versioned = versioned
+        self._batch = batch
+        self._pending = []
+        self._queue = Queue(depth)
+        self._error = None
+        self._closed = False
+        self.count = 0
+        self.stalls = 0
+        self._thread = threading.Thread(target=self._drain)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _drain(self):
+        queue, writer = self._queue, self._writer
+        while True:
+            chunk = queue.get()
+            try:
+                if chunk is _END: return
+                if self._error is not None: continue
+                if chunk is _FLUSH:
+                    writer.flush()
+                else:
+                    for ba in chunk:
+                        writer.writeRaw(ba)
+            except Exception as e:
+                self._error = e
+            finally:
+                queue.task_done()
+
+    def _put(self, item):
+        if self._queue.full(): self.stalls += 1
+        self._queue.put(item)
+
+    def _checkError(self):
+        if self._error is not None: raise self._error
+
+    def writeRaw(self, ba):
+        self._checkError()
+        self._pending.append(ba)
+        self.count += 1
+        if len(self._pending) >= self._batch:
+            self._put(self._pending)
+            self._pending = []
+
+    def flush(self):
+        if self._pending:
+            self._put(self._pending)
+            self._pending = []
+        self._put(_FLUSH)
+        self._queue.join()
+        self._checkError()
+
+    def close(self):
+        if self._closed: return
+        self._closed = True
+        if self._pending:
+            self._put(self._pending)
+            self._pending = []
+        self._put(_END)
+        self._thread.join()
+        self._writer.close()
+        self._checkError()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
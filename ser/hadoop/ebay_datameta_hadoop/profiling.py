@@ -0,0 +1,252 @@
+#!/bin/env python
+
+from timeit import default_timer
+
+from ebay_datameta_core.base import EntityDescriptor
+from ebay_datameta_hadoop.base import DataMetaHadoopUtil
+
+NULL_FLAGS = "<nullFlags>"
+# bytes of an entity read or written before any of its field accessors gets called
+PREAMBLE = "<preamble>"
+
+# sizes of the fixed width DataInput/DataOutput items
+_FIXED_SIZES = {'Byte': 1, 'UByte': 1, 'Boolean': 1, 'Short': 2, 'UShort': 2, 'Char': 2, 'Int': 4, 'Long': 8,
+                'Float': 4, 'Double': 8}
+
+
+class SerializationProfiler(object):
+    """
+    Opt-in profiler of the Hadoop serialization: counts the calls, the cumulative time and the bytes, per
+    DataMetaHadoopUtil helper, per watched InOutable and per field of the watched entity classes.
+
+    Nothing is instrumented until it is enabled, and disabling puts all the original methods back, so there is
+    no overhead at all while it is off. Enabled, it replaces the read/write helpers of the DataMetaHadoopUtil,
+    the read/write of the watched InOutable instances and the getters/setters of the watched classes. The streams
+    get wrapped into the counting proxies on the way in.
+
+    The helper numbers are inclusive: the writeListString counts the writeTextIfAny calls it makes too.
+    The field numbers come from the accessor calls: whatever is written after a field's getter, or read before its
+    setter, is the field's; the null flags go to the NULL_FLAGS pseudo-field.
+    Only one profiler can be enabled at a time. Not thread safe.
+
+    Usage:
+        profiler = SerializationProfiler()
+        profiler.watch(MULTI_FIELD_ID_IO, MultiFieldId)
+        with profiler:
+            ... read and write ...
+        stats = profiler.snapshot()
+    """
+
+    _active = None
+
+    def __init__(self):
+        self._watched = [] # (InOutable, entity class)
+        self._patches = [] # (owner, attribute name, original or None if it was not in the owner's dict)
+        self._frames = []
+        self.reset()
+
+    def reset(self):
+        self._helpers = {}
+        self._entities = {}
+        self._fields = {}
+
+    def watch(self, io, cls):
+        """
+        Profiles the given InOutable and the fields of the given entity class it reads and writes.
+        """
+        self._watched.append((io, cls))
+        if self.isEnabled(): self._instrument(io, cls)
+        return self
+
+    def isEnabled(self):
+        return SerializationProfiler._active is self
+
+    def enable(self):
+        if self.isEnabled(): return self
+        if SerializationProfiler._active is not None: raise AttributeError("Another profiler is already enabled")
+        SerializationProfiler._active = self
+        for name, member in list(vars(DataMetaHadoopUtil).items()):
+            if isinstance(member, staticmethod) and (name.startswith("read") or name.startswith("write")):
+                self._patch(DataMetaHadoopUtil, name, staticmethod(self._helper(name, member.__get__(None, object))))
+        for io, cls in self._watched:
+            self._instrument(io, cls)
+        return self
+
+    def disable(self):
+        if not self.isEnabled(): return self
+        for owner, name, original in reversed(self._patches):
+            if original is None: delattr(owner, name)
+            else: setattr(owner, name, original)
+        del self._patches[:]
+        del self._frames[:]
+        SerializationProfiler._active = None
+        return self
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, *exc):
+        self.disable()
+        return False
+
+    def snapshot(self):
+        """
+        Copy of the numbers: a dict with the 'helpers', 'inOutables' and 'fields', each a dict of the dicts with
+        the 'calls', 'seconds' and 'bytes', keyed by the helper name, the entity class name and the Class.field
+        respectively.
+        """
+        def copy(stats):
+            return dict((k, {'calls': v[0], 'seconds': v[1], 'bytes': v[2]}) for k, v in stats.items())
+        return {'helpers': copy(self._helpers), 'inOutables': copy(self._entities), 'fields': copy(self._fields)}
+
+    def _patch(self, owner, name, replacement):
+        self._patches.append((owner, name, vars(owner).get(name)))
+        setattr(owner, name, replacement)
+
+    def _helper(self, name, fn):
+        # the stream is the first argument of all of them but the writeCollection
+        streamIx = 1 if name == "writeCollection" else 0
+        proxy = _CountingOutput if name.startswith("write") else _CountingInput
+        flags = name in ("readBitArray", "writeBitArray")
+        stats = self._helpers.setdefault(name, [0, 0.0, 0])
+        profiler = self
+
+        def profiled(*args):
+            stream = args[streamIx]
+            if not isinstance(stream, _Counting):
+                stream = proxy(stream)
+                args = args[:streamIx] + (stream,) + args[streamIx + 1:]
+            frame = profiler._frames[-1] if flags and profiler._frames else None
+            if frame is not None: frame.flush(None)
+            before, start = stream.count, default_timer()
+            result = fn(*args)
+            stats[0] += 1
+            stats[1] += default_timer() - start
+            stats[2] += stream.count - before
+            if frame is not None: frame.flush(NULL_FLAGS)
+            return result
+        return profiled
+
+    def _instrument(self, io, cls):
+        profiler = self
+        stats = self._entities.setdefault(cls.__name__, [0, 0.0, 0])
+        origRead, origWrite = io.read, io.write
+
+        def run(fn, stream, proxy, args, reading):
+            if not isinstance(stream, _Counting): stream = proxy(stream)
+            frame = _Frame(profiler, cls, stream, reading)
+            profiler._frames.append(frame)
+            try:
+                return fn(stream, *args)
+            finally:
+                frame.flush(None if reading else frame.field)
+                profiler._frames.pop()
+                stats[0] += 1
+                stats[1] += default_timer() - frame.start
+                stats[2] += stream.count - frame.startCount
+
+        self._patch(io, 'read', lambda di: run(origRead, di, _CountingInput, (), True))
+        self._patch(io, 'write', lambda do, val: run(origWrite, do, _CountingOutput, (val,), False))
+        # the read calls the readVal, the direct readVal calls get profiled the same way as the reads
+        origReadVal = io.readVal
+        self._patch(io, 'readVal', lambda di, val: origReadVal(di, val) if profiler._frames
+                    and profiler._frames[-1].cls is cls else run(origReadVal, di, _CountingInput, (val,), True))
+
+        desc = EntityDescriptor.of(cls)
+        for field, getter, setter in zip(desc.fields, desc.getters, desc.setters):
+            self._patch(cls, getter, self._accessor(cls, field, getattr(cls, getter), reading=False))
+            self._patch(cls, setter, self._accessor(cls, field, getattr(cls, setter), reading=True))
+
+    def _accessor(self, cls, field, fn, reading):
+        frames = self._frames
+
+        def profiled(entity, *args):
+            if frames:
+                frame = frames[-1]
+                if frame.reading == reading and isinstance(entity, frame.cls):
+                    # reading: the bytes so far were this field's; writing: the bytes from now on will be
+                    frame.flush(field if reading else frame.field)
+                    if not reading: frame.field = field
+            return fn(entity, *args)
+        return profiled
+
+    def _addField(self, cls, field, seconds, count):
+        key = "%s.%s" % (cls.__name__, field)
+        stats = self._fields.get(key)
+        if stats is None:
+            stats = self._fields[key] = [0, 0.0, 0]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] += count
+
+
+class _Frame(object):
+    """
+    One entity being read or written by a watched InOutable: where the last field accounting stopped.
+    """
+
+    def __init__(self, profiler, cls, stream, reading):
+        self.profiler = profiler
+        self.cls = cls
+        self.stream = stream
+        self.reading = reading
+        self.field = PREAMBLE
+        self.start = self.mark = default_timer()
+        self.startCount = self.markCount = stream.count
+
+    def flush(self, field):
+        """
+        Books the time and the bytes since the last mark to the given field, or drops them if None; moves the mark.
+        """
+        now, count = default_timer(), self.stream.count
+        if field is not None:
+            self.profiler._addField(self.cls, field, now - self.mark, count - self.markCount)
+        self.mark, self.markCount = now, count
+
+
+class _Counting(object):
+    """
+    Counting proxy of a DataInput or a DataOutput: delegates everything, counts the bytes.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.count = 0
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _CountingOutput(_Counting):
+
+    def write(self, b):
+        self._stream.write(b)
+        self.count += len(b)
+
+
+class _CountingInput(_Counting):
+
+    def read(self, length):
+        result = self._stream.read(length)
+        self.count += len(result)
+        return result
+
+
+def _fixedWriter(name, size):
+    def write(self, v):
+        getattr(self._stream, name)(v)
+        self.count += size
+    return write
+
+
+def _fixedReader(name, size):
+    def read(self):
+        result = getattr(self._stream, name)()
+        self.count += size
+        return result
+    return read
+
+
+for _kind, _size in _FIXED_SIZES.items():
+    setattr(_CountingOutput, "write" + _kind, _fixedWriter("write" + _kind, _size))
+    setattr(_CountingInput, "read" + _kind, _fixedReader("read" + _kind, _size))
@@ -0,0 +1,293 @@
+#!/bin/env python
+
+import math
+import struct
+from decimal import Decimal
+
+try:
+    from itertools import izip
+except ImportError:
+    izip = zip
+
+from ebay_datameta_hadoop.records import VarInts
+
+
+class RawLayout(object):
+    """
+    Wire layout of the records of one entity class as the generated InOutables write them: the null flags for the
+    optional fields first, by the field index, then the fields in the declaration order, the null ones skipped.
+
+    Each field is one of the kinds below, a nested RawLayout for an embedded entity, or a listOf(kind) for a list,
+    a set or a deque of those.
+    Example, the MultiFieldId: RawLayout([LONG, LONG, TEXT, DTTM, TEXT], optional=[3], names="a b c timing text".split())
+    """
+
+    INT = "int" # VInt
+    LONG = "long" # VLong
+    TEXT = "text" # VInt length and UTF-8
+    BOOL = "bool" # one byte
+    FLOAT = "float" # 4 bytes, big-endian IEEE
+    DOUBLE = "double" # 8 bytes, big-endian IEEE
+    DTTM = "dttm" # VInt time zone and VLong millis, see DataMetaHadoopUtil.writeDttm
+    DTTM_UTC = "dttmUtc" # VLong millis
+    DECIMAL = "decimal" # as text
+
+    LIST = "list"
+
+    def __init__(self, kinds, optional=(), nullFlags=True, names=None):
+        """
+        kinds - the kinds of the fields in the declaration order
+        optional - the indexes of the optional fields
+        nullFlags - False if the records do not start with the null flags
+        names - optional names of the fields for the reports, the indexes by default
+        """
+        for kind in kinds:
+            RawLayout._checkKind(kind)
+        self.kinds = tuple(kinds)
+        self.optional = frozenset(optional)
+        self.nullFlags = nullFlags
+        self.names = tuple(names) if names is not None else tuple(str(ix) for ix in range(len(self.kinds)))
+        if len(self.names) != len(self.kinds):
+            raise AttributeError("%d field names for %d fields" % (len(self.names), len(self.kinds)))
+        for ix in self.optional:
+            if not 0 <= ix < len(self.kinds): raise AttributeError("Optional field index %d out of range" % ix)
+
+    @staticmethod
+    def listOf(kind):
+        RawLayout._checkKind(kind)
+        return RawLayout.LIST, kind
+
+    @staticmethod
+    def _checkKind(kind):
+        if isinstance(kind, RawLayout) or kind in _SKIPS: return
+        if isinstance(kind, tuple) and len(kind) == 2 and kind[0] == RawLayout.LIST:
+            RawLayout._checkKind(kind[1])
+            return
+        raise AttributeError("Unsupported field kind: %s" % (kind,))
+
+    def skip(self, buf, pos=0):
+        """
+        Position past the record of this layout starting at the given position.
+        """
+        nulls, pos = self.readNullFlags(buf, pos)
+        for ix, kind in enumerate(self.kinds):
+            if ix in self.optional and _isSet(nulls, ix): continue
+            pos = _skip(kind, buf, pos)
+        return pos
+
+    def readNullFlags(self, buf, pos):
+        """
+        The null flags as the list of the signed longs they are written as, and the position past them.
+        """
+        if not self.nullFlags: return (), pos
+        count, pos = VarInts.decodeVLong(buf, pos)
+        longs = []
+        for _ in range(count):
+            val, pos = VarInts.decodeVLong(buf, pos)
+            longs.append(val)
+        return longs, pos
+
+
+class RawComparator(object):
+    """
+    Compares the serialized records of one RawLayout on the given key fields without decoding the records:
+    only the key fields get decoded, the rest are just skipped over, the texts are compared as UTF-8 bytes,
+    which orders them by the code points. Null sorts before any value. The floats and the doubles order as by the
+    Java Double.compare: the -0.0 before the 0.0, all the NaNs equal and after the infinity.
+
+    The encodeKey turns the key of a record into the bytes which plain bytes comparison orders the same way
+    as the compare; handy as the key for the sorts and for the ExternalSorter. The INT and the LONG fields must be
+    in their ranges for it, it raises an AttributeError otherwise.
+    layout - the RawLayout of the records
+    keys - the indexes of the key fields, in the order of their precedence
+    versioned - True if the records start with the version, as written by the BytesDataIoUtil.writeVersioned
+    """
+
+    def __init__(self, layout, keys, versioned=False):
+        for ix in keys:
+            if not 0 <= ix < len(layout.kinds): raise AttributeError("Key field index %d out of range" % ix)
+            if layout.kinds[ix] not in _DECODES:
+                raise AttributeError("Field %d: a key field must be of a primitive kind, not %s" % (ix, layout.kinds[ix]))
+        self._layout = layout
+        self._keys = tuple(keys)
+        self._versioned = versioned
+        self._last = max(keys) if keys else -1
+        self._ordered = list(keys) == sorted(keys)
+        self._keySet = frozenset(keys)
+        for ix in keys:
+            if layout.kinds[ix] == RawLayout.DECIMAL:
+                self._encoders = None # no order-preserving bytes for the decimals
+                break
+        else:
+            self._encoders = tuple(_ENCODES[layout.kinds[ix]] for ix in keys)
+
+    def _fields(self, buf):
+        # yields (field index, position of the field or None if null) up to the last key field
+        layout = self._layout
+        pos = _skip(RawLayout.TEXT, buf, 0) if self._versioned else 0
+        nulls, pos = layout.readNullFlags(buf, pos)
+        optional, kinds = layout.optional, layout.kinds
+        for ix in range(self._last + 1):
+            if ix in optional and _isSet(nulls, ix):
+                yield ix, None
+                continue
+            yield ix, pos
+            if ix < self._last: pos = _skip(kinds[ix], buf, pos)
+
+    def _keyPositions(self, buf):
+        found = dict(self._fields(buf))
+        return [(ix, found[ix]) for ix in self._keys]
+
+    def values(self, buf):
+        """
+        The tuple of the key values of the given record, the texts as UTF-8 bytes.
+        """
+        kinds = self._layout.kinds
+        return tuple(None if pos is None else _DECODES[kinds[ix]](buf, pos) for ix, pos in self._keyPositions(buf))
+
+    def compare(self, a, b):
+        """
+        Negative, zero or positive as the key of the record a is less than, equal to or greater than that of b.
+        Stops at the first differing key field if the keys are in the field order.
+        """
+        kinds = self._layout.kinds
+        if self._ordered:
+            keys = self._keySet
+            pairs = ((ia, pa, pb) for (ia, pa), (ib, pb) in izip(self._fields(a), self._fields(b)) if ia in keys)
+        else:
+            pairs = ((ia, pa, pb) for (ia, pa), (ib, pb) in izip(self._keyPositions(a), self._keyPositions(b)))
+        for ix, pa, pb in pairs:
+            if pa is None or pb is None:
+                if pa is None and pb is None: continue
+                return -1 if pa is None else 1
+            decode = _COMPARABLES[kinds[ix]]
+            va, vb = decode(a, pa), decode(b, pb)
+            if va != vb: return -1 if va < vb else 1
+        return 0
+
+    def __call__(self, a, b):
+        return self.compare(a, b)
+
+    def encodeKey(self, buf):
+        """
+        The order-preserving bytes of the key of the given record.
+        """
+        if self._encoders is None: raise AttributeError("Decimal key fields have no order-preserving encoding")
+        optional = self._layout.optional
+        parts = []
+        for (ix, pos), encode in zip(self._keyPositions(buf), self._encoders):
+            if ix in optional:
+                if pos is None:
+                    parts.append(b'\x00')
+                    continue
+                parts.append(b'\x01')
+            parts.append(encode(buf, pos))
+        return b''.join(parts)
+
+
+def _isSet(nulls, ix):
+    word = ix >> 6
+    return word < len(nulls) and (nulls[word] >> (ix & 63)) & 1
+
+
+def _skipVLong(buf, pos):
+    return pos + VarInts.decodeSize(struct.unpack_from('b', buf, pos)[0])
+
+
+def _skipText(buf, pos):
+    size, pos = VarInts.decodeVLong(buf, pos)
+    return pos + size
+
+
+def _skip(kind, buf, pos):
+    if isinstance(kind, RawLayout): return kind.skip(buf, pos)
+    if isinstance(kind, tuple):
+        count, pos = VarInts.decodeVLong(buf, pos)
+        for _ in range(count):
+            pos = _skip(kind[1], buf, pos)
+        return pos
+    return _SKIPS[kind](buf, pos)
+
+
+_SKIPS = {
+    RawLayout.INT: _skipVLong,
+    RawLayout.LONG: _skipVLong,
+    RawLayout.TEXT: _skipText,
+    RawLayout.BOOL: lambda buf, pos: pos + 1,
+    RawLayout.FLOAT: lambda buf, pos: pos + 4,
+    RawLayout.DOUBLE: lambda buf, pos: pos + 8,
+    RawLayout.DTTM: lambda buf, pos: _skipVLong(buf, _skipVLong(buf, pos)),
+    RawLayout.DTTM_UTC: _skipVLong,
+    RawLayout.DECIMAL: _skipText,
+}
+
+
+def _decodeVLong(buf, pos):
+    return VarInts.decodeVLong(buf, pos)[0]
+
+
+def _decodeTextBytes(buf, pos):
+    size, pos = VarInts.decodeVLong(buf, pos)
+    return bytes(buf[pos:pos + size])
+
+
+_DECODES = {
+    RawLayout.INT: _decodeVLong,
+    RawLayout.LONG: _decodeVLong,
+    RawLayout.TEXT: _decodeTextBytes,
+    RawLayout.BOOL: lambda buf, pos: struct.unpack_from('?', buf, pos)[0],
+    RawLayout.FLOAT: lambda buf, pos: struct.unpack_from('>f', buf, pos)[0],
+    RawLayout.DOUBLE: lambda buf, pos: struct.unpack_from('>d', buf, pos)[0],
+    RawLayout.DTTM: lambda buf, pos: _decodeVLong(buf, _skipVLong(buf, pos)), # the time zone is always UTC
+    RawLayout.DTTM_UTC: _decodeVLong,
+    RawLayout.DECIMAL: lambda buf, pos: Decimal(_decodeTextBytes(buf, pos).decode('utf-8')),
+}
+
+
+def _encodeSigned(fmt, bias):
+    # biased to unsigned: the big-endian bytes then sort like the numbers
+    def encode(buf, pos):
+        val = _decodeVLong(buf, pos)
+        if not -bias <= val < bias: raise AttributeError("Key value %d out of the %d bits range" % (val, size))
+        return struct.pack(fmt, val + bias)
+    size = struct.calcsize(fmt) * 8
+    return encode
+
+
+def _encodeText(buf, pos):
+    # escape the zeros so that the terminator sorts before any content
+    return _decodeTextBytes(buf, pos).replace(b'\x00', b'\x00\xff') + b'\x00\x00'
+
+
+def _encodeIeee(size):
+    fmt = '>f' if size == 4 else '>d'
+    # the canonical NaN of the Java, all the NaNs encode as it; struct.pack of the float('nan') may set the sign
+    nan = b'\x7f\xc0\x00\x00' if size == 4 else b'\x7f\xf8\x00\x00\x00\x00\x00\x00'
+
+    def encode(buf, pos):
+        b = bytearray(buf[pos:pos + size])
+        if math.isnan(struct.unpack_from(fmt, buf, pos)[0]): b = bytearray(nan)
+        if b[0] & 0x80:
+            for i in range(size):
+                b[i] ^= 0xFF
+        else:
+            b[0] ^= 0x80
+        return bytes(b)
+    return encode
+
+
+_ENCODES = {
+    RawLayout.INT: _encodeSigned('>I', 1 << 31),
+    RawLayout.LONG: _encodeSigned('>Q', 1 << 63),
+    RawLayout.TEXT: _encodeText,
+    RawLayout.BOOL: lambda buf, pos: bytes(buf[pos:pos + 1]),
+    RawLayout.FLOAT: _encodeIeee(4),
+    RawLayout.DOUBLE: _encodeIeee(8),
+    RawLayout.DTTM: lambda buf, pos: _ENCODES[RawLayout.LONG](buf, _skipVLong(buf, pos)),
+    RawLayout.DTTM_UTC: _encodeSigned('>Q', 1 << 63),
+}
+
+# what the compare compares the key fields by: the decoded values, the order-preserving bytes for the floats
+_COMPARABLES = dict(_DECODES)
+_COMPARABLES[RawLayout.FLOAT] = _ENCODES[RawLayout.FLOAT]
+_COMPARABLES[RawLayout.DOUBLE] = _ENCODES[RawLayout.DOUBLE]
@@ -0,0 +1,183 @@
+#!/bin/env python
+
+import pickle
+import struct
+
+from ebay_datameta_hadoop.base import BytesDataIoUtil
+
+
+class VarInts:
+    """
+    Hadoop variable length integers straight on byte buffers, without the streams: same bytes as the
+    WritableUtils.writeVLong/writeVInt produce and readVLong/readVInt consume.
+    """
+
+    @staticmethod
+    def encodeVLong(value):
+        if -112 <= value <= 127: return struct.pack('b', value)
+        length = -112
+        if value < 0:
+            value ^= -1 # one's complement
+            length = -120
+        tmp = value
+        while tmp != 0:
+            tmp >>= 8
+            length -= 1
+        count = -(length + 120) if length < -120 else -(length + 112)
+        result = bytearray(count + 1)
+        result[0] = length & 0xFF
+        for ix in range(count):
+            result[count - ix] = (value >> (ix << 3)) & 0xFF
+        return bytes(result)
+
+    @staticmethod
+    def decodeVLong(buf, pos=0):
+        """
+        Decodes the VLong (or VInt) at the given position of the given buffer, returns the value and the position
+        past it.
+        """
+        first = struct.unpack_from('b', buf, pos)[0]
+        if first >= -112: return first, pos + 1
+        size = VarInts.decodeSize(first)
+        value = 0
+        for b in bytearray(buf[pos + 1:pos + size]):
+            value = (value << 8) | b
+        return (value ^ -1) if first < -120 else value, pos + size
+
+    @staticmethod
+    def decodeSize(first):
+        """
+        Total size in bytes of the VLong that starts with the given signed byte.
+        """
+        if first >= -112: return 1
+        return -119 - first if first < -120 else -111 - first
+
+    @staticmethod
+    def encodeText(s):
+        """
+        Same bytes as the Text.writeString.
+        """
+        data = s.encode('utf-8')
+        return VarInts.encodeVLong(len(data)) + data
+
+    @staticmethod
+    def decodeText(buf, pos=0):
+        size, pos = VarInts.decodeVLong(buf, pos)
+        return bytes(buf[pos:pos + size]).decode('utf-8'), pos + size
+
+    @staticmethod
+    def readVLong(src):
+        """
+        Reads the VLong from the given binary file-like, returns None at the end of the file.
+        """
+        head = src.read(1)
+        if not head: return None
+        first = struct.unpack('b', head)[0]
+        size = VarInts.decodeSize(first)
+        if size == 1: return first
+        rest = src.read(size - 1)
+        if len(rest) != size - 1: raise EOFError("Truncated VLong")
+        return VarInts.decodeVLong(head + rest)[0]
+
+
+class RecordEncoder(object):
+    """
+    Mixin for the record writers: the write encodes the entity with the writer's InOutable, the _io, with the version
+    in front if the _versioned is set, and passes the bytes on to the writeRaw.
+    """
+
+    def write(self, val):
+        self.writeRaw(BytesDataIoUtil.writeVersioned(self._io, val) if self._versioned
+                      else BytesDataIoUtil.write(self._io, val))
+
+
+class RecordDecoder(object):
+    """
+    Mixin for the record readers on top of their rawRecords generator: iterating yields the entities decoded with
+    the reader's InOutable, the _io, past the version if the _versioned is set, or the raw record bytes if there is
+    no InOutable.
+    """
+
+    def _decode(self, ba):
+        return BytesDataIoUtil.readVersioned(ba, self._io) if self._versioned else BytesDataIoUtil.read(ba, self._io)
+
+    def __iter__(self):
+        if self._io is None: return self.rawRecords()
+        return self._decoded()
+
+    def _decoded(self):
+        read = BytesDataIoUtil.readVersioned if self._versioned else BytesDataIoUtil.read
+        io = self._io
+        for ba in self.rawRecords():
+            yield read(ba, io)
+
+
+class RecordFileWriter(RecordEncoder):
+    """
+    Writes serialized records to a binary file-like, each as its VInt length followed by the record bytes, the way
+    the WritableUtils would frame them.
+    io - optional InOutable for the write method; versioned - if True, write prepends the version
+    """
+
+    def __init__(self, out, io=None, versioned=False):
+        self._out = out
+        self._io = io
+        self._versioned = versioned
+        self.count = 0
+
+    def writeRaw(self, ba):
+        self._out.write(VarInts.encodeVLong(len(ba)))
+        self._out.write(ba)
+        self.count += 1
+
+    def writeKeyed(self, key, ba):
+        """
+        Writes the record with its key pickled in front of it, for the temporary files that need the key again
+        without decoding the record, read them with the RecordFileReader.keyedRecords.
+        """
+        k = pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+        write, encode = self._out.write, VarInts.encodeVLong
+        write(encode(len(k)))
+        write(k)
+        write(encode(len(ba)))
+        write(ba)
+        self.count += 1
+
+    def flush(self):
+        self._out.flush()
+
+    def close(self):
+        self._out.close()
+
+
+class RecordFileReader(RecordDecoder):
+    """
+    Reads the records framed by the RecordFileWriter from a binary file-like, iterating decodes them as the
+    RecordDecoder does.
+    """
+
+    def __init__(self, src, io=None, versioned=False):
+        self._src = src
+        self._io = io
+        self._versioned = versioned
+
+    def rawRecords(self):
+        src = self._src
+        while True:
+            size = VarInts.readVLong(src)
+            if size is None: return
+            ba = src.read(size)
+            if len(ba) != size: raise EOFError("Truncated record: expected %d bytes, got %d" % (size, len(ba)))
+            yield ba
+
+    def keyedRecords(self):
+        """
+        Generator of the (key, record bytes) written by the RecordFileWriter.writeKeyed.
+        """
+        records = self.rawRecords()
+        loads = pickle.loads
+        for k in records:
+            yield loads(k), next(records)
+
+    def close(self):
+        self._src.close()
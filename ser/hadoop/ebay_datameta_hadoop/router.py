@@ -0,0 +1,90 @@
+#!/bin/env python
+
+from ebay_datameta_core.base import SemVer
+from ebay_datameta_hadoop.base import BytesDataIoUtil
+from ebay_datameta_hadoop.records import VarInts
+
+
+class VersionRouter(object):
+    """
+    Routes the versioned records, as written by the BytesDataIoUtil.writeVersioned, in mixed-version streams: peeks
+    just the version header and decodes the payload with the InOutable registered for that version.
+
+    For relaying, the forward passes the records of the target version through untouched, no decoding and
+    no encoding; the others get decoded, migrated through the MigratorRegistry and written in the target version.
+    Without the registry, there is no migration path: forwarding a record of another version raises
+    an AttributeError.
+    target - the version to forward in, a SemVer or a string
+    registry - optional MigratorRegistry for the records of the other versions
+    """
+
+    def __init__(self, target=None, registry=None):
+        self._target = None if target is None else SemVer.of(target)
+        self._registry = registry
+        self._ios = {} # SemVer -> InOutable
+        self._headers = {} # raw version header bytes -> (SemVer, matches the target)
+        self.passed = 0
+        self.converted = 0
+
+    def register(self, version, io):
+        """
+        Registers the InOutable for the records of the given version.
+        """
+        self._ios[SemVer.of(version)] = io
+        self._headers.clear()
+
+    @staticmethod
+    def peekVersion(ba):
+        """
+        The SemVer of the given versioned record and the position of the payload past it.
+        """
+        source, pos = VarInts.decodeText(ba)
+        return SemVer.of(source), pos
+
+    def _header(self, ba):
+        # versions repeat, parse each distinct header once
+        size, pos = VarInts.decodeVLong(ba)
+        end = pos + size
+        header = bytes(ba[:end])
+        known = self._headers.get(header)
+        if known is None:
+            ver = SemVer.of(header[pos:].decode('utf-8'))
+            known = (ver, self._target is not None and ver.diffLevel(self._target) == SemVer.DiffLevel.NONE)
+            self._headers[header] = known
+        return known[0], known[1], end
+
+    def ioFor(self, version):
+        io = self._ios.get(version)
+        if io is None: raise AttributeError("No InOutable registered for the version %s" % version)
+        return io
+
+    def decode(self, ba):
+        """
+        Decodes the given versioned record with the InOutable of its version.
+        """
+        ver, _, pos = self._header(ba)
+        return BytesDataIoUtil.read(ba[pos:], self.ioFor(ver))
+
+    def forward(self, ba):
+        """
+        The given versioned record in the target version: the same bytes if it is already in it.
+        """
+        if self._target is None: raise AttributeError("No target version to forward in")
+        ver, matches, pos = self._header(ba)
+        if matches:
+            self.passed += 1
+            return ba
+        if self._registry is None: raise AttributeError("No migration path from %s to %s" % (ver, self._target))
+        val = BytesDataIoUtil.read(ba[pos:], self.ioFor(ver))
+        # by the version on the wire, it is the one the payload is in
+        val = self._registry.plan(val.__class__, ver, self._target).migrate(val)
+        self.converted += 1
+        return BytesDataIoUtil.writeVersioned(self.ioFor(self._target), val)
+
+    def forwardMany(self, records):
+        """
+        Generator of the given versioned records in the target version.
+        """
+        forward = self.forward
+        for ba in records:
+            yield forward(ba)
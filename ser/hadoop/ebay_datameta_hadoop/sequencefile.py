@@ -0,0 +1,225 @@
+#!/bin/env python
+
+import os
+import struct
+import zlib
+from enum import Enum
+
+from ebay_datameta_hadoop.base import BytesDataIoUtil
+from ebay_datameta_hadoop.records import VarInts
+
+# the SequenceFile version 6, the one the Hadoop 0.20 and later write
+MAGIC = b"SEQ"
+VERSION = 6
+SYNC_SIZE = 16
+SYNC_INTERVAL = 100 * (4 + SYNC_SIZE) # bytes between the sync markers of the non-block files, as in the Hadoop
+DEFAULT_CODEC = "org.apache.hadoop.io.compress.DefaultCodec" # zlib
+
+Compression = Enum("Compression", "NONE RECORD BLOCK")
+
+_INT = struct.Struct(">i")
+_TWO_INTS = struct.Struct(">ii")
+_SYNC_ESCAPE = _INT.pack(-1)
+
+
+def _readExactly(src, size):
+    data = src.read(size)
+    if len(data) != size: raise EOFError("Truncated SequenceFile: expected %d bytes, got %d" % (size, len(data)))
+    return data
+
+
+def _readVInt(src):
+    size = VarInts.readVLong(src)
+    if size is None: raise EOFError("Truncated SequenceFile")
+    return size
+
+
+def _readText(src):
+    return _readExactly(src, _readVInt(src)).decode('utf-8')
+
+
+class SequenceFileWriter(object):
+    """
+    Writes the Hadoop SequenceFile, version 6, of the DataMeta records: the same bytes the Java SequenceFile.Writer
+    writes for the DataMeta Writables, the keys and the values serialized by the given InOutables; without the
+    InOutable, the key or the value is taken as already serialized bytes. Uncompressed, record compressed
+    and block compressed, the compression by the DefaultCodec, which is zlib.
+
+    out - the binary file-like, need not be seekable
+    keyClass, valueClass - the Java class names of the key and the value Writables, for the header
+    keyIo, valueIo - the InOutables of the keys and the values
+    compression - one of the Compression
+    blockBytes - block compression: the bytes of the keys and the values at which the block gets written,
+        the io.seqfile.compress.blocksize
+    metadata - the dict of the strings for the header
+    """
+
+    DEFAULT_BLOCK_BYTES = 1000000
+
+    def __init__(self, out, keyClass, valueClass, keyIo=None, valueIo=None, compression=Compression.NONE,
+                 blockBytes=DEFAULT_BLOCK_BYTES, metadata=None, sync=None):
+        self._out = out
+        self._keyIo = keyIo
+        self._valueIo = valueIo
+        self._compression = compression
+        self._blockBytes = blockBytes
+        self._sync = os.urandom(SYNC_SIZE) if sync is None else sync
+        if len(self._sync) != SYNC_SIZE:
+            raise AttributeError("Sync must be %d bytes, got %d" % (SYNC_SIZE, len(self._sync)))
+        self._keys, self._values = [], []
+        self._pendingBytes = 0
+        self.count = 0
+        header = [MAGIC, struct.pack(">B", VERSION), VarInts.encodeText(keyClass), VarInts.encodeText(valueClass),
+                  struct.pack(">??", compression != Compression.NONE, compression == Compression.BLOCK)]
+        if compression != Compression.NONE: header.append(VarInts.encodeText(DEFAULT_CODEC))
+        metadata = metadata or {}
+        header.append(_INT.pack(len(metadata)))
+        for name in sorted(metadata): # a TreeMap in the Java
+            header.append(VarInts.encodeText(name))
+            header.append(VarInts.encodeText(metadata[name]))
+        header.append(self._sync)
+        header = b"".join(header)
+        out.write(header)
+        self._pos = self._lastSync = len(header)
+
+    def _writeSync(self):
+        self._out.write(_SYNC_ESCAPE + self._sync)
+        self._pos += len(_SYNC_ESCAPE) + SYNC_SIZE
+        self._lastSync = self._pos
+
+    def appendRaw(self, key, value):
+        """
+        Appends the serialized key and value.
+        """
+        self.count += 1
+        if self._compression == Compression.BLOCK:
+            self._keys.append(key)
+            self._values.append(value)
+            self._pendingBytes += len(key) + len(value)
+            if self._pendingBytes >= self._blockBytes: self._writeBlock()
+            return
+        if self._pos >= self._lastSync + SYNC_INTERVAL: self._writeSync()
+        if self._compression == Compression.RECORD: value = zlib.compress(value)
+        record = b"".join((_TWO_INTS.pack(len(key) + len(value), len(key)), key, value))
+        self._out.write(record)
+        self._pos += len(record)
+
+    def append(self, key, value):
+        self.appendRaw(key if self._keyIo is None else BytesDataIoUtil.write(self._keyIo, key),
+                       value if self._valueIo is None else BytesDataIoUtil.write(self._valueIo, value))
+
+    def _writeBlock(self):
+        if not self._keys: return
+        self._writeSync()
+        parts = [VarInts.encodeVLong(len(self._keys))]
+        for items in (self._keys, self._values):
+            for buf in (b"".join(VarInts.encodeVLong(len(item)) for item in items), b"".join(items)):
+                compressed = zlib.compress(buf)
+                parts.append(VarInts.encodeVLong(len(compressed)))
+                parts.append(compressed)
+        block = b"".join(parts)
+        self._out.write(block)
+        self._pos += len(block)
+        self._keys, self._values = [], []
+        self._pendingBytes = 0
+
+    def flush(self):
+        """
+        Block compression: writes the current block, even if it's short of the blockBytes. Flushes the file.
+        """
+        self._writeBlock()
+        self._out.flush()
+
+    def close(self):
+        self._writeBlock()
+        self._out.close()
+
+
+class SequenceFileReader(object):
+    """
+    Reads the Hadoop SequenceFile, version 6, of the DataMeta records, uncompressed, record or block compressed by the
+    DefaultCodec, from a binary file-like. The framing is parsed by the struct and the VarInts rather than by the
+    DataInput calls, a block of the block compressed files is decompressed at once. Every key and every value is
+    copied out of the buffer as its own bytes, then decoded by the InOutable through the BytesDataIoUtil, a
+    DataInput stream over those bytes. Without the InOutable, the key or the value comes as the bytes.
+    Iterating yields the (key, value) pairs.
+    keyClass, valueClass, compression, metadata - from the header
+    """
+
+    def __init__(self, src, keyIo=None, valueIo=None):
+        self._src = src
+        self._keyIo = keyIo
+        self._valueIo = valueIo
+        head = src.read(len(MAGIC) + 1)
+        if len(head) != len(MAGIC) + 1 or head[:len(MAGIC)] != MAGIC: raise AttributeError("Not a SequenceFile")
+        version = struct.unpack(">B", head[len(MAGIC):])[0]
+        if version != VERSION: raise AttributeError("Unsupported SequenceFile version %d, only %d" % (version, VERSION))
+        self.keyClass = _readText(src)
+        self.valueClass = _readText(src)
+        compressed, blocks = struct.unpack(">??", _readExactly(src, 2))
+        self.compression = Compression.BLOCK if blocks else Compression.RECORD if compressed else Compression.NONE
+        if compressed:
+            codec = _readText(src)
+            if codec != DEFAULT_CODEC: raise AttributeError("Unsupported codec %s, only %s" % (codec, DEFAULT_CODEC))
+        self.metadata = {}
+        for _ in range(_INT.unpack(_readExactly(src, 4))[0]):
+            name = _readText(src)
+            self.metadata[name] = _readText(src)
+        self._sync = _readExactly(src, SYNC_SIZE)
+
+    def _checkSync(self):
+        if self._src.read(SYNC_SIZE) != self._sync: raise AttributeError("Corrupt SequenceFile: sync mismatch")
+
+    def rawRecords(self):
+        """
+        Generator of the (key bytes, value bytes) pairs, the values decompressed.
+        """
+        if self.compression == Compression.BLOCK: return self._blockRecords()
+        return self._records()
+
+    def _records(self):
+        src = self._src
+        decompress = self.compression == Compression.RECORD
+        while True:
+            head = src.read(4)
+            if not head: return
+            if len(head) < 4: head += _readExactly(src, 4 - len(head))
+            size = _INT.unpack(head)[0]
+            if size == -1:
+                self._checkSync()
+                continue
+            keySize = _INT.unpack(_readExactly(src, 4))[0]
+            record = _readExactly(src, size)
+            value = record[keySize:]
+            yield record[:keySize], zlib.decompress(value) if decompress else value
+
+    def _blockRecords(self):
+        src = self._src
+        while True:
+            escape = src.read(4)
+            if not escape: return
+            if escape != _SYNC_ESCAPE: raise AttributeError("Corrupt SequenceFile: no sync before the block")
+            self._checkSync()
+            count = _readVInt(src)
+            keys, values = self._blockBuffers(count), self._blockBuffers(count)
+            for kv in zip(keys, values):
+                yield kv
+
+    def _blockBuffers(self, count):
+        # the lengths and the data buffers of the keys, or of the values, as the list of the items
+        lengths, data = [zlib.decompress(_readExactly(self._src, _readVInt(self._src))) for _ in range(2)]
+        items, lengthPos, pos = [], 0, 0
+        for _ in range(count):
+            size, lengthPos = VarInts.decodeVLong(lengths, lengthPos)
+            items.append(data[pos:pos + size])
+            pos += size
+        return items
+
+    def __iter__(self):
+        keyIo, valueIo = self._keyIo, self._valueIo
+        read = BytesDataIoUtil.read
+        for key, value in self.rawRecords():
+            yield (key if keyIo is None else read(key, keyIo)), (value if valueIo is None else read(value, valueIo))
+
+    def close(self):
+        self._src.close()
@@ -0,0 +1,167 @@
+#!/bin/env python
+
+import multiprocessing
+import os
+import struct
+
+from ebay_datameta_hadoop.records import VarInts, RecordEncoder, RecordDecoder
+
+MAGIC = b"DMSP"
+FORMAT_VERSION = 1
+SYNC_SIZE = 16
+# the VLong -1 where the record length would be: the sync marker follows, the record lengths are never negative
+SYNC_ESCAPE = VarInts.encodeVLong(-1)
+
+
+class SplittableFileWriter(RecordEncoder):
+    """
+    Writes serialized records to a binary file-like so that the file can be processed in the byte ranges, by the
+    SplittableFileReader, the way the Hadoop SequenceFile does it: every syncInterval bytes or so, between the records,
+    goes the sync marker, the SYNC_ESCAPE followed by the random SYNC_SIZE bytes of this file. A reader starting
+    at any offset finds the next marker and is at a record boundary.
+
+    The file: the MAGIC, the format version byte and the sync bytes; then the records, each framed as the
+    RecordFileWriter does it, with the sync markers in between.
+
+    out - the binary file-like, need not be seekable
+    io, versioned - for the write method, as for the RecordFileWriter
+    syncInterval - the bytes of the records between the sync markers, at least
+    sync - the sync bytes, random by default
+    """
+
+    DEFAULT_SYNC_INTERVAL = 16 << 10
+
+    def __init__(self, out, io=None, versioned=False, syncInterval=DEFAULT_SYNC_INTERVAL, sync=None):
+        if syncInterval < 1: raise AttributeError("Sync interval must be positive, got %s" % syncInterval)
+        self._sync = os.urandom(SYNC_SIZE) if sync is None else sync
+        if len(self._sync) != SYNC_SIZE:
+            raise AttributeError("Sync must be %d bytes, got %d" % (SYNC_SIZE, len(self._sync)))
+        self._out = out
+        self._io = io
+        self._versioned = versioned
+        self._syncInterval = syncInterval
+        self.count = 0
+        header = MAGIC + struct.pack(">B", FORMAT_VERSION) + self._sync
+        out.write(header)
+        self._pos = self._lastSync = len(header)
+
+    def sync(self):
+        """
+        Writes the sync marker now, unless there is one right before.
+        """
+        if self._pos == self._lastSync: return
+        self._out.write(SYNC_ESCAPE + self._sync)
+        self._pos += len(SYNC_ESCAPE) + SYNC_SIZE
+        self._lastSync = self._pos
+
+    def writeRaw(self, ba):
+        if self._pos - self._lastSync >= self._syncInterval: self.sync()
+        size = VarInts.encodeVLong(len(ba))
+        self._out.write(size)
+        self._out.write(ba)
+        self._pos += len(size) + len(ba)
+        self.count += 1
+
+    def flush(self):
+        self._out.flush()
+
+    def close(self):
+        self._out.close()
+
+
+class SplittableFileReader(RecordDecoder):
+    """
+    Reads the records of the given byte range [start, end) of a file written by the SplittableFileWriter from
+    a seekable binary file-like. The ranges that cover the file without overlaps read each record exactly once:
+    a range owns the records that follow the sync markers starting within it, the first range also those before the
+    first marker. Thus the reader starts at the first marker at or past the start, and reads past the end up to the
+    next marker. Iterating decodes them as the RecordDecoder does.
+    """
+
+    SCAN_CHUNK = 64 << 10
+
+    def __init__(self, src, io=None, versioned=False, start=0, end=None):
+        self._src = src
+        self._io = io
+        self._versioned = versioned
+        src.seek(0)
+        head = src.read(len(MAGIC) + 1 + SYNC_SIZE)
+        if len(head) != len(MAGIC) + 1 + SYNC_SIZE or head[:len(MAGIC)] != MAGIC:
+            raise AttributeError("Not a splittable file")
+        version = struct.unpack(">B", head[len(MAGIC):len(MAGIC) + 1])[0]
+        if version != FORMAT_VERSION: raise AttributeError("Unsupported splittable file version %d" % version)
+        self._marker = SYNC_ESCAPE + head[len(MAGIC) + 1:]
+        self._headerSize = len(head)
+        self._start = start
+        self._end = end
+
+    def _seekSync(self, pos):
+        # position of the first sync marker at or past the given one, None if there is none
+        src, marker = self._src, self._marker
+        src.seek(pos)
+        tail = b""
+        while True:
+            chunk = src.read(self.SCAN_CHUNK)
+            if not chunk: return None
+            data = tail + chunk
+            found = data.find(marker)
+            if found >= 0: return pos - len(tail) + found
+            tail = data[-(len(marker) - 1):]
+            pos += len(chunk)
+
+    def rawRecords(self):
+        src, end, marker = self._src, self._end, self._marker
+        if self._start <= 0:
+            pos = self._headerSize
+        else:
+            pos = self._seekSync(max(self._start, self._headerSize))
+            if pos is None or (end is not None and pos >= end): return
+        src.seek(pos)
+        while True:
+            size = VarInts.readVLong(src)
+            if size is None: return
+            if size == -1:
+                pos = src.tell() - len(SYNC_ESCAPE)
+                if end is not None and pos >= end: return
+                if src.read(SYNC_SIZE) != marker[len(SYNC_ESCAPE):]: raise AttributeError("Corrupt sync at %d" % pos)
+                continue
+            ba = src.read(size)
+            if len(ba) != size: raise EOFError("Truncated record: expected %d bytes, got %d" % (size, len(ba)))
+            yield ba
+
+    def close(self):
+        self._src.close()
+
+    @staticmethod
+    def ranges(size, count):
+        """
+        The list of the given count of the (start, end) ranges of about the same length covering the given size.
+        """
+        if count < 1: raise AttributeError("Range count must be positive, got %s" % count)
+        bounds = [size * i // count for i in range(count + 1)]
+        return list(zip(bounds, bounds[1:]))
+
+    @staticmethod
+    def parallel(path, fn, splits=None, processes=None, io=None, versioned=False):
+        """
+        Processes the file of the given path in the given number of the ranges, the number of the CPUs by default,
+        in a pool of the given number of the processes, the same by default. Calls the given function with the
+        iterator of the records of each range, the entities if the io is given, and returns the list of its results
+        in the order of the ranges. The function, the io and the results go between the processes pickled, hence
+        the function must be defined at the top level of a module.
+        """
+        splits = splits or multiprocessing.cpu_count()
+        tasks = [(path, start, end, fn, io, versioned)
+                 for start, end in SplittableFileReader.ranges(os.path.getsize(path), splits)]
+        pool = multiprocessing.Pool(processes or splits)
+        try:
+            return pool.map(_processRange, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+
+def _processRange(task):
+    path, start, end, fn, io, versioned = task
+    with open(path, "rb") as src:
+        return fn(iter(SplittableFileReader(src, io, versioned, start, end)))
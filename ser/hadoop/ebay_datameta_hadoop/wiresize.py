@@ -0,0 +1,220 @@
+#!/bin/env python
+
+import struct
+from collections import OrderedDict
+from decimal import Decimal
+
+from ebay_datameta_hadoop.raw import RawLayout, _isSet
+from ebay_datameta_hadoop.records import VarInts, RecordFileReader
+
+
+class WireSizeAnalyzer(object):
+    """
+    Attributes the bytes of the serialized records of one RawLayout to their fields, without decoding the records
+    into the entities, to see where the bytes go before changing the schema or the encodings.
+
+    Per field, by the dotted path of the embedded entities and the [] of the collection elements: the values, the
+    nulls, the bytes and the header bytes of those: the lengths of the texts, the counts of the collections, the time
+    zones of the datetimes. Also the histograms of the VInt/VLong sizes and of the text lengths, and the estimates
+    of the bytes wasted by the encodings that have more compact alternatives, see the WASTE.
+
+    Usage:
+        analyzer = WireSizeAnalyzer(MULTI_FIELD_ID_LAYOUT)
+        analyzer.analyzeFile(src)
+        print(analyzer.format())
+    """
+
+    VERSION = "<version>"
+    NULL_FLAGS = "<nullFlags>"
+
+    # the wasteful encodings and their compact alternatives the estimates assume
+    DECIMAL_AS_TEXT = "decimalAsText" # vs the unscaled VLong, or the length and the bytes if it's bigger, and the VInt scale
+    BOOLEAN_PER_ELEMENT = "booleanPerElement" # a byte per the collection element vs a bit
+    DTTM_ZONE = "dttmZone" # the time zone which is always UTC vs the writeDttmUtc
+    WASTE = (DECIMAL_AS_TEXT, BOOLEAN_PER_ELEMENT, DTTM_ZONE)
+
+    def __init__(self, layout, versioned=False):
+        """
+        layout - the RawLayout of the records, name its fields for the readable report
+        versioned - True if the records start with the version, as written by the BytesDataIoUtil.writeVersioned
+        """
+        self._layout = layout
+        self._versioned = versioned
+        self.reset()
+
+    def reset(self):
+        self.records = 0
+        self.bytes = 0
+        self._fields = OrderedDict() # path -> [values, nulls, bytes, header bytes]
+        self._varIntSizes = {}
+        self._textLengths = {}
+        self._waste = dict((name, [0, 0, set()]) for name in WireSizeAnalyzer.WASTE) # actual, compact, paths
+
+    def add(self, buf):
+        """
+        Analyzes one serialized record. Raises the AttributeError if the record does not end where the layout says.
+        """
+        pos = 0
+        if self._versioned: pos = self._text(buf, pos, WireSizeAnalyzer.VERSION)
+        pos = self._record(self._layout, buf, pos, "")
+        if pos != len(buf): raise AttributeError("Record of %d bytes, the layout ends at %d" % (len(buf), pos))
+        self.records += 1
+        self.bytes += pos
+        return self
+
+    def addAll(self, records):
+        for buf in records:
+            self.add(buf)
+        return self
+
+    def analyzeFile(self, src):
+        """
+        Analyzes all the records of the given binary file-like written by the RecordFileWriter.
+        """
+        return self.addAll(RecordFileReader(src).rawRecords())
+
+    def _stats(self, path):
+        stats = self._fields.get(path)
+        if stats is None: stats = self._fields[path] = [0, 0, 0, 0]
+        return stats
+
+    def _vlong(self, buf, pos):
+        size = VarInts.decodeSize(struct.unpack_from('b', buf, pos)[0])
+        self._varIntSizes[size] = self._varIntSizes.get(size, 0) + 1
+        return VarInts.decodeVLong(buf, pos)[0], pos + size
+
+    def _text(self, buf, pos, path):
+        length, end = self._vlong(buf, pos)
+        bucket = length.bit_length() # 0, 1, 2-3, 4-7...
+        self._textLengths[bucket] = self._textLengths.get(bucket, 0) + 1
+        stats = self._stats(path)
+        stats[0] += 1
+        stats[2] += end + length - pos
+        stats[3] += end - pos
+        return end + length
+
+    def _record(self, layout, buf, pos, prefix):
+        if layout.nullFlags:
+            start = pos
+            count, pos = self._vlong(buf, pos)
+            nulls = []
+            for _ in range(count):
+                val, pos = self._vlong(buf, pos)
+                nulls.append(val)
+            stats = self._stats(prefix + WireSizeAnalyzer.NULL_FLAGS)
+            stats[0] += 1
+            stats[2] += pos - start
+        else:
+            nulls = ()
+        for ix, kind in enumerate(layout.kinds):
+            path = prefix + layout.names[ix]
+            if ix in layout.optional and _isSet(nulls, ix):
+                self._stats(path)[1] += 1
+                continue
+            pos = self._field(kind, buf, pos, path)
+        return pos
+
+    def _field(self, kind, buf, pos, path):
+        if isinstance(kind, RawLayout):
+            stats = self._stats(path)
+            end = self._record(kind, buf, pos, path + ".")
+            stats[0] += 1
+            stats[2] += end - pos
+            return end
+        if isinstance(kind, tuple):
+            stats = self._stats(path)
+            count, end = self._vlong(buf, pos)
+            stats[0] += 1
+            stats[3] += end - pos
+            for _ in range(count):
+                end = self._field(kind[1], buf, end, path + "[]")
+            stats[2] += end - pos
+            if kind[1] == RawLayout.BOOL: self._wasted(WireSizeAnalyzer.BOOLEAN_PER_ELEMENT, path, count, (count + 7) // 8)
+            return end
+        if kind in (RawLayout.TEXT, RawLayout.DECIMAL):
+            end = self._text(buf, pos, path)
+            if kind == RawLayout.DECIMAL:
+                size, start = VarInts.decodeVLong(buf, pos)
+                text = bytes(buf[start:end]).decode('utf-8')
+                self._wasted(WireSizeAnalyzer.DECIMAL_AS_TEXT, path, end - pos, _compactDecimalSize(text, end - pos))
+            return end
+        stats = self._stats(path)
+        stats[0] += 1
+        if kind in (RawLayout.INT, RawLayout.LONG, RawLayout.DTTM_UTC):
+            end = self._vlong(buf, pos)[1]
+        elif kind == RawLayout.DTTM:
+            zoneEnd = self._vlong(buf, pos)[1]
+            end = self._vlong(buf, zoneEnd)[1]
+            stats[3] += zoneEnd - pos
+            self._wasted(WireSizeAnalyzer.DTTM_ZONE, path, end - pos, end - zoneEnd)
+        else:
+            end = pos + _FIXED_SIZES[kind]
+        stats[2] += end - pos
+        return end
+
+    def _wasted(self, name, path, actual, compact):
+        waste = self._waste[name]
+        waste[0] += actual
+        waste[1] += compact
+        waste[2].add(path)
+
+    def report(self):
+        """
+        The numbers as a dict:
+            records, bytes - how many records analyzed and their total size
+            fields - OrderedDict by the field path, in the order first met, of the dicts with the values, nulls,
+                bytes and headerBytes
+            varIntSizes - the count of the VInts/VLongs by their size in bytes
+            textLengths - the count of the texts by their length in bytes, in the power of two buckets: "0", "1",
+                "2-3", "4-7"...
+            waste - by the WASTE name, the dicts with the bytes, compactBytes, waste and the list of the fields,
+                only the encodings met in the records
+        """
+        def bucket(bits):
+            return str(bits) if bits < 2 else "%d-%d" % (1 << (bits - 1), (1 << bits) - 1)
+        return {
+            'records': self.records, 'bytes': self.bytes,
+            'fields': OrderedDict((path, {'values': s[0], 'nulls': s[1], 'bytes': s[2], 'headerBytes': s[3]})
+                                  for path, s in self._fields.items()),
+            'varIntSizes': dict(self._varIntSizes),
+            'textLengths': OrderedDict((bucket(bits), self._textLengths[bits]) for bits in sorted(self._textLengths)),
+            'waste': dict((name, {'bytes': w[0], 'compactBytes': w[1], 'waste': w[0] - w[1], 'fields': sorted(w[2])})
+                          for name, w in self._waste.items() if w[2]),
+        }
+
+    def format(self):
+        """
+        The report as the text table, the wasteful encodings the most wasteful first.
+        """
+        report = self.report()
+        total = float(report['bytes'] or 1)
+        lines = ["%d records, %d bytes, %.1f bytes/record" % (
+            report['records'], report['bytes'], report['bytes'] / float(report['records'] or 1)),
+            "%-32s %10s %10s %12s %7s %12s" % ("field", "values", "nulls", "bytes", "%", "header")]
+        for path, s in report['fields'].items():
+            lines.append("%-32s %10d %10d %12d %6.1f%% %12d" % (
+                path, s['values'], s['nulls'], s['bytes'], s['bytes'] * 100 / total, s['headerBytes']))
+        lines.append("VInt/VLong sizes: " + ", ".join(
+            "%dB: %d" % (size, count) for size, count in sorted(report['varIntSizes'].items())))
+        lines.append("Text lengths: " + ", ".join("%s: %d" % item for item in report['textLengths'].items()))
+        if report['waste']:
+            lines.append("%-32s %12s %12s %12s %7s" % ("encoding", "bytes", "compact", "waste", "%"))
+            for name, w in sorted(report['waste'].items(), key=lambda item: -item[1]['waste']):
+                lines.append("%-32s %12d %12d %12d %6.1f%%  %s" % (
+                    name, w['bytes'], w['compactBytes'], w['waste'], w['waste'] * 100 / total, ", ".join(w['fields'])))
+        return "\n".join(lines)
+
+
+_FIXED_SIZES = {RawLayout.BOOL: 1, RawLayout.FLOAT: 4, RawLayout.DOUBLE: 8}
+
+_LONG_MIN, _LONG_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def _compactDecimalSize(text, actual):
+    # the unscaled value and the scale, the special values can't do any better than the text
+    sign, digits, exponent = Decimal(text).as_tuple()
+    if not isinstance(exponent, int): return actual
+    unscaled = int("".join(map(str, digits)) or "0") * (-1 if sign else 1)
+    if _LONG_MIN <= unscaled <= _LONG_MAX: size = len(VarInts.encodeVLong(unscaled))
+    else: size = 1 + unscaled.bit_length() // 8 + 1 # the length and the two's complement bytes
+    return size + len(VarInts.encodeVLong(-exponent))
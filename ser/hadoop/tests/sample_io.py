@@ -0,0 +1,146 @@
+#!/bin/env python
+
+"""
+Hand-written InOutables of some of the sample v3 model classes, and the factories of their instances, shared by
+the tests and the benchmarks. Needs the core tests, where the sample model lives, on the sys.path.
+"""
+
+from ebay_datameta_hadoop.base import InOutable, DataMetaHadoopUtil, WritableUtils, bitarray
+from test_ebay_datameta_sample_v3.model import EmbeddedType, Embodiment, IdLess, MultiFieldId
+
+
+# InOutables for some of the sample model classes, written the way the generator does it: the null flags for the
+# optional fields first, by the field index, then the fields in the declaration order, skipping the nulls.
+
+class EmbeddedTypeInOutable(InOutable):
+
+    def write(self, do, val):
+        val.verify()
+        nullFlags = bitarray(3)
+        nullFlags.setall(False)
+        nullFlags[2] = val.getEmbo() is None
+        DataMetaHadoopUtil.writeBitArray(do, nullFlags)
+        WritableUtils.writeVLong(do, val.getIntCode())
+        DataMetaHadoopUtil.writeTextIfAny(do, val.getTxtCode())
+        if val.getEmbo() is not None: EMBODIMENT_IO.write(do, val.getEmbo())
+
+    def readVal(self, di, val):
+        nullFlags = DataMetaHadoopUtil.readBitArray(di)
+        val.setIntCode(WritableUtils.readVLong(di))
+        val.setTxtCode(DataMetaHadoopUtil.readText(di))
+        if not nullFlags[2]: val.setEmbo(EMBODIMENT_IO.read(di))
+        return val
+
+    def read(self, di):
+        return self.readVal(di, EmbeddedType())
+
+
+class EmbodimentInOutable(InOutable):
+
+    def write(self, do, val):
+        val.verify()
+        DataMetaHadoopUtil.writeBitArray(do, bitarray(0))
+        WritableUtils.writeVLong(do, val.getId())
+        DataMetaHadoopUtil.writeTextIfAny(do, val.getInclusivement())
+        EMBEDDED_TYPE_IO.write(do, val.getMbe())
+
+    def readVal(self, di, val):
+        DataMetaHadoopUtil.readBitArray(di)
+        val.setId(WritableUtils.readVLong(di))
+        val.setInclusivement(DataMetaHadoopUtil.readText(di))
+        val.setMbe(EMBEDDED_TYPE_IO.read(di))
+        return val
+
+    def read(self, di):
+        return self.readVal(di, Embodiment())
+
+
+class IdLessInOutable(InOutable):
+
+    def write(self, do, val):
+        val.verify()
+        nullFlags = bitarray(3)
+        nullFlags.setall(False)
+        nullFlags[1] = val.getName() is None
+        DataMetaHadoopUtil.writeBitArray(do, nullFlags)
+        WritableUtils.writeVInt(do, val.getCount())
+        if val.getName() is not None: DataMetaHadoopUtil.writeTextIfAny(do, val.getName())
+        DataMetaHadoopUtil.writeDttm(do, val.getWhen())
+
+    def readVal(self, di, val):
+        nullFlags = DataMetaHadoopUtil.readBitArray(di)
+        val.setCount(WritableUtils.readVInt(di))
+        if not nullFlags[1]: val.setName(DataMetaHadoopUtil.readText(di))
+        val.setWhen(DataMetaHadoopUtil.readDttm(di))
+        return val
+
+    def read(self, di):
+        return self.readVal(di, IdLess())
+
+
+class MultiFieldIdInOutable(InOutable):
+
+    def write(self, do, val):
+        val.verify()
+        nullFlags = bitarray(5)
+        nullFlags.setall(False)
+        nullFlags[3] = val.getTiming() is None
+        DataMetaHadoopUtil.writeBitArray(do, nullFlags)
+        WritableUtils.writeVLong(do, val.getA())
+        WritableUtils.writeVLong(do, val.getB())
+        DataMetaHadoopUtil.writeTextIfAny(do, val.getC())
+        if val.getTiming() is not None: DataMetaHadoopUtil.writeDttm(do, val.getTiming())
+        DataMetaHadoopUtil.writeTextIfAny(do, val.getText())
+
+    def readVal(self, di, val):
+        nullFlags = DataMetaHadoopUtil.readBitArray(di)
+        val.setA(WritableUtils.readVLong(di))
+        val.setB(WritableUtils.readVLong(di))
+        val.setC(DataMetaHadoopUtil.readText(di))
+        if not nullFlags[3]: val.setTiming(DataMetaHadoopUtil.readDttm(di))
+        val.setText(DataMetaHadoopUtil.readText(di))
+        return val
+
+    def read(self, di):
+        return self.readVal(di, MultiFieldId())
+
+
+EMBEDDED_TYPE_IO = EmbeddedTypeInOutable()
+EMBODIMENT_IO = EmbodimentInOutable()
+ID_LESS_IO = IdLessInOutable()
+MULTI_FIELD_ID_IO = MultiFieldIdInOutable()
+
+
+def embeddedType(intCode, txtCode):
+    e = EmbeddedType()
+    e.setIntCode(intCode)
+    e.setTxtCode(txtCode)
+    return e
+
+
+def multiFieldId(a, b, c, text, timing=None):
+    m = MultiFieldId()
+    m.setA(a)
+    m.setB(b)
+    m.setC(c)
+    m.setText(text)
+    m.setTiming(timing)
+    return m
+
+
+class WritableListOf(InOutable):
+    """ Top level list of entities, for the tests and the benchmarks only """
+
+    def __init__(self, io):
+        self._io = io
+
+    def write(self, do, val):
+        DataMetaHadoopUtil.writeCollection(val, do, self._io)
+
+    def readVal(self, di, val):
+        val.extend(DataMetaHadoopUtil.readList(di, self._io))
+        return val
+
+    def read(self, di):
+        return self.readVal(di, [])
+
@@ -2,11 +2,15 @@ from __future__ import print_function
 
 """Tests for DataMeta Hadoop."""
 
+import io
+import struct
 import os
 import sys
 import pytest
 
 sys.path.insert(0, os.path.abspath('.'))
+# the sample model lives with the core tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'core', 'tests')))
 
 import logging
 logging.basicConfig(filename='hadoopTests.log', level=logging.DEBUG, format="%(asctime)s %(levelname)s %(message)s")
@@ -14,6 +18,22 @@ logging.basicConfig(filename='hadoopTests.log', level=logging.DEBUG, format="%(a
 from collections import *
 from ebay_datameta_hadoop.base import *
 from ebay_datameta_core.canned_re import CannedRe
+from ebay_datameta_core.base import DateTime, Migrator, SemVer
+from ebay_datameta_core.migration import MigratorRegistry
+from ebay_datameta_core.pool import CanonicalPool
+from ebay_datameta_hadoop.records import VarInts, RecordFileWriter, RecordFileReader
+from ebay_datameta_hadoop.extsort import ExternalSorter
+from ebay_datameta_hadoop.raw import RawLayout, RawComparator
+from ebay_datameta_hadoop.join import StreamJoin
+from ebay_datameta_hadoop.router import VersionRouter
+from ebay_datameta_hadoop.profiling import SerializationProfiler
+from ebay_datameta_hadoop.wiresize import WireSizeAnalyzer
+from ebay_datameta_hadoop.blocks import BlockFileWriter, BlockFileReader, Codec
+from ebay_datameta_hadoop.splittable import SplittableFileWriter, SplittableFileReader
+from ebay_datameta_hadoop.sequencefile import SequenceFileWriter, SequenceFileReader, Compression
+from ebay_datameta_hadoop.prefetch import PrefetchingReader, WriteBehindWriter
+from test_ebay_datameta_sample_v3.model import EmbeddedType, Embodiment, IdLess, MultiFieldId
+from sample_io import EMBEDDED_TYPE_IO, ID_LESS_IO, MULTI_FIELD_ID_IO, embeddedType, multiFieldId, WritableListOf
 from inspect import getmembers
 import inspect
 from pprint import *
@@ -26,3 +46,499 @@ def test_packaging():
     e = CannedRe.EMAIL
     assert e is not None
 
+
+def test_roundTrip():
+    m = multiFieldId(1, 2, "three", "Text", DateTime.fromIsoUtc("2016-03-31T15:33:44Z"))
+    back = BytesDataIoUtil.read(BytesDataIoUtil.write(MULTI_FIELD_ID_IO, m), MULTI_FIELD_ID_IO)
+    assert back == m
+    assert (back.getTiming(), back.getText()) == (m.getTiming(), m.getText())
+
+
+def test_pooledInOutable():
+    codes = [embeddedType(i % 3, "code %d" % (i % 3)) for i in range(30)]
+    ba = BytesDataIoUtil.write(WritableListOf(EMBEDDED_TYPE_IO), codes)
+    pooled = PooledInOutable(EMBEDDED_TYPE_IO, CanonicalPool(maxSize=8))
+    decoded = DataMetaHadoopUtil.readList(InputStream.DataInputStream(InputStream.ByteArrayInputStream(ba)), pooled)
+    assert len(decoded) == 30
+    assert len(set(id(e) for e in decoded)) == 3
+    assert all(e.isFrozen() for e in decoded)
+    assert [e.getTxtCode() for e in decoded] == [e.getTxtCode() for e in codes]
+    assert pooled.pool().stats()['hits'] == 27
+
+    # framed records key the pool on the bytes, a hit skips the decoding
+    records = [BytesDataIoUtil.write(EMBEDDED_TYPE_IO, e) for e in codes]
+    pooled = PooledInOutable(EMBEDDED_TYPE_IO)
+    decoded = [pooled.fromBytes(ba) for ba in records]
+    assert len(set(id(e) for e in decoded)) == 3
+    assert [e.getTxtCode() for e in decoded] == [e.getTxtCode() for e in codes]
+    assert pooled.pool().stats()['hits'] == 27
+
+
+def test_varInts():
+    for v in [0, 1, -1, 127, -112, 128, -113, 255, 256, -256, 1 << 31, -(1 << 31), (1 << 63) - 1, -(1 << 63)]:
+        bos = OutputStream.ByteArrayOutputStream()
+        WritableUtils.writeVLong(OutputStream.DataOutputStream(bos), v)
+        ba = bos.toByteArray()
+        assert VarInts.encodeVLong(v) == ba
+        assert VarInts.decodeVLong(b'x' + ba, 1) == (v, len(ba) + 1)
+    assert VarInts.decodeText(VarInts.encodeText(u"caf\u00e9")) == (u"caf\u00e9", 6)
+
+
+def test_recordFile():
+    out = io.BytesIO()
+    writer = RecordFileWriter(out, MULTI_FIELD_ID_IO)
+    recs = [multiFieldId(i, -i, "c%d" % i, "t" * i) for i in range(200)]
+    for m in recs:
+        writer.write(m)
+    assert writer.count == 200
+    back = list(RecordFileReader(io.BytesIO(out.getvalue()), MULTI_FIELD_ID_IO))
+    assert back == recs
+    with pytest.raises(EOFError):
+        list(RecordFileReader(io.BytesIO(out.getvalue()[:-1])).rawRecords())
+
+
+def test_externalSort():
+    keyOf = ExternalSorter.identityKey(MULTI_FIELD_ID_IO, MultiFieldId)
+    recs = [multiFieldId(i % 37, i % 5, "c", "v%d" % i) for i in range(500)]
+    raw = [BytesDataIoUtil.write(MULTI_FIELD_ID_IO, m) for m in recs]
+    expected = sorted(recs, key=lambda m: (m.getA(), m.getB(), m.getC()))
+    decode = lambda it: [BytesDataIoUtil.read(ba, MULTI_FIELD_ID_IO) for ba in it]
+
+    inMemory = ExternalSorter(keyOf)
+    assert [m.getText() for m in decode(inMemory.sort(raw))] == [m.getText() for m in expected]
+    assert inMemory.spills == 0
+
+    # tiny budget and fan-in: many runs, several merge passes, still stable
+    spilling = ExternalSorter(keyOf, memoryBytes=2000, fanIn=3)
+    assert [m.getText() for m in decode(spilling.sort(raw))] == [m.getText() for m in expected]
+    assert spilling.spills > 10
+
+    keys = sorted(set((m.getA(), m.getB(), m.getC()) for m in recs))
+    first = decode(ExternalSorter(keyOf, memoryBytes=2000, dedupe=ExternalSorter.Dedupe.KEEP_FIRST).sort(raw))
+    last = decode(ExternalSorter(keyOf, memoryBytes=2000, dedupe=ExternalSorter.Dedupe.KEEP_LAST).sort(raw))
+    assert [keyOf(BytesDataIoUtil.write(MULTI_FIELD_ID_IO, m)) for m in first] == keys
+    assert first[0].getText() == "v0" and last[0].getText() == "v370"
+
+    def concat(a, b):
+        a.setText(a.getText() + "," + b.getText())
+        return a
+    merged = decode(ExternalSorter(keyOf, memoryBytes=2000, dedupe=concat, io=MULTI_FIELD_ID_IO).sort(raw))
+    assert len(merged) == len(keys)
+    assert merged[0].getText() == "v0,v185,v370"
+
+    src = io.BytesIO()
+    writer = RecordFileWriter(src)
+    for ba in raw:
+        writer.writeRaw(ba)
+    out = io.BytesIO()
+    assert ExternalSorter(keyOf, memoryBytes=5000).sortFile(io.BytesIO(src.getvalue()), out) == 500
+    assert list(RecordFileReader(io.BytesIO(out.getvalue()), MULTI_FIELD_ID_IO)) == expected
+
+
+MULTI_FIELD_ID_LAYOUT = RawLayout([RawLayout.LONG, RawLayout.LONG, RawLayout.TEXT, RawLayout.DTTM, RawLayout.TEXT],
+                                  optional=[3])
+
+
+def test_rawComparator():
+    when = DateTime.fromIsoUtc("2016-03-31T15:33:44Z")
+    recs = [multiFieldId(a, b, c, "t%d" % i, when if i % 2 else None)
+            for i, (a, b, c) in enumerate((a, b, c) for a in (-300, -1, 0, 5, 1 << 40) for b in (7, -7)
+                                          for c in (u"", u"a", u"a\u0000", u"ab", u"\u00e9"))]
+    raw = [BytesDataIoUtil.write(MULTI_FIELD_ID_IO, m) for m in recs]
+    assert all(MULTI_FIELD_ID_LAYOUT.skip(ba) == len(ba) for ba in raw)
+
+    cmp = RawComparator(MULTI_FIELD_ID_LAYOUT, [0, 1, 2])
+    expected = sorted(recs, key=lambda m: (m.getA(), m.getB(), m.getC()))
+    byKey = sorted(raw, key=cmp.encodeKey)
+    assert [BytesDataIoUtil.read(ba, MULTI_FIELD_ID_IO) for ba in byKey] == expected
+    for x in raw[:12]:
+        for y in raw[:12]:
+            c = cmp.compare(x, y)
+            assert (c > 0) - (c < 0) == (cmp.encodeKey(x) > cmp.encodeKey(y)) - (cmp.encodeKey(x) < cmp.encodeKey(y))
+    assert cmp.values(raw[0]) == (-300, 7, b"")
+
+    # out of the field order, with an optional field: nulls first
+    byTiming = RawComparator(MULTI_FIELD_ID_LAYOUT, [3, 4])
+    assert [v[0] for v in map(byTiming.values, sorted(raw, key=byTiming.encodeKey))][:25] == [None] * 25
+    assert byTiming.compare(raw[0], raw[1]) < 0
+    assert byTiming.values(raw[1]) == (DateTime.toMillis(when), b"t1")
+
+    versioned = RawComparator(MULTI_FIELD_ID_LAYOUT, [1], versioned=True)
+    assert versioned.values(VarInts.encodeText(u"3.0.0") + raw[5]) == (-7,)
+
+    with pytest.raises(AttributeError):
+        RawComparator(MULTI_FIELD_ID_LAYOUT, [5])
+
+
+def test_rawComparatorEdges():
+    # the doubles order as by the Java Double.compare, the NaNs canonical whatever their bits
+    layout = RawLayout([RawLayout.DOUBLE, RawLayout.INT], nullFlags=False)
+    cmp = RawComparator(layout, [0])
+    negativeNan = struct.pack('>Q', 0xFFF8000000000001)
+    doubles = [struct.pack('>d', v) for v in (float('-inf'), -1.5, -0.0, 0.0, 2.5, float('inf'))]
+    raw = [d + VarInts.encodeVLong(0) for d in doubles + [struct.pack('>d', float('nan')), negativeNan]]
+    assert cmp.compare(raw[-1], raw[-2]) == 0 and cmp.compare(raw[-2], raw[-1]) == 0
+    assert cmp.encodeKey(raw[-1]) == cmp.encodeKey(raw[-2])
+    for i, x in enumerate(raw):
+        for j, y in enumerate(raw):
+            c = cmp.compare(x, y)
+            expected = (min(i, 6) > min(j, 6)) - (min(i, 6) < min(j, 6))
+            assert (c > 0) - (c < 0) == expected
+            assert (cmp.encodeKey(x) > cmp.encodeKey(y)) - (cmp.encodeKey(x) < cmp.encodeKey(y)) == expected
+
+    # the INT keys must be in the int32 range for the encodeKey
+    byInt = RawComparator(layout, [1])
+    head = struct.pack('>d', 0.0)
+    assert byInt.encodeKey(head + VarInts.encodeVLong(-(1 << 31))) < byInt.encodeKey(head + VarInts.encodeVLong(0))
+    for v in (1 << 31, -(1 << 31) - 1, 1 << 40):
+        with pytest.raises(AttributeError): byInt.encodeKey(head + VarInts.encodeVLong(v))
+
+
+def test_rawSortKey():
+    cmp = RawComparator(MULTI_FIELD_ID_LAYOUT, [0, 1, 2])
+    raw = [BytesDataIoUtil.write(MULTI_FIELD_ID_IO, multiFieldId(i % 13, 0, "c", "v%d" % i)) for i in range(100)]
+    out = list(ExternalSorter(cmp.encodeKey, memoryBytes=1000, dedupe=ExternalSorter.Dedupe.KEEP_LAST).sort(raw))
+    assert [BytesDataIoUtil.read(ba, MULTI_FIELD_ID_IO).getText() for ba in out] == ["v%d" % (91 + i) for i in range(9)] \
+        + ["v%d" % (78 + i) for i in range(9, 13)]
+
+
+def test_streamJoin():
+    lefts = [BytesDataIoUtil.write(MULTI_FIELD_ID_IO, multiFieldId(i % 40, i, "c", "v%d" % i)) for i in range(300)]
+    rights = [BytesDataIoUtil.write(EMBEDDED_TYPE_IO, embeddedType(i % 25 * 2, "code %d" % i)) for i in range(100)]
+    leftKey = lambda ba: BytesDataIoUtil.read(ba, MULTI_FIELD_ID_IO).getA()
+    rightKey = lambda ba: BytesDataIoUtil.read(ba, EMBEDDED_TYPE_IO).getIntCode()
+
+    def naive(kind):
+        out = []
+        rightKeys = [(rightKey(r), r) for r in rights]
+        for l in lefts:
+            lk = leftKey(l)
+            matches = [r for k, r in rightKeys if k == lk]
+            if kind is StreamJoin.Kind.ANTI:
+                if not matches: out.append(l)
+            else:
+                out.extend((l, r) for r in matches)
+                if not matches and kind is StreamJoin.Kind.LEFT: out.append((l, None))
+        return sorted(out)
+
+    sortedLefts, sortedRights = sorted(lefts, key=leftKey), sorted(rights, key=rightKey)
+    for kind in StreamJoin.Kind:
+        expected = naive(kind)
+        assert len(expected) > 0
+        assert sorted(StreamJoin.sortMerge(sortedLefts, sortedRights, leftKey, rightKey, kind)) == expected
+        assert sorted(StreamJoin.hashJoin(lefts, rights, leftKey, rightKey, kind)) == expected
+        # spills, repartitions the partitions still over the budget
+        assert sorted(StreamJoin.hashJoin(lefts, rights, leftKey, rightKey, kind, memoryBytes=1000,
+                                          partitions=3)) == expected
+
+    with pytest.raises(AttributeError):
+        list(StreamJoin.sortMerge(lefts, sortedRights, leftKey, rightKey))
+
+
+class UpperText(Migrator):
+    """ Test migrator of the MultiFieldId from a pretend 2.0.0 of the same layout """
+
+    def migrate(self, src, *xtras):
+        result = src.clone()
+        result.setText(src.getText().upper())
+        return result
+
+
+def test_versionRouter():
+    m = multiFieldId(1, 2, "three", "text")
+    current = BytesDataIoUtil.writeVersioned(MULTI_FIELD_ID_IO, m)
+    assert BytesDataIoUtil.readVersioned(current, MULTI_FIELD_ID_IO) == m
+    old = VarInts.encodeText(u"2.0.0") + BytesDataIoUtil.write(MULTI_FIELD_ID_IO, m)
+    assert VersionRouter.peekVersion(old)[0] == SemVer("2.0.0")
+
+    registry = MigratorRegistry()
+    registry.register(MultiFieldId, "2.0.0", "3.0.0", UpperText())
+    router = VersionRouter("3.0.0", registry)
+    router.register("3.0.0", MULTI_FIELD_ID_IO)
+    router.register("2.0.0", MULTI_FIELD_ID_IO)
+    assert router.decode(old).getText() == "text"
+
+    out = list(router.forwardMany([current, old, current]))
+    assert out[0] is current and out[2] is current
+    assert BytesDataIoUtil.readVersioned(out[1], MULTI_FIELD_ID_IO).getText() == "TEXT"
+    assert (router.passed, router.converted) == (2, 1)
+
+    with pytest.raises(AttributeError):
+        router.decode(VarInts.encodeText(u"1.0.0") + BytesDataIoUtil.write(MULTI_FIELD_ID_IO, m))
+
+    # no registry: the records of the target version pass, the others have no migration path
+    bare = VersionRouter("3.0.0")
+    bare.register("3.0.0", MULTI_FIELD_ID_IO)
+    bare.register("2.0.0", MULTI_FIELD_ID_IO)
+    assert bare.forward(current) is current
+    with pytest.raises(AttributeError):
+        bare.forward(old)
+    assert (bare.passed, bare.converted) == (1, 0)
+
+
+def test_serializationProfiler():
+    profiler = SerializationProfiler().watch(MULTI_FIELD_ID_IO, MultiFieldId).watch(EMBEDDED_TYPE_IO, EmbeddedType)
+    originals = (DataMetaHadoopUtil.writeDttm, MultiFieldId.getA, MultiFieldId.setText)
+    m = multiFieldId(1, 300, "three", "some text", DateTime.fromIsoUtc("2016-03-31T15:33:44Z"))
+    with profiler:
+        assert profiler.isEnabled()
+        with pytest.raises(AttributeError): SerializationProfiler().enable()
+        ba = BytesDataIoUtil.write(MULTI_FIELD_ID_IO, m)
+        assert BytesDataIoUtil.read(ba, MULTI_FIELD_ID_IO) == m
+        embedded = embeddedType(5, "five")
+        assert BytesDataIoUtil.read(BytesDataIoUtil.write(EMBEDDED_TYPE_IO, embedded), EMBEDDED_TYPE_IO) == embedded
+    # all put back
+    assert (DataMetaHadoopUtil.writeDttm, MultiFieldId.getA, MultiFieldId.setText) == originals
+    assert 'write' not in vars(MULTI_FIELD_ID_IO)
+
+    stats = profiler.snapshot()
+    assert stats['inOutables']['MultiFieldId'] == {'calls': 2, 'bytes': 2 * len(ba),
+                                                   'seconds': stats['inOutables']['MultiFieldId']['seconds']}
+    assert stats['helpers']['writeDttm']['calls'] == 1 and stats['helpers']['writeDttm']['bytes'] == 8
+    assert stats['helpers']['readText']['calls'] == 3
+    fields = stats['fields']
+    # per direction: VLong 1, VLong 300 takes 3, Text "three" 6, zone and millis 8, Text 10, the null flags 2
+    assert fields['MultiFieldId.a']['bytes'] == 2 and fields['MultiFieldId.b']['bytes'] == 6
+    assert fields['MultiFieldId.c']['bytes'] == 12 and fields['MultiFieldId.timing']['bytes'] == 16
+    assert fields['MultiFieldId.text']['bytes'] == 20 and fields['MultiFieldId.<nullFlags>']['bytes'] == 2
+    assert sum(f['bytes'] for k, f in fields.items() if k.startswith("MultiFieldId.")) == 2 * len(ba)
+
+    # nothing counted while disabled
+    BytesDataIoUtil.write(MULTI_FIELD_ID_IO, m)
+    assert profiler.snapshot() == stats
+    profiler.reset()
+    assert profiler.snapshot()['fields'] == {}
+
+
+def test_wireSizeAnalyzer():
+    named = RawLayout(MULTI_FIELD_ID_LAYOUT.kinds, MULTI_FIELD_ID_LAYOUT.optional, names="a b c timing text".split())
+    out = io.BytesIO()
+    writer = RecordFileWriter(out, MULTI_FIELD_ID_IO, versioned=True)
+    when = DateTime.fromIsoUtc("2016-03-31T15:33:44Z")
+    for i in range(4):
+        writer.write(multiFieldId(i, 300, u"three", u"x" * i, when if i % 2 else None))
+    out.seek(0)
+    report = WireSizeAnalyzer(named, versioned=True).analyzeFile(out).report()
+    assert report['records'] == 4
+    fields = report['fields']
+    assert list(fields) == [WireSizeAnalyzer.VERSION, WireSizeAnalyzer.NULL_FLAGS, 'a', 'b', 'c', 'timing', 'text']
+    assert fields['b'] == {'values': 4, 'nulls': 0, 'bytes': 12, 'headerBytes': 0}
+    assert fields['timing'] == {'values': 2, 'nulls': 2, 'bytes': 16, 'headerBytes': 2}
+    assert fields['text'] == {'values': 4, 'nulls': 0, 'bytes': 4 + 6, 'headerBytes': 4}
+    assert sum(f['bytes'] for f in fields.values()) == report['bytes']
+    assert report['textLengths'] == {'0': 1, '1': 1, '2-3': 2, '4-7': 4 + 4}
+    assert report['waste'] == {WireSizeAnalyzer.DTTM_ZONE: {'bytes': 16, 'compactBytes': 14, 'waste': 2,
+                                                            'fields': ['timing']}}
+
+    # a decimal, a list of booleans and an embedded entity with an optional text
+    inner = RawLayout([RawLayout.LONG, RawLayout.TEXT], optional=[1], names=["id", "name"])
+    layout = RawLayout([RawLayout.DECIMAL, RawLayout.listOf(RawLayout.BOOL), inner], nullFlags=False,
+                       names=["price", "flags", "inner"])
+    rec = VarInts.encodeText(u"12345.67") + VarInts.encodeVLong(10) + b"\x01" * 10 + \
+        VarInts.encodeVLong(1) + VarInts.encodeVLong(2) + VarInts.encodeVLong(7)
+    analyzer = WireSizeAnalyzer(layout).add(rec)
+    fields = analyzer.report()['fields']
+    assert fields['flags'] == {'values': 1, 'nulls': 0, 'bytes': 11, 'headerBytes': 1}
+    assert fields['flags[]']['values'] == 10
+    assert fields['inner']['bytes'] == 3 and fields['inner.name']['nulls'] == 1
+    waste = analyzer.report()['waste']
+    assert waste[WireSizeAnalyzer.BOOLEAN_PER_ELEMENT]['waste'] == 10 - 2
+    # 1234567 is a 4 bytes VLong, the scale 2 one byte
+    assert waste[WireSizeAnalyzer.DECIMAL_AS_TEXT] == {'bytes': 9, 'compactBytes': 5, 'waste': 4, 'fields': ['price']}
+    assert analyzer.format().splitlines()[-2].startswith(WireSizeAnalyzer.BOOLEAN_PER_ELEMENT)
+    with pytest.raises(AttributeError): analyzer.add(rec + b"\x00")
+
+
+def test_lazyImports():
+    import subprocess
+    import ebay_datameta_hadoop.base as base
+    probe = "import sys, ebay_datameta_hadoop.base; print(' '.join(sorted(sys.modules)))"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    loaded = set(m.split('.')[0] for m in subprocess.check_output([sys.executable, '-c', probe], env=env)
+                 .decode('utf-8').split())
+    assert not loaded.intersection(('numpy', 'bitarray', 'hadoop', 'decimal'))
+    # the proxy passed on as a value before anything resolved it
+    probe = "from ebay_datameta_hadoop.base import *; print(DataMetaHadoopUtil.bitArrayToLongs(bitarray('101')))"
+    assert subprocess.check_output([sys.executable, '-c', probe], env=env).decode('utf-8').strip() == "[5]"
+    assert base.OrderedDict is OrderedDict and base.defaultdict is defaultdict
+    # the proxies this module star-imported still work, the module itself has the real ones by now
+    assert isinstance(bitarray, type(base._LazyAttr("", ""))) and isinstance(bitarray(2), bitarray)
+    assert base.bitarray is bitarray.resolve() and base.WritableUtils is WritableUtils.resolve()
+    di = InputStream.DataInputStream(InputStream.ByteArrayInputStream(VarInts.encodeText(u"1.50")))
+    assert DataMetaHadoopUtil.readBigDecimal(di) == base.Decimal("1.5") and isinstance(base.Decimal(1), Decimal)
+
+
+class _KeptOpen(io.BytesIO):
+    # the writers close their file, the tests read it back after that
+    def close(self):
+        pass
+
+
+def test_blockFile():
+    when = DateTime.fromIsoUtc("2016-03-31T15:33:44Z")
+    recs = [multiFieldId(i, i * 3, u"code %d" % (i % 7), u"some repeated text %d" % (i % 11), when if i % 2 else None)
+            for i in range(500)]
+    plain = io.BytesIO()
+    writer = RecordFileWriter(plain, MULTI_FIELD_ID_IO)
+    for m in recs:
+        writer.write(m)
+    raw = list(RecordFileReader(io.BytesIO(plain.getvalue())).rawRecords())
+
+    codecs = [Codec.NONE, Codec.ZLIB, Codec.BZ2] + ([Codec.LZMA] if sys.version_info[0] > 2 else [])
+    for codec in codecs:
+        out = _KeptOpen()
+        writer = BlockFileWriter(out, codec, blockBytes=1000, io=MULTI_FIELD_ID_IO)
+        for m in recs[:10]:
+            writer.write(m)
+        writer.flush() # a short block
+        for ba in raw[10:]:
+            writer.writeRaw(ba)
+        writer.close()
+        if codec == Codec.ZLIB: assert len(out.getvalue()) * 3 < len(plain.getvalue())
+
+        reader = BlockFileReader(io.BytesIO(out.getvalue()), MULTI_FIELD_ID_IO)
+        assert len(reader) == 500 and reader.blockCount() > 10 and len(reader.block(0)) == 10
+        assert list(reader) == recs
+        assert [reader.rawRecord(n) for n in (499, 0, 250, 251, 10)] == [raw[n] for n in (499, 0, 250, 251, 10)]
+        assert reader.record(123) == recs[123]
+        assert list(reader.rawRecords(437)) == raw[437:] and list(reader.rawRecords(500)) == []
+        with pytest.raises(AttributeError): reader.rawRecord(500)
+
+    empty = _KeptOpen()
+    BlockFileWriter(empty).close()
+    assert len(BlockFileReader(io.BytesIO(empty.getvalue()))) == 0 and list(BlockFileReader(io.BytesIO(empty.getvalue()))) == []
+    with pytest.raises(AttributeError): BlockFileReader(io.BytesIO(plain.getvalue()))
+    with pytest.raises(EOFError): BlockFileReader(io.BytesIO(out.getvalue()[:-1]))
+
+
+def _idsOf(records):
+    # top level for the SplittableFileReader.parallel to pickle
+    return [m.getA() for m in records]
+
+
+def test_splittableFile(tmpdir):
+    recs = [multiFieldId(i, -i, u"c%d" % (i % 5), u"text " * (i % 9), None) for i in range(2000)]
+    path = str(tmpdir.join("records.dmsp"))
+    writer = SplittableFileWriter(open(path, "wb"), MULTI_FIELD_ID_IO, syncInterval=300)
+    for m in recs:
+        writer.write(m)
+    writer.close()
+    size = os.path.getsize(path)
+
+    with open(path, "rb") as src:
+        assert list(SplittableFileReader(src, MULTI_FIELD_ID_IO)) == recs
+        # any cover of the file reads every record exactly once, in order
+        for bounds in ([0, size], [0, 1, 2, 30, 31, 5000, size], [0, 301, 302, 303, 9999, 10000, size - 1, size],
+                       [0] + list(range(7, size, 97)) + [size]):
+            ranges = list(zip(bounds, bounds[1:]))
+            read = [m for start, end in ranges for m in SplittableFileReader(src, MULTI_FIELD_ID_IO, start=start, end=end)]
+            assert read == recs
+        assert list(SplittableFileReader(src, start=size)) == []
+        assert len(list(SplittableFileReader(src, end=1))) > 0
+
+    assert SplittableFileReader.ranges(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    results = SplittableFileReader.parallel(path, _idsOf, splits=4, processes=2, io=MULTI_FIELD_ID_IO)
+    assert len(results) == 4 and all(results) and sum(results, []) == list(range(2000))
+
+
+class LongWritableInOutable(InOutable):
+    # the Hadoop LongWritable: the 8 bytes big-endian
+
+    def write(self, do, val):
+        do.writeLong(val)
+
+    def read(self, di):
+        return di.readLong()
+
+    def readVal(self, di, val):
+        return di.readLong()
+
+
+def test_sequenceFile():
+    recs = [multiFieldId(i, i * 7, u"code %d" % (i % 5), u"text", None) for i in range(300)]
+    keyIo = LongWritableInOutable()
+    header = b"SEQ\x06" + VarInts.encodeText(u"org.apache.hadoop.io.LongWritable") + \
+        VarInts.encodeText(u"MultiFieldIdWritable") + b"\x00\x00" + b"\x00\x00\x00\x01" + \
+        VarInts.encodeText(u"producer") + VarInts.encodeText(u"test") + b"s" * 16
+    for compression in Compression:
+        out = _KeptOpen()
+        writer = SequenceFileWriter(out, "org.apache.hadoop.io.LongWritable", "MultiFieldIdWritable", keyIo,
+                                    MULTI_FIELD_ID_IO, compression, blockBytes=2000, metadata={"producer": "test"},
+                                    sync=b"s" * 16)
+        for m in recs:
+            writer.append(m.getA(), m)
+        writer.close()
+        data = out.getvalue()
+        if compression == Compression.NONE:
+            assert data.startswith(header)
+            first = BytesDataIoUtil.write(MULTI_FIELD_ID_IO, recs[0])
+            assert data[len(header):len(header) + 16 + len(first)] == \
+                struct.pack(">ii", 8 + len(first), 8) + b"\x00" * 8 + first
+            assert data.count(b"\xff\xff\xff\xff" + b"s" * 16) > 2
+        else:
+            flagsAt = len(b"SEQ\x06" + VarInts.encodeText(u"org.apache.hadoop.io.LongWritable") +
+                          VarInts.encodeText(u"MultiFieldIdWritable"))
+            assert data[flagsAt:flagsAt + 2] == (b"\x01\x01" if compression == Compression.BLOCK else b"\x01\x00")
+            assert VarInts.decodeText(data, flagsAt + 2)[0] == u"org.apache.hadoop.io.compress.DefaultCodec"
+
+        reader = SequenceFileReader(io.BytesIO(data), keyIo, MULTI_FIELD_ID_IO)
+        assert (reader.keyClass, reader.compression, reader.metadata) == \
+            ("org.apache.hadoop.io.LongWritable", compression, {"producer": "test"})
+        assert list(reader) == [(m.getA(), m) for m in recs]
+        raw = list(SequenceFileReader(io.BytesIO(data)).rawRecords())
+        assert raw[3] == (struct.pack(">q", 3), BytesDataIoUtil.write(MULTI_FIELD_ID_IO, recs[3]))
+
+    with pytest.raises(AttributeError): SequenceFileReader(io.BytesIO(b"SEQ\x05" + data[4:]))
+    with pytest.raises(EOFError): list(SequenceFileReader(io.BytesIO(data[:-3])))
+
+
+def test_prefetchAndWriteBehind():
+    recs = [multiFieldId(i, -i, u"c%d" % (i % 3), u"text %d" % i, None) for i in range(1000)]
+    direct = _KeptOpen()
+    writer = RecordFileWriter(direct, MULTI_FIELD_ID_IO)
+    for m in recs:
+        writer.write(m)
+
+    out = _KeptOpen()
+    with WriteBehindWriter(RecordFileWriter(out, MULTI_FIELD_ID_IO), MULTI_FIELD_ID_IO, depth=2, batch=7) as behind:
+        for m in recs[:500]:
+            behind.write(m)
+        behind.flush()
+        assert list(RecordFileReader(io.BytesIO(out.getvalue()), MULTI_FIELD_ID_IO)) == recs[:500]
+        for m in recs[500:]:
+            behind.write(m)
+    assert out.getvalue() == direct.getvalue() and behind.count == 1000
+
+    raw = list(RecordFileReader(io.BytesIO(direct.getvalue())).rawRecords())
+    reader = PrefetchingReader(RecordFileReader(io.BytesIO(direct.getvalue())).rawRecords(), MULTI_FIELD_ID_IO,
+                               depth=2, batch=9)
+    assert list(reader) == recs and list(reader) == []
+    assert list(PrefetchingReader(iter(raw), batch=1000)) == raw
+
+    def failing():
+        for ba in raw[:20]:
+            yield ba
+        raise EOFError("Truncated")
+    got = []
+    with pytest.raises(EOFError):
+        for ba in PrefetchingReader(failing(), depth=1, batch=3):
+            got.append(ba)
+    assert got == raw[:20]
+
+    # stops early, the thread blocked on the full queue gets released
+    def endless():
+        while True:
+            yield b"x"
+    with PrefetchingReader(endless(), depth=1, batch=2) as reader:
+        assert [ba for _, ba in zip(range(5), reader)] == [b"x"] * 5
+    assert not reader._thread.is_alive()
+
+    class Broken(object):
+        def writeRaw(self, ba):
+            raise IOError("Disk full")
+
+        def close(self):
+            pass
+    broken = WriteBehindWriter(Broken(), batch=1)
+    broken.writeRaw(b"x")
+    with pytest.raises(IOError): broken.close()